@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AccuracyConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.accuracy'
+
+    def ready(self):
+        import apps.accuracy.signals
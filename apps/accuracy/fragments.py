@@ -0,0 +1,67 @@
+import logging
+from django.core.cache import cache
+from django.db.models import Prefetch
+from core.cache_layer import tag_versions, tags_current, trade_tag
+from .models import Accuracy, Trade
+from .serializers import TradeSerializers
+
+logger = logging.getLogger(__name__)
+
+FRAGMENT_TIMEOUT = 60 * 60 * 24
+
+
+def completed_trade_fragment_key(trade_id):
+    return f"completed_trade:{trade_id}"
+
+
+def invalidate_completed_trade_fragment(trade_id):
+    try:
+        cache.delete(completed_trade_fragment_key(trade_id))
+    except Exception as e:
+        logger.error(f"Failed to drop completed trade fragment {trade_id}: {str(e)}")
+
+
+def completed_trades_with_details(ids):
+    return Trade.objects.filter(id__in=ids).select_related('company', 'analysis', 'insight').prefetch_related(
+        'history',
+        # Ordered so TradeSerializers' accuracy.first() is answered from the prefetch
+        Prefetch('accuracy', queryset=Accuracy.objects.order_by('pk')),
+    )
+
+
+def get_completed_trade_fragments(ids):
+    """
+    Serialized completed trades for `ids`, in that order. Each trade is
+    cached on its own, so pages and exports share fragments and a change to
+    one trade only re-serializes that trade.
+
+    A fragment is stored with its trade tag version read before serializing,
+    so one written back by a reader racing an invalidation is never served.
+    """
+    keys = {trade_id: completed_trade_fragment_key(trade_id) for trade_id in ids}
+    try:
+        stored = cache.get_many(list(keys.values()))
+    except Exception as e:
+        logger.error(f"Failed to read completed trade fragments: {str(e)}")
+        stored = {}
+    found = {
+        key: fragment['value'] for key, fragment in stored.items()
+        if isinstance(fragment, dict) and 'tags' in fragment and tags_current(fragment['tags'])
+    }
+
+    missing = [trade_id for trade_id in ids if keys[trade_id] not in found]
+    if missing:
+        versions = tag_versions([trade_tag(trade_id) for trade_id in missing])
+        fresh = {
+            keys[trade['id']]: trade
+            for trade in TradeSerializers(completed_trades_with_details(missing), many=True).data
+        }
+        try:
+            cache.set_many({
+                key: {'value': trade, 'tags': {trade_tag(trade['id']): versions[trade_tag(trade['id'])]}}
+                for key, trade in fresh.items()
+            }, FRAGMENT_TIMEOUT)
+        except Exception as e:
+            logger.error(f"Failed to cache completed trade fragments: {str(e)}")
+        found.update(fresh)
+    return [found[keys[trade_id]] for trade_id in ids if keys[trade_id] in found]
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from apps.accuracy.statistics import rebuild_statistics
+
+
+class Command(BaseCommand):
+    help = 'Recompute the accuracy summary behind the public trade statistics'
+
+    def handle(self, *args, **options):
+        rows = rebuild_statistics()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} accuracy summary rows"))
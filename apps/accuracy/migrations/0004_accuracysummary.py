@@ -0,0 +1,29 @@
+# Generated by Django 5.1.4 on 2026-10-19 06:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accuracy', '0003_accuracy_target_hit_accuracy_total_days'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccuracySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('plan_type', models.CharField(max_length=15)),
+                ('trade_type', models.CharField(max_length=20)),
+                ('completed_trades', models.IntegerField(default=0)),
+                ('successful_trades', models.IntegerField(default=0)),
+                ('total_days', models.IntegerField(default=0)),
+                ('timed_trades', models.IntegerField(default=0, help_text='Accuracy rows with total_days set')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('plan_type', 'trade_type'), name='unique_accuracy_summary')],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+from django.db import migrations
+from django.db.models import Count, Q, Sum
+
+
+def seed_accuracy_summary(apps, schema_editor):
+    # Same totals as statistics.rebuild_statistics(), over the historical models
+    Trade = apps.get_model('trades', 'Trade')
+    Accuracy = apps.get_model('accuracy', 'Accuracy')
+    AccuracySummary = apps.get_model('accuracy', 'AccuracySummary')
+
+    rows = {}
+    for row in Trade.objects.filter(status='COMPLETED').order_by().values(
+        'plan_type', 'trade_type'
+    ).annotate(completed_trades=Count('id')):
+        rows[row['plan_type'], row['trade_type']] = AccuracySummary(**row)
+
+    for row in Accuracy.objects.filter(trade__status='COMPLETED').order_by().values(
+        'trade__plan_type', 'trade__trade_type'
+    ).annotate(
+        successful_trades=Count('id', filter=Q(target_hit=True)),
+        timed_trades=Count('total_days'),
+        total_days=Sum('total_days'),
+    ):
+        summary = rows[row['trade__plan_type'], row['trade__trade_type']]
+        summary.successful_trades = row['successful_trades']
+        summary.total_days = row['total_days'] or 0
+        summary.timed_trades = row['timed_trades']
+
+    AccuracySummary.objects.all().delete()
+    AccuracySummary.objects.bulk_create(rows.values())
+
+
+def clear_accuracy_summary(apps, schema_editor):
+    apps.get_model('accuracy', 'AccuracySummary').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accuracy', '0004_accuracysummary'),
+        ('trades', '0022_populate_company_trade_summaries'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_accuracy_summary, clear_accuracy_summary),
+    ]
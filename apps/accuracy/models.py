@@ -1,5 +1,6 @@
 from django.db import models
 from django.core.exceptions import ValidationError
+from model_utils import FieldTracker
 from apps.trades.models import Trade
 from apps.indexAndCommodity.models import Trade as IndexAndCommodityTrade
 from django.db import models
@@ -12,6 +13,7 @@ class Accuracy(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     total_days = models.IntegerField(null=True, blank=True, help_text="Total days taken for trade completion")
+    tracker = FieldTracker(fields=['trade', 'target_hit', 'total_days'])
 
     def clean(self):
         if self.trade.status != 'COMPLETED':
@@ -35,6 +37,29 @@ class Accuracy(models.Model):
         return f"Accuracy for Trade {self.trade.id} - Target Hit: {self.target_hit}"
 
 
+class AccuracySummary(models.Model):
+    """
+    Completed trades of one plan/trade type and the totals of their Accuracy
+    rows. Kept in step by the accuracy signals in the writing transaction;
+    `manage.py rebuild_accuracy_statistics` recomputes it.
+    """
+    plan_type = models.CharField(max_length=15)
+    trade_type = models.CharField(max_length=20)
+    completed_trades = models.IntegerField(default=0)
+    successful_trades = models.IntegerField(default=0)
+    total_days = models.IntegerField(default=0)
+    timed_trades = models.IntegerField(default=0, help_text="Accuracy rows with total_days set")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['plan_type', 'trade_type'], name='unique_accuracy_summary')
+        ]
+
+    def __str__(self):
+        return f"{self.plan_type}/{self.trade_type}: {self.successful_trades}/{self.completed_trades}"
+
+
 
 
 class AccuracyOfIndexAndCommodity(models.Model):
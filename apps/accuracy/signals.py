@@ -0,0 +1,98 @@
+import logging
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.trades.models import Trade, TradeHistory, Analysis, Insight, Company
+from core.conditional import bump_generation, TRADES_GENERATION, INDEX_TRADES_GENERATION
+from core.cache_layer import invalidate_tags, trade_tag, plan_tag
+from .models import Accuracy, AccuracyOfIndexAndCommodity
+from .statistics import record_accuracy_change, record_trade_change
+from .fragments import completed_trade_fragment_key, invalidate_completed_trade_fragment
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=Accuracy)
+def update_summary_for_accuracy(sender, instance, created, **kwargs):
+    try:
+        record_accuracy_change(instance, created=created)
+    except Exception as e:
+        logger.error(f"Error updating accuracy summary for accuracy {instance.pk}: {str(e)}")
+
+
+@receiver(post_delete, sender=Accuracy)
+def remove_accuracy_from_summary(sender, instance, **kwargs):
+    try:
+        record_accuracy_change(instance, deleted=True)
+    except Exception as e:
+        logger.error(f"Error updating accuracy summary for deleted accuracy {instance.pk}: {str(e)}")
+
+
+@receiver(post_save, sender=Trade)
+def update_summary_for_trade(sender, instance, created, **kwargs):
+    try:
+        record_trade_change(instance, created=created)
+    except Exception as e:
+        logger.error(f"Error updating accuracy summary for trade {instance.pk}: {str(e)}")
+
+
+@receiver(post_delete, sender=Trade)
+def remove_trade_from_summary(sender, instance, **kwargs):
+    try:
+        record_trade_change(instance, deleted=True)
+    except Exception as e:
+        logger.error(f"Error updating accuracy summary for deleted trade {instance.pk}: {str(e)}")
+
+
+@receiver(post_save, sender=Accuracy)
+@receiver(post_delete, sender=Accuracy)
+def bump_trades_generation_for_accuracy(sender, **kwargs):
+    """Accuracy is served with trades and feeds the performance report, so it invalidates their caches."""
+    transaction.on_commit(lambda: bump_generation(TRADES_GENERATION))
+
+
+@receiver(post_save, sender=Accuracy)
+@receiver(post_delete, sender=Accuracy)
+def invalidate_trade_cache_tags_for_accuracy(sender, instance, **kwargs):
+    plan_type = Trade.objects.filter(pk=instance.trade_id).values_list('plan_type', flat=True).first()
+    tags = [trade_tag(instance.trade_id)] + ([plan_tag(plan_type)] if plan_type else [])
+    transaction.on_commit(lambda: invalidate_tags(*tags))
+
+
+@receiver(post_save, sender=AccuracyOfIndexAndCommodity)
+@receiver(post_delete, sender=AccuracyOfIndexAndCommodity)
+def bump_index_trades_generation_for_accuracy(sender, **kwargs):
+    transaction.on_commit(lambda: bump_generation(INDEX_TRADES_GENERATION))
+
+
+
+@receiver(post_save, sender=Trade)
+@receiver(post_delete, sender=Trade)
+def drop_completed_trade_fragment(sender, instance, **kwargs):
+    """Drop the cached CompletedTradesView entry once the write is committed."""
+    trade_id = instance.pk
+    transaction.on_commit(lambda: invalidate_completed_trade_fragment(trade_id))
+
+
+@receiver(post_save, sender=TradeHistory)
+@receiver(post_delete, sender=TradeHistory)
+@receiver(post_save, sender=Analysis)
+@receiver(post_save, sender=Insight)
+@receiver(post_save, sender=Accuracy)
+@receiver(post_delete, sender=Accuracy)
+def drop_completed_trade_fragment_for_detail(sender, instance, **kwargs):
+    trade_id = instance.trade_id
+    transaction.on_commit(lambda: invalidate_completed_trade_fragment(trade_id))
+
+
+@receiver(post_save, sender=Company)
+def drop_completed_trade_fragments_for_company(sender, instance, created, **kwargs):
+    if created:
+        return
+    keys = [
+        completed_trade_fragment_key(trade_id)
+        for trade_id in instance.trades.filter(status=Trade.Status.COMPLETED).values_list('id', flat=True)
+    ]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
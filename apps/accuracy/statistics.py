@@ -0,0 +1,126 @@
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from apps.trades.models import Trade
+from core.rollups import bump_counters
+from .models import Accuracy, AccuracySummary
+
+SUMMARY_FIELDS = ('completed_trades', 'successful_trades', 'total_days', 'timed_trades')
+
+
+def _bump_summary(plan_type, trade_type, sign=1, **totals):
+    bump_counters(
+        AccuracySummary, {field: sign * value for field, value in totals.items()},
+        plan_type=plan_type, trade_type=trade_type
+    )
+
+
+def accuracy_totals(target_hit, total_days):
+    """What a single Accuracy row adds to its trade's summary."""
+    return {
+        'successful_trades': int(bool(target_hit)),
+        'total_days': total_days or 0,
+        'timed_trades': int(total_days is not None),
+    }
+
+
+def record_accuracy_change(accuracy, created=False, deleted=False):
+    """Apply one Accuracy save or delete to the summary of its (completed) trade."""
+    current = accuracy_totals(accuracy.target_hit, accuracy.total_days)
+    trade = Trade.objects.filter(pk=accuracy.trade_id).values('status', 'plan_type', 'trade_type').first()
+    if created or deleted:
+        if trade and trade['status'] == Trade.Status.COMPLETED:
+            _bump_summary(trade['plan_type'], trade['trade_type'], -1 if deleted else 1, **current)
+        return
+
+    tracker = accuracy.tracker
+    if not tracker.changed():
+        return
+    previous_trade = trade
+    if tracker.has_changed('trade'):
+        previous_trade = Trade.objects.filter(pk=tracker.previous('trade')).values(
+            'status', 'plan_type', 'trade_type'
+        ).first()
+    if previous_trade and previous_trade['status'] == Trade.Status.COMPLETED:
+        previous = accuracy_totals(tracker.previous('target_hit'), tracker.previous('total_days'))
+        _bump_summary(previous_trade['plan_type'], previous_trade['trade_type'], -1, **previous)
+    if trade and trade['status'] == Trade.Status.COMPLETED:
+        _bump_summary(trade['plan_type'], trade['trade_type'], **current)
+
+
+def record_trade_change(trade, created=False, deleted=False):
+    """
+    Move a trade, with its Accuracy totals, into or out of the summary when
+    it is completed, reopened or re-typed. On delete only the trade itself
+    is removed: its Accuracy rows are cascaded first and remove themselves.
+    """
+    completed = trade.status == Trade.Status.COMPLETED
+    if created or deleted:
+        if completed:
+            _bump_summary(trade.plan_type, trade.trade_type, -1 if deleted else 1, completed_trades=1)
+        return
+
+    changed = {
+        field: trade.tracker.previous(field)
+        for field in ('status', 'plan_type', 'trade_type')
+        if trade.tracker.has_changed(field)
+    }
+    was_completed = changed.get('status', trade.status) == Trade.Status.COMPLETED
+    if not changed or not (was_completed or completed):
+        return
+
+    totals = Accuracy.objects.filter(trade=trade).aggregate(
+        successful_trades=Count('id', filter=Q(target_hit=True)),
+        timed_trades=Count('total_days'),
+        total_days=Sum('total_days'),
+    )
+    totals = dict(totals, completed_trades=1, total_days=totals['total_days'] or 0)
+    if was_completed:
+        _bump_summary(
+            changed.get('plan_type', trade.plan_type), changed.get('trade_type', trade.trade_type), -1, **totals
+        )
+    if completed:
+        _bump_summary(trade.plan_type, trade.trade_type, **totals)
+
+
+@transaction.atomic
+def rebuild_statistics():
+    """Recompute every summary row from the trades and Accuracy tables."""
+    rows = {}
+    for row in Trade.objects.filter(status=Trade.Status.COMPLETED).order_by().values(
+        'plan_type', 'trade_type'
+    ).annotate(completed_trades=Count('id')):
+        rows[row['plan_type'], row['trade_type']] = AccuracySummary(**row)
+
+    for row in Accuracy.objects.filter(trade__status=Trade.Status.COMPLETED).order_by().values(
+        'trade__plan_type', 'trade__trade_type'
+    ).annotate(
+        successful_trades=Count('id', filter=Q(target_hit=True)),
+        timed_trades=Count('total_days'),
+        total_days=Sum('total_days'),
+    ):
+        summary = rows[row['trade__plan_type'], row['trade__trade_type']]
+        summary.successful_trades = row['successful_trades']
+        summary.total_days = row['total_days'] or 0
+        summary.timed_trades = row['timed_trades']
+
+    AccuracySummary.objects.all().delete()
+    return len(AccuracySummary.objects.bulk_create(rows.values()))
+
+
+def trade_statistics(plan_type=None, trade_type=None):
+    """Average duration, completed count and success rate, summed over at most a handful of rows."""
+    summaries = AccuracySummary.objects.all()
+    if plan_type:
+        summaries = summaries.filter(plan_type=plan_type)
+    if trade_type:
+        summaries = summaries.filter(trade_type=trade_type)
+    totals = summaries.aggregate(**{field: Sum(field) for field in SUMMARY_FIELDS})
+    totals = {field: value or 0 for field, value in totals.items()}
+
+    completed = totals['completed_trades']
+    return {
+        "average_trade_duration": round(totals['total_days'] / totals['timed_trades'], 2)
+        if totals['timed_trades'] else 0,
+        "total_trades": completed,
+        "success_rate": round(totals['successful_trades'] / completed * 100, 2) if completed else 0,
+    }
@@ -1,3 +1,238 @@
-from django.test import TestCase
+import io
+from importlib import import_module
+from django.apps import apps as app_registry
+from datetime import timedelta
+import json
+from unittest import mock
+from django.test import TestCase, SimpleTestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from apps.trades.models import Company, Trade, TradeHistory
+from core import cache_layer
+from . import fragments
+from .models import Accuracy, AccuracySummary
 
 # Create your tests here.
+
+
+class AccuracySummaryTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            phone_number='+919876543210', email='staff@example.com', password='pass', is_staff=True
+        )
+        self.company = Company.objects.create(
+            token_id=1, exchange='NSE', trading_symbol='SBIN', script_name='SBIN', display_name='SBI'
+        )
+
+    def completed_trade(self, days, **fields):
+        trade = Trade.objects.create(
+            company=self.company, user=self.user, status='ACTIVE', **dict({'trade_type': 'INTRADAY'}, **fields)
+        )
+        trade.status = 'COMPLETED'
+        trade.completed_at = trade.created_at + timedelta(days=days)
+        trade.save()
+        return trade
+
+    def summary_snapshot(self):
+        return sorted(AccuracySummary.objects.values_list(
+            'plan_type', 'trade_type', 'completed_trades', 'successful_trades', 'total_days', 'timed_trades'
+        ).exclude(completed_trades=0, successful_trades=0, timed_trades=0))
+
+    def test_signals_keep_summary_equal_to_a_rebuild(self):
+        hit = self.completed_trade(4)
+        missed = self.completed_trade(2, trade_type='POSITIONAL', plan_type='PREMIUM')
+        reopened = self.completed_trade(6)
+        Accuracy.objects.create(trade=hit, target_hit=True)
+        accuracy = Accuracy.objects.create(trade=missed, target_hit=False)
+        Accuracy.objects.create(trade=reopened, target_hit=True)
+        Trade.objects.create(company=self.company, user=self.user, trade_type='INTRADAY', status='ACTIVE')
+
+        accuracy.target_hit = True
+        accuracy.save(update_fields=['target_hit'])
+        reopened.status = 'ACTIVE'
+        reopened.save()
+        missed.plan_type = 'BASIC'
+        missed.save()
+        hit.delete()
+
+        incremental = self.summary_snapshot()
+        call_command('rebuild_accuracy_statistics', stdout=io.StringIO())
+        self.assertEqual(self.summary_snapshot(), incremental)
+        self.assertEqual(incremental, [('BASIC', 'POSITIONAL', 1, 1, 2, 1)])
+
+    def test_migration_seeds_summary_of_existing_trades(self):
+        Accuracy.objects.create(trade=self.completed_trade(3), target_hit=True)
+        self.completed_trade(1, plan_type='PREMIUM')
+        incremental = self.summary_snapshot()
+        AccuracySummary.objects.all().delete()
+
+        migration = import_module('apps.accuracy.migrations.0005_seed_accuracysummary')
+        migration.seed_accuracy_summary(app_registry, None)
+        self.assertEqual(self.summary_snapshot(), incremental)
+        self.assertEqual(incremental, [('BASIC', 'INTRADAY', 1, 1, 3, 1), ('PREMIUM', 'INTRADAY', 1, 0, 0, 0)])
+
+    def test_statistics_view_reads_summary(self):
+        first = self.completed_trade(3)
+        second = self.completed_trade(5, trade_type='POSITIONAL')
+        self.completed_trade(1)
+        Accuracy.objects.create(trade=first, target_hit=True)
+        Accuracy.objects.create(trade=second, target_hit=False)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('trade-statistics'))
+        self.assertEqual(response.json(), {"average_trade_duration": 4.0, "total_trades": 3, "success_rate": 33.33})
+
+        response = self.client.get(reverse('trade-statistics'), {'trade_type': 'POSITIONAL'})
+        self.assertEqual(response.json(), {"average_trade_duration": 5.0, "total_trades": 1, "success_rate": 0})
+        response = self.client.get(reverse('trade-statistics'), {'plan_type': 'BASIC', 'trade_type': 'x' * 64})
+        self.assertEqual(response.status_code, 400)
+
+    def test_cached_statistics_are_invalidated_by_trade_tags(self):
+        cache.clear()
+        cache_layer.local_cache.clear()
+        self.completed_trade(2, plan_type='PREMIUM')
+        url = reverse('trade-statistics')
+        self.assertEqual(self.client.get(url, {'plan_type': 'PREMIUM'}).json()['total_trades'], 1)
+        self.assertEqual(self.client.get(url).json()['total_trades'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.completed_trade(4)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, {'plan_type': 'PREMIUM'}).json()['total_trades'], 1)
+        self.assertEqual(self.client.get(url).json()['total_trades'], 2)
+
+
+    def test_completed_trades_pages_share_cached_fragments(self):
+        cache.clear()
+        call_command('rebuild_accuracy_statistics', stdout=io.StringIO())
+        trades = [self.completed_trade(day) for day in range(5)]
+        Trade.objects.create(company=self.company, user=self.user, trade_type='INTRADAY', status='ACTIVE')
+        url = reverse('completed-trades')
+
+        first = self.client.get(url, {'page_size': 3}).json()
+        self.assertEqual(first['total_completed_trades'], 5)
+        self.assertEqual([trade['id'] for trade in first['completed_trades']], [t.id for t in trades[:1:-1]])
+        second = self.client.get(first['next']).json()
+        self.assertEqual([trade['id'] for trade in second['completed_trades']], [trades[1].id, trades[0].id])
+        self.assertIsNone(second['next'])
+
+        # Every fragment is cached now: a page is one keyset query and a summary read
+        with self.assertNumQueries(2):
+            self.client.get(url, {'page_size': 5})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            TradeHistory.objects.create(trade=trades[0], buy=100, target=120, sl=90)
+        streamed = self.client.get(url, {'stream': 'true'})
+        export = json.loads(b''.join(streamed.streaming_content))
+        self.assertEqual(export['total_completed_trades'], 5)
+        self.assertEqual(len(export['completed_trades']), 5)
+        self.assertEqual(export['completed_trades'][-1]['trade_history'][0]['buy'], 100)
+
+    def test_fragment_serialized_while_the_trade_changes_is_not_served(self):
+        cache.clear()
+        trade = self.completed_trade(1)
+        details = fragments.completed_trades_with_details
+
+        def changed_while_serializing(ids):
+            # The writer's on-commit invalidation lands between the read and the write-back
+            cache_layer.invalidate_tags(cache_layer.trade_tag(trade.id))
+            return details(ids)
+
+        with mock.patch('apps.accuracy.fragments.completed_trades_with_details', changed_while_serializing):
+            self.assertEqual([t['id'] for t in fragments.get_completed_trade_fragments([trade.id])], [trade.id])
+        with mock.patch('apps.accuracy.fragments.completed_trades_with_details', wraps=details) as serialized:
+            fragments.get_completed_trade_fragments([trade.id])
+            fragments.get_completed_trade_fragments([trade.id])
+        self.assertEqual(serialized.call_count, 1)
+
+
+class CacheLayerTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        cache_layer.local_cache.clear()
+
+    def test_stale_value_is_served_while_another_caller_refreshes(self):
+        cache_layer.set_value('stats', 'old', soft_ttl=0)
+        self.assertIsNotNone(cache_layer._acquire('stats', 30))
+        compute = mock.Mock(return_value='new')
+
+        self.assertEqual(cache_layer.get_or_compute('stats', compute), 'old')
+        compute.assert_not_called()
+
+        cache.delete(cache_layer._lock_key('stats'))
+        self.assertEqual(cache_layer.get_or_compute('stats', compute), 'new')
+        self.assertEqual(cache_layer.get_or_compute('stats', compute), 'new')
+        compute.assert_called_once()
+
+    def test_failed_refresh_keeps_serving_the_stale_value(self):
+        cache_layer.set_value('stats', 'old', soft_ttl=0)
+        self.assertEqual(cache_layer.get_or_compute('stats', mock.Mock(side_effect=ValueError)), 'old')
+        with self.assertRaises(ValueError):
+            cache_layer.get_or_compute('cold', mock.Mock(side_effect=ValueError))
+
+    def test_cold_key_waits_for_the_lock_holder(self):
+        cache_layer._acquire('cold', 30)
+
+        def finish_elsewhere(seconds):
+            cache_layer.set_value('cold', 'computed')
+
+        compute = mock.Mock(return_value='duplicate')
+        with mock.patch.object(cache_layer.time, 'sleep', side_effect=finish_elsewhere):
+            self.assertEqual(cache_layer.get_or_compute('cold', compute), 'computed')
+        compute.assert_not_called()
+
+    def test_soft_ttl_is_jittered_down(self):
+        before = cache_layer.time.time()
+        cache_layer.set_value('stats', 'value', soft_ttl=100, jitter=0.2)
+        fresh_until = cache.get('stats')['fresh_until']
+        self.assertTrue(before + 80 <= fresh_until <= cache_layer.time.time() + 100)
+
+    def test_local_tier_answers_repeat_reads_until_invalidated_elsewhere(self):
+        cache_layer.enable_local('hot', ttl=60)
+        self.addCleanup(cache_layer._local_ttls.pop, 'hot')
+        cache_layer.set_value('hot:key', 'value')
+
+        with mock.patch.object(cache_layer.cache, 'get') as shared_get:
+            self.assertEqual(cache_layer.get_value('hot:key').value, 'value')
+        shared_get.assert_not_called()
+
+        cache.set('hot:key', {'value': 'rewritten', 'fresh_until': cache_layer.time.time() + 60})
+        # Our own broadcast is ignored, another process's drops the local copy
+        cache_layer.invalidation_listener.handle(f"{cache_layer.PROCESS_ID}\nhot:key".encode())
+        self.assertEqual(cache_layer.get_value('hot:key').value, 'value')
+        cache_layer.invalidation_listener.handle(b"other-process\nhot:key")
+        self.assertEqual(cache_layer.get_value('hot:key').value, 'rewritten')
+
+    def test_local_cache_evicts_least_recently_used_and_expired(self):
+        local = cache_layer.LocalCache(max_size=2)
+        local.set('a', 1, 60)
+        local.set('b', 2, 60)
+        local.get('a')
+        local.set('c', 3, 60)
+        self.assertEqual((local.get('a'), local.get('b'), local.get('c')), (1, None, 3))
+        local.set('d', 4, -1)
+        self.assertIsNone(local.get('d'))
+
+    def test_invalidating_a_tag_drops_every_entry_tagged_with_it(self):
+        cache_layer.set_value('first', 1, tags=['trade:1', 'plan:BASIC'])
+        cache_layer.set_value('second', 2, tags=['plan:BASIC'])
+        cache_layer.set_value('third', 3, tags=['plan:PREMIUM'])
+
+        cache_layer.invalidate_tags('plan:BASIC')
+
+        self.assertIsNone(cache_layer.get_value('first'))
+        self.assertIsNone(cache_layer.get_value('second'))
+        self.assertEqual(cache_layer.get_value('third').value, 3)
+
+    def test_invalidation_while_computing_is_not_lost(self):
+        def compute():
+            cache_layer.invalidate_tags('trade:1')
+            return 'computed from old data'
+
+        self.assertEqual(cache_layer.get_or_compute('key', compute, tags=['trade:1']), 'computed from old data')
+        self.assertIsNone(cache_layer.get_value('key'))
+        self.assertEqual(cache_layer.get_or_compute('key', lambda: 'fresh', tags=['trade:1']), 'fresh')
+        self.assertEqual(cache_layer.get_value('key').value, 'fresh')
@@ -3,21 +3,25 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser,AllowAny
 from django.db import transaction
 from django.core.exceptions import ValidationError
-from django.db.models import Avg, Count, F
-from django.core.cache import cache
 from rest_framework.views import APIView
 from datetime import timedelta
 from django.utils.timezone import now
-from django.db.models import Q, Avg, Count, F
-from django.core.cache import cache
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny
 from .models import Accuracy, Trade
-from .serializers import TradeSerializer,TradeSerializers
+from .serializers import TradeSerializer
 from .models import Accuracy
 from .serializers import AccuracySerializer
+from .statistics import trade_statistics
+from .fragments import get_completed_trade_fragments
+from core.pagination import KeysetPaginationMixin
+from core.cache_layer import get_or_compute, enable_local, plan_tag
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.utils.encoders import JSONEncoder
 from django.db import DatabaseError
 import logging
 
@@ -138,45 +142,40 @@ class AccuracyByTradeView(generics.ListAPIView):
         return Accuracy.objects.filter(trade_id=trade_id).select_related('trade')
     
 
+# Read on nearly every public page load, so also kept in-process
+enable_local("trade_statistics")
+enable_local("active_trades")
+
+# Trade signals invalidate these, so entries over all trades can live long
+STATISTICS_TIMEOUT = 60 * 60
+ALL_PLAN_TAGS = [plan_tag(plan) for plan in Trade.PlanType.values]
+
+
 # API 1: Trade Statistics (Avg Duration, Total Trades, Success Rate)
 class TradeStatisticsView(APIView):
-    """API to get trade statistics: average duration, total completed trades, success rate"""
+    """
+    API to get trade statistics: average duration, total completed trades, success rate.
+    Read from the accuracy summary, optionally narrowed by ?plan_type= and ?trade_type=.
+    """
     permission_classes = [AllowAny]
 
     def get(self, request, *args, **kwargs):
-        cache_key = "trade_statistics"
-        cached_data = cache.get(cache_key)
-
-        if cached_data:
-            return Response(cached_data, status=200)
-
-        # Filter only COMPLETED trades
-        completed_trades = Trade.objects.filter(status="COMPLETED")
-
-        # Get IDs of completed trades
-        completed_trade_ids = completed_trades.values_list("id", flat=True)
-
-        # Accuracy stats only for completed trades
-        accuracy_stats = Accuracy.objects.filter(trade_id__in=completed_trade_ids).aggregate(
-            avg_days=Avg("total_days"),
-            successful_trades=Count("id", filter=Q(target_hit=True))
+        plan_type = request.query_params.get("plan_type")
+        trade_type = request.query_params.get("trade_type")
+        # Only known values reach the cache key, so callers cannot mint new entries
+        if (plan_type and plan_type not in Trade.PlanType.values) or (
+            trade_type and trade_type not in Trade.TradeType.values
+        ):
+            return Response(
+                {"error": "Invalid request data", "details": "Unknown plan_type or trade_type"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        response_data = get_or_compute(
+            f"trade_statistics:{plan_type}:{trade_type}",
+            lambda: trade_statistics(plan_type=plan_type, trade_type=trade_type),
+            soft_ttl=STATISTICS_TIMEOUT,
+            tags=[plan_tag(plan_type)] if plan_type else ALL_PLAN_TAGS
         )
-
-        completed_trades_count = completed_trades.count()
-        successful_trades = accuracy_stats.get("successful_trades", 0)
-
-        # Calculate success rate based only on completed trades
-        success_rate = (successful_trades / completed_trades_count * 100) if completed_trades_count > 0 else 0
-
-        response_data = {
-            "average_trade_duration": round(accuracy_stats["avg_days"], 2) if accuracy_stats["avg_days"] else 0,
-            "total_trades": completed_trades_count,
-            "success_rate": round(success_rate, 2)
-        }
-
-        # Cache result for 5 minutes
-        cache.set(cache_key, response_data, timeout=300)
-
         return Response(response_data, status=200)
 
 # class TradeStatisticsView(APIView):
@@ -268,38 +267,9 @@ class ActiveTradesView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request, *args, **kwargs):
-        cache_key = "active_trades"
-
         try:
-            # Try to fetch from cache
-            cached_data = cache.get(cache_key)
-            if cached_data:
-                return Response(cached_data, status=status.HTTP_200_OK)
-        except Exception as e:
-            # Log cache errors (optional: replace with logging)
-            print(f"Cache error: {e}")
-
-        try:
-            last_30_days = now() - timedelta(days=30)
-
-            # Fetch only the latest 6 active trades
-            active_trades = Trade.objects.filter(
-                status="ACTIVE", plan_type="BASIC", created_at__gte=last_30_days
-            ).order_by("-created_at")[:6]
-
-            active_trades_data = TradeSerializer(active_trades, many=True).data
-
-            response_data = {
-                "active_trades_last_30_days": len(active_trades_data),  # Count only the returned trades
-                "active_trades": active_trades_data
-            }
-
-            try:
-                # Cache result for 5 minutes
-                cache.set(cache_key, response_data, timeout=300)
-            except Exception as e:
-                print(f"Cache set error: {e}")
-
+            # Still time-bound: trades age out of the 30-day window without any write
+            response_data = get_or_compute("active_trades", self.get_active_trades, tags=[plan_tag("BASIC")])
             return Response(response_data, status=status.HTTP_200_OK)
 
         except ValidationError as e:
@@ -311,39 +281,89 @@ class ActiveTradesView(APIView):
         except Exception as e:
             return Response({"error": "An unexpected error occurred", "details": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    def get_active_trades(self):
+        last_30_days = now() - timedelta(days=30)
+
+        # Fetch only the latest 6 active trades
+        active_trades = Trade.objects.filter(
+            status="ACTIVE", plan_type="BASIC", created_at__gte=last_30_days
+        ).select_related("company").order_by("-created_at")[:6]
+
+        active_trades_data = TradeSerializer(active_trades, many=True).data
+
+        return {
+            "active_trades_last_30_days": len(active_trades_data),  # Count only the returned trades
+            "active_trades": active_trades_data
+        }
+
 
 # API 3: All-time Completed Trades
 logger = logging.getLogger(__name__)
+class CompletedTradesPagination(KeysetPaginationMixin, PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_by_default = True
+
+
 class CompletedTradesView(APIView):
-    """API to get all-time completed trades with additional details"""
+    """
+    API to get all-time completed trades with additional details, newest first.
+    Pages are keyset-paginated (follow `next`); `?stream=true` streams every
+    trade as one JSON document for full exports.
+    """
     permission_classes = [AllowAny]
+    pagination_class = CompletedTradesPagination
+    stream_batch_size = 200
 
-    def get(self, request, *args, **kwargs):
-        cache_key = "completed_trades_v1"  # Versioning to avoid stale cache
-        cached_data = cache.get(cache_key)
-
-        if cached_data:
-            return Response(cached_data, status=200)
+    def get_queryset(self):
+        return Trade.objects.filter(status="COMPLETED").only("id", "created_at")
 
+    def get(self, request, *args, **kwargs):
         try:
-            # Optimized Query - Fetch only necessary fields
-            completed_trades = (
-                Trade.objects.filter(status="COMPLETED")
-                .select_related("analysis")  # Use select_related for single FK
-                .prefetch_related("history")  # Prefetch for ManyToMany or Reverse FK
-            )
-            
-            completed_trades_data = TradeSerializers(completed_trades, many=True).data
+            if request.query_params.get("stream", "").lower() == "true":
+                return self.stream()
 
-            response_data = {
-                "total_completed_trades": completed_trades.count(),
-                "completed_trades": completed_trades_data,
-            }
+            # Not cached as a whole page: the trades come from cached fragments
+            return Response(self.get_page(request), status=200)
 
-            # Cache result for 5 minutes
-            cache.set(cache_key, response_data, timeout=300)
-            return Response(response_data, status=200)
-        
+        except NotFound:
+            raise
         except Exception as e:
             logger.error(f"Error fetching completed trades: {str(e)}", exc_info=True)
             return Response({"error": "Internal Server Error"}, status=500)
+
+    def get_page(self, request):
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(self.get_queryset(), request, view=self)
+        return {
+            "total_completed_trades": trade_statistics()["total_trades"],
+            "next": paginator.get_next_link(),
+            "completed_trades": get_completed_trade_fragments([trade.id for trade in page]),
+        }
+
+    def stream(self):
+        total = trade_statistics()["total_trades"]
+        ids = self.get_queryset().order_by("-created_at", "-id").values_list("id", flat=True)
+        encoder = JSONEncoder()
+
+        def batches():
+            batch = []
+            for trade_id in ids.iterator(chunk_size=self.stream_batch_size):
+                batch.append(trade_id)
+                if len(batch) == self.stream_batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
+        def chunks():
+            yield '{"total_completed_trades": %d, "completed_trades": [' % total
+            separator = ''
+            for batch in batches():
+                for fragment in get_completed_trade_fragments(batch):
+                    yield separator + encoder.encode(fragment)
+                    separator = ','
+            yield ']}'
+
+        return StreamingHttpResponse(chunks(), content_type="application/json")
@@ -0,0 +1,39 @@
+from django.db.models import Count
+from core.cache_layer import get_or_compute, invalidate
+from apps.users.models import User
+from apps.institutions.models import Institution
+from apps.subscriptions.models import Subscription
+
+ADMIN_COUNTERS_KEY = 'admin_counters'
+
+
+def invalidate_admin_counters():
+    invalidate(ADMIN_COUNTERS_KEY)
+
+
+def compute_admin_counters():
+    """
+    User counts per type, overall and active only, from one grouped query,
+    plus the institution and active subscription totals.
+    """
+    by_type = dict.fromkeys(User.UserType.values, 0)
+    active_by_type = dict.fromkeys(User.UserType.values, 0)
+    for row in User.objects.order_by().values('user_type', 'is_active').annotate(count=Count('id')):
+        by_type[row['user_type']] = by_type.get(row['user_type'], 0) + row['count']
+        if row['is_active']:
+            active_by_type[row['user_type']] = active_by_type.get(row['user_type'], 0) + row['count']
+
+    return {
+        'users': {
+            'total': sum(by_type.values()),
+            'by_type': by_type,
+            'active_by_type': active_by_type,
+        },
+        'institutions': Institution.objects.count(),
+        'active_subscriptions': Subscription.objects.filter(is_active=True).count(),
+    }
+
+
+def admin_counters():
+    """The counters behind every admin dashboard, rebuilt after user, institution or subscription writes."""
+    return get_or_compute(ADMIN_COUNTERS_KEY, compute_admin_counters)
@@ -0,0 +1,16 @@
+# Generated by Django 5.1.4 on 2026-10-19 07:08
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='UserDailyRollup',
+        ),
+    ]
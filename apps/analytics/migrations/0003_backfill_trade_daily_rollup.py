@@ -0,0 +1,32 @@
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def backfill_trade_daily_rollup(apps, schema_editor):
+    # Same aggregation as rollups.rebuild_rollups(), over the historical models
+    Trade = apps.get_model('trades', 'Trade')
+    TradeDailyRollup = apps.get_model('analytics', 'TradeDailyRollup')
+
+    TradeDailyRollup.objects.all().delete()
+    TradeDailyRollup.objects.bulk_create([
+        TradeDailyRollup(**row) for row in Trade.objects.order_by().annotate(day=TruncDate('created_at')).values(
+            'day', 'status', 'trade_type', 'plan_type'
+        ).annotate(count=Count('id'))
+    ], batch_size=1000)
+
+
+def clear_trade_daily_rollup(apps, schema_editor):
+    apps.get_model('analytics', 'TradeDailyRollup').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_delete_userdailyrollup'),
+        ('trades', '0022_populate_company_trade_summaries'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_trade_daily_rollup, clear_trade_daily_rollup),
+    ]
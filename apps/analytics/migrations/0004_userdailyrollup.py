@@ -0,0 +1,39 @@
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def backfill_user_daily_rollup(apps, schema_editor):
+    # Same aggregation as rollups.rebuild_rollups(), over the historical models
+    User = apps.get_model('users', 'User')
+    UserDailyRollup = apps.get_model('analytics', 'UserDailyRollup')
+
+    UserDailyRollup.objects.bulk_create([
+        UserDailyRollup(**row) for row in User.objects.order_by().annotate(day=TruncDate('created_at')).values(
+            'day', 'user_type'
+        ).annotate(count=Count('id'))
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_backfill_trade_daily_rollup'),
+        ('users', '0003_alter_loginattempt_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('user_type', models.CharField(max_length=10)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'user_type'), name='unique_user_daily_rollup')],
+            },
+        ),
+        migrations.RunPython(backfill_user_daily_rollup, migrations.RunPython.noop),
+    ]
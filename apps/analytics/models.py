@@ -1,3 +1,42 @@
 from django.db import models
 
 # Create your models here.
+
+
+class TradeDailyRollup(models.Model):
+    """
+    Number of trades created on `day` (local date of created_at) that are
+    currently in this status/type/plan. Kept in step by the analytics
+    signals; `manage.py backfill_analytics_rollups` rebuilds it.
+    """
+    day = models.DateField()
+    status = models.CharField(max_length=20)
+    trade_type = models.CharField(max_length=20)
+    plan_type = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'status', 'trade_type', 'plan_type'],
+                name='unique_trade_daily_rollup'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.status}/{self.trade_type}/{self.plan_type}: {self.count}"
+
+
+class UserDailyRollup(models.Model):
+    """Number of users who joined on `day` and currently have this user_type."""
+    day = models.DateField()
+    user_type = models.CharField(max_length=10)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'user_type'], name='unique_user_daily_rollup')
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.user_type}: {self.count}"
@@ -0,0 +1,213 @@
+import logging
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from apps.trades.models import Trade, TradeHistory
+from apps.indexAndCommodity.models import (
+    Trade as IndexTrade, TradeHistory as IndexTradeHistory
+)
+from apps.accuracy.models import Accuracy, AccuracyOfIndexAndCommodity
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = ('plan_type', 'trade_type', 'instrument_type', 'month')
+HOLDING_PERCENTILES = (25, 50, 75, 90)
+# Lower edges of the holding-period histogram buckets, in days
+HOLDING_BUCKETS = (0, 1, 2, 6, 21)
+HOLDING_LABELS = ('0', '1', '2-5', '6-20', '21+')
+
+
+def plan_ratios(buy, target, sl):
+    """
+    Vectorized counterparts of TradeHistory.risk_reward_ratio,
+    potential_profit_percentage and stop_loss_percentage over price arrays.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        risk = np.abs(buy - sl)
+        risk_reward = np.where(risk > 0, np.abs(target - buy) / risk, np.nan)
+        profit_percentage = np.abs((target - buy) / buy * 100)
+        stop_loss_percentage = np.abs((buy - sl) / buy * 100)
+    return risk_reward, profit_percentage, stop_loss_percentage
+
+
+def _prices(values):
+    return np.array(values, dtype=float)
+
+
+def _local_times(values):
+    return pd.to_datetime(list(values), utc=True).tz_convert(settings.TIME_ZONE).tz_localize(None).to_numpy()
+
+
+def _latest_per_trade(trade_ids, rows):
+    """
+    Align the last of each trade's `rows` (sorted by trade id, then time)
+    with `trade_ids`. Returns one float column per value column, NaN where
+    a trade has no row.
+    """
+    columns = [np.full(len(trade_ids), np.nan) for _ in range(len(rows[0]) - 1 if rows else 0)]
+    if not rows:
+        return columns
+    row_trade_ids, *values = zip(*rows)
+    row_trade_ids = np.array(row_trade_ids, dtype='int64')
+    last = np.r_[row_trade_ids[1:] != row_trade_ids[:-1], True]
+    latest_ids = row_trade_ids[last]
+
+    positions = np.clip(np.searchsorted(latest_ids, trade_ids), 0, len(latest_ids) - 1)
+    found = latest_ids[positions] == trade_ids
+    for column, value in zip(columns, values):
+        column[found] = _prices(value)[last][positions[found]]
+    return columns
+
+
+def _load_source(trades, instrument_field, histories, accuracies, has_target_hit):
+    rows = list(trades.filter(status='COMPLETED').annotate(
+        instrument_type=F(instrument_field), finished_at=Coalesce('completed_at', 'updated_at')
+    ).order_by('id').values_list('id', 'plan_type', 'trade_type', 'instrument_type', 'created_at', 'finished_at'))
+    if not rows:
+        return None
+    trade_ids, plan_types, trade_types, instrument_types, created, finished = zip(*rows)
+    trade_ids = np.array(trade_ids, dtype='int64')
+
+    buy, target, sl = _latest_per_trade(trade_ids, list(
+        histories.filter(trade__status='COMPLETED').order_by('trade_id', 'timestamp', 'id')
+        .values_list('trade_id', 'buy', 'target', 'sl')
+    ))
+    accuracy_fields = ('trade_id', 'exit_price', 'target_hit') if has_target_hit else ('trade_id', 'exit_price')
+    exit_price, *target_hit = _latest_per_trade(trade_ids, list(
+        accuracies.filter(trade__status='COMPLETED').order_by('trade_id', 'created_at', 'id')
+        .values_list(*accuracy_fields)
+    ))
+    if target_hit:
+        hit = target_hit[0]
+    else:
+        # Index/commodity accuracy only records the exit, so a hit is an exit at or above target
+        with np.errstate(invalid='ignore'):
+            hit = np.where(np.isnan(exit_price) | np.isnan(target), np.nan, exit_price >= target)
+
+    finished = _local_times(finished)
+    return {
+        'plan_type': np.array(plan_types),
+        'trade_type': np.array(trade_types),
+        'instrument_type': np.array(instrument_types),
+        'month': np.datetime_as_string(finished.astype('datetime64[M]')),
+        'holding_days': ((finished - _local_times(created)) // np.timedelta64(1, 'D')).astype(float),
+        'buy': buy,
+        'target': target,
+        'sl': sl,
+        'exit_price': exit_price,
+        'hit': hit.astype(float),
+    }
+
+
+def _round(value):
+    return None if np.isnan(value) else round(float(value), 2)
+
+
+class TradePerformance:
+    """
+    Completed stock and index/commodity trades as parallel NumPy columns:
+    dimensions, holding period, the latest planned buy/target/sl and the
+    latest exit. Every metric for every group is computed in one
+    vectorized pass per dimension.
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.size = len(columns['holding_days'])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            buy, target, sl, exit_price = (columns[name] for name in ('buy', 'target', 'sl', 'exit_price'))
+            self.planned_risk_reward = plan_ratios(buy, target, sl)[0]
+            risk = buy - sl
+            self.realized_risk_reward = np.where(risk > 0, (exit_price - buy) / risk, np.nan)
+            self.returns = (exit_price - buy) / buy * 100
+
+    @classmethod
+    def from_database(cls):
+        sources = [
+            _load_source(Trade.objects.all(), 'company__instrument_type', TradeHistory.objects.all(),
+                         Accuracy.objects.all(), has_target_hit=True),
+            _load_source(IndexTrade.objects.all(), 'index_and_commodity__instrumentName',
+                         IndexTradeHistory.objects.all(), AccuracyOfIndexAndCommodity.objects.all(),
+                         has_target_hit=False),
+        ]
+        sources = [source for source in sources if source]
+        if not sources:
+            return cls({name: np.array([]) for name in DIMENSIONS + (
+                'holding_days', 'buy', 'target', 'sl', 'exit_price', 'hit'
+            )})
+        return cls({name: np.concatenate([source[name] for source in sources]) for name in sources[0]})
+
+    def _grouped_mean(self, codes, groups, values):
+        valid = ~np.isnan(values)
+        sums = np.bincount(codes[valid], weights=values[valid], minlength=groups)
+        counts = np.bincount(codes[valid], minlength=groups)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return sums / counts
+
+    def _grouped_percentiles(self, codes, groups, values):
+        """Linear-interpolation percentiles per group from one sort of (group, value)."""
+        valid = ~np.isnan(values)
+        codes, values = codes[valid], values[valid]
+        values = values[np.lexsort((values, codes))]
+        counts = np.bincount(codes, minlength=groups)
+        starts = np.cumsum(counts) - counts
+        result = {}
+        for percentile in HOLDING_PERCENTILES:
+            position = starts + (counts - 1).clip(min=0) * percentile / 100
+            lower = np.floor(position).astype(int).clip(max=max(len(values) - 1, 0))
+            upper = np.ceil(position).astype(int).clip(max=max(len(values) - 1, 0))
+            if len(values):
+                interpolated = values[lower] + (values[upper] - values[lower]) * (position - lower)
+            else:
+                interpolated = np.zeros(groups)
+            result[f"p{percentile}"] = np.where(counts > 0, interpolated, np.nan)
+        return result
+
+    def _summaries(self, codes, groups):
+        holding = self.columns['holding_days']
+        metrics = {
+            'hit_rate': self._grouped_mean(codes, groups, self.columns['hit']) * 100,
+            'average_return': self._grouped_mean(codes, groups, self.returns),
+            'planned_risk_reward': self._grouped_mean(codes, groups, self.planned_risk_reward),
+            'realized_risk_reward': self._grouped_mean(codes, groups, self.realized_risk_reward),
+            'average_holding_days': self._grouped_mean(codes, groups, holding),
+        }
+        percentiles = self._grouped_percentiles(codes, groups, holding)
+        buckets = (np.digitize(holding, HOLDING_BUCKETS) - 1).clip(min=0)
+        histogram = np.bincount(
+            codes * len(HOLDING_BUCKETS) + buckets, minlength=groups * len(HOLDING_BUCKETS)
+        ).reshape(groups, len(HOLDING_BUCKETS))
+        counts = np.bincount(codes, minlength=groups)
+
+        return [
+            dict(
+                {'trades': int(counts[group])},
+                **{name: _round(values[group]) for name, values in metrics.items()},
+                holding_period=dict(
+                    {name: _round(values[group]) for name, values in percentiles.items()},
+                    distribution=dict(zip(HOLDING_LABELS, histogram[group].tolist()))
+                )
+            )
+            for group in range(groups)
+        ]
+
+    def overall(self):
+        return self._summaries(np.zeros(self.size, dtype=int), 1)[0]
+
+    def breakdown(self, dimension):
+        labels, codes = np.unique(self.columns[dimension], return_inverse=True)
+        return dict(zip((str(label) for label in labels), self._summaries(codes.ravel(), len(labels))))
+
+    def report(self):
+        return dict(
+            {'overall': self.overall()},
+            **{f"by_{dimension}": self.breakdown(dimension) for dimension in DIMENSIONS}
+        )
+
+
+def trade_performance_report():
+    performance = TradePerformance.from_database()
+    logger.info(f"Computed trade performance over {performance.size} completed trades")
+    return performance.report()
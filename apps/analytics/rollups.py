@@ -0,0 +1,94 @@
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from core.rollups import bump_counters
+from .models import TradeDailyRollup, UserDailyRollup
+
+
+def trade_bucket(trade, **overrides):
+    bucket = {
+        'day': timezone.localdate(trade.created_at),
+        'status': trade.status,
+        'trade_type': trade.trade_type,
+        'plan_type': trade.plan_type,
+    }
+    bucket.update(overrides)
+    return bucket
+
+
+def record_trade_change(trade, created=False, deleted=False):
+    """Move one trade between rollup buckets after a save or delete."""
+    if created or deleted:
+        bump_counters(TradeDailyRollup, {'count': -1 if deleted else 1}, **trade_bucket(trade))
+        return
+
+    changed = {
+        field: trade.tracker.previous(field)
+        for field in ('status', 'trade_type', 'plan_type')
+        if trade.tracker.has_changed(field)
+    }
+    if changed:
+        bump_counters(TradeDailyRollup, {'count': -1}, **trade_bucket(trade, **changed))
+        bump_counters(TradeDailyRollup, {'count': 1}, **trade_bucket(trade))
+
+
+def record_user_change(user, created=False, deleted=False):
+    """Move one user between rollup buckets after a save or delete."""
+    bucket = {'day': timezone.localdate(user.created_at), 'user_type': user.user_type}
+    if created or deleted:
+        bump_counters(UserDailyRollup, {'count': -1 if deleted else 1}, **bucket)
+    elif user.tracker.has_changed('user_type'):
+        bump_counters(UserDailyRollup, {'count': -1}, **dict(bucket, user_type=user.tracker.previous('user_type')))
+        bump_counters(UserDailyRollup, {'count': 1}, **bucket)
+
+
+@transaction.atomic
+def rebuild_rollups(since=None):
+    """Recompute both rollup tables (from `since` onwards) from the base tables."""
+    from apps.trades.models import Trade
+    from apps.users.models import User
+
+    trades = Trade.objects.all()
+    users = User.objects.all()
+    if since:
+        trades = trades.filter(created_at__date__gte=since)
+        users = users.filter(created_at__date__gte=since)
+        TradeDailyRollup.objects.filter(day__gte=since).delete()
+        UserDailyRollup.objects.filter(day__gte=since).delete()
+    else:
+        TradeDailyRollup.objects.all().delete()
+        UserDailyRollup.objects.all().delete()
+
+    trade_rows = TradeDailyRollup.objects.bulk_create([
+        TradeDailyRollup(**row) for row in trades.order_by().annotate(day=TruncDate('created_at')).values(
+            'day', 'status', 'trade_type', 'plan_type'
+        ).annotate(count=Count('id'))
+    ])
+    user_rows = UserDailyRollup.objects.bulk_create([
+        UserDailyRollup(**row) for row in users.order_by().annotate(day=TruncDate('created_at')).values(
+            'day', 'user_type'
+        ).annotate(count=Count('id'))
+    ])
+    return len(trade_rows), len(user_rows)
+
+
+def trade_counts_by_status():
+    return {
+        row['status']: row['total']
+        for row in TradeDailyRollup.objects.values('status').annotate(total=Sum('count'))
+    }
+
+
+def trade_counts_by_day(start_date, end_date):
+    return list(
+        TradeDailyRollup.objects.filter(day__gte=start_date, day__lte=end_date)
+        .values('day').annotate(trade_count=Sum('count')).filter(trade_count__gt=0).order_by('day')
+    )
+
+
+def user_counts_by_type():
+    return {
+        row['user_type']: row['total']
+        for row in UserDailyRollup.objects.values('user_type').annotate(total=Sum('count'))
+    }
@@ -0,0 +1,54 @@
+import logging
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.trades.models import Trade
+from apps.users.models import User
+from apps.institutions.models import Institution
+from apps.subscriptions.models import Subscription
+from .rollups import record_trade_change, record_user_change
+from .counters import invalidate_admin_counters
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=Trade)
+def update_trade_rollup(sender, instance, created, **kwargs):
+    try:
+        record_trade_change(instance, created=created)
+    except Exception as e:
+        logger.error(f"Error updating trade rollup for trade {instance.pk}: {str(e)}")
+
+
+@receiver(post_delete, sender=Trade)
+def remove_trade_from_rollup(sender, instance, **kwargs):
+    try:
+        record_trade_change(instance, deleted=True)
+    except Exception as e:
+        logger.error(f"Error updating trade rollup for deleted trade {instance.pk}: {str(e)}")
+
+
+@receiver(post_save, sender=User)
+def update_user_rollup(sender, instance, created, **kwargs):
+    try:
+        record_user_change(instance, created=created)
+    except Exception as e:
+        logger.error(f"Error updating user rollup for user {instance.pk}: {str(e)}")
+
+
+@receiver(post_delete, sender=User)
+def remove_user_from_rollup(sender, instance, **kwargs):
+    try:
+        record_user_change(instance, deleted=True)
+    except Exception as e:
+        logger.error(f"Error updating user rollup for deleted user {instance.pk}: {str(e)}")
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=Institution)
+@receiver(post_delete, sender=Institution)
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def drop_admin_counters(sender, **kwargs):
+    transaction.on_commit(invalidate_admin_counters)
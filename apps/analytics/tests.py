@@ -1,3 +1,210 @@
+import io
+from importlib import import_module
+from django.apps import apps as app_registry
 from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from datetime import timedelta
+from decimal import Decimal
+from django.urls import reverse
+from rest_framework.test import APIClient
+from apps.trades.models import Company, Trade, TradeHistory
+from apps.accuracy.models import Accuracy, AccuracyOfIndexAndCommodity
+from apps.indexAndCommodity.models import IndexAndCommodity, Trade as IndexTrade, TradeHistory as IndexTradeHistory
+from .models import TradeDailyRollup, UserDailyRollup
+from .views import DashboardAnalyticsView
+from .performance import TradePerformance, plan_ratios
+from apps.institutions.models import Institution
 
 # Create your tests here.
+
+
+class AnalyticsRollupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            phone_number='+919876543210', email='staff@example.com', password='pass', is_staff=True
+        )
+        self.company = Company.objects.create(
+            token_id=1, exchange='NSE', trading_symbol='SBIN', script_name='SBIN', display_name='SBI'
+        )
+
+    def rollup_snapshot(self):
+        return (
+            sorted(TradeDailyRollup.objects.filter(count__gt=0).values_list(
+                'day', 'status', 'trade_type', 'plan_type', 'count'
+            )),
+            sorted(UserDailyRollup.objects.filter(count__gt=0).values_list('day', 'user_type', 'count')),
+        )
+
+    def test_signals_keep_rollups_equal_to_a_backfill(self):
+        intraday = Trade.objects.create(company=self.company, user=self.user, trade_type='INTRADAY', status='ACTIVE')
+        positional = Trade.objects.create(company=self.company, user=self.user, trade_type='POSITIONAL', status='ACTIVE')
+        intraday.status = 'COMPLETED'
+        intraday.plan_type = 'PREMIUM'
+        intraday.save()
+        positional.delete()
+        self.user.user_type = get_user_model().UserType.B2B_ADMIN
+        self.user.save()
+
+        incremental = self.rollup_snapshot()
+        call_command('backfill_analytics_rollups', stdout=io.StringIO())
+        self.assertEqual(self.rollup_snapshot(), incremental)
+        self.assertEqual(incremental, (
+            [(timezone.localdate(), 'COMPLETED', 'INTRADAY', 'PREMIUM', 1)],
+            [(timezone.localdate(), 'B2B_ADMIN', 1)],
+        ))
+
+    def test_migrations_backfill_rows_from_before_the_rollups(self):
+        Trade.objects.create(company=self.company, user=self.user, trade_type='INTRADAY', status='ACTIVE')
+        Trade.objects.create(company=self.company, user=self.user, trade_type='INTRADAY', status='ACTIVE')
+        incremental = self.rollup_snapshot()
+        TradeDailyRollup.objects.all().delete()
+        UserDailyRollup.objects.all().delete()
+
+        import_module('apps.analytics.migrations.0003_backfill_trade_daily_rollup').backfill_trade_daily_rollup(
+            app_registry, None
+        )
+        import_module('apps.analytics.migrations.0004_userdailyrollup').backfill_user_daily_rollup(app_registry, None)
+        self.assertEqual(self.rollup_snapshot(), incremental)
+        self.assertEqual(incremental, (
+            [(timezone.localdate(), 'ACTIVE', 'INTRADAY', 'BASIC', 2)],
+            [(timezone.localdate(), 'B2C', 1)],
+        ))
+
+    def test_dashboard_reads_rollups(self):
+        for status in ('ACTIVE', 'COMPLETED', 'CANCELLED'):
+            Trade.objects.create(company=self.company, user=self.user, trade_type='INTRADAY', status=status)
+
+        view = DashboardAnalyticsView()
+        with CaptureQueriesContext(connection) as queries:
+            analytics = view.get_trade_analytics()
+            series = view.get_time_series_data()
+            metrics = view.get_user_metrics()
+        self.assertFalse(any(
+            '"trades_trade"' in query['sql'] or '"users_user"' in query['sql'] for query in queries.captured_queries
+        ))
+        self.assertEqual(
+            (analytics['total_trades'], analytics['active_trades'], analytics['cancelled_trades']), (3, 1, 1)
+        )
+        self.assertEqual(series, [{'date': timezone.localdate(), 'trade_count': 3}])
+        self.assertEqual((metrics['b2c_users'], metrics['total_users']), (1, 1))
+
+
+
+class AdminCountersTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.staff = User.objects.create_user(
+            phone_number='+919876543210', email='staff@example.com', password='pass', is_staff=True,
+            user_type=User.UserType.ADMIN
+        )
+        admin = User.objects.create_user(
+            phone_number='+919876543211', email='admin@example.com', password='pass',
+            user_type=User.UserType.B2B_ADMIN
+        )
+        User.objects.create_user(
+            phone_number='+919876543212', email='member@example.com', password='pass',
+            user_type=User.UserType.B2B_USER
+        )
+        User.objects.create_user(phone_number='+919876543213', email='retail@example.com', password='pass')
+        Institution.objects.create(
+            name='Institute', admin=admin, contact_email='institute@example.com', contact_phone='+919876543214'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.staff)
+
+    def test_admin_dashboards_share_one_counter_snapshot(self):
+        with CaptureQueriesContext(connection) as queries:
+            dashboard = self.client.get(reverse('admin-dashboard')).json()
+            user_stats = self.client.get(reverse('user-stats')).json()
+            institution_stats = self.client.get(reverse('institution-stats')).json()
+            metrics = DashboardAnalyticsView().get_user_metrics()
+        self.assertEqual(len([q for q in queries.captured_queries if '"users_user"' in q['sql']]), 1)
+        self.assertEqual(dashboard, {'total_users': 4, 'total_institutions': 1, 'active_subscriptions': 0})
+        self.assertEqual(user_stats, {'totalUsers': 3, 'b2bAdmins': 1, 'b2bUsers': 1, 'b2cUsers': 1})
+        self.assertEqual(institution_stats, {'total_institutions': 1, 'total_users': 1, 'active_admins': 1})
+        self.assertEqual(metrics, {'b2b_users': 1, 'b2b_admins': 1, 'b2c_users': 1, 'total_users': 4})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            get_user_model().objects.filter(email='admin@example.com').get().delete()
+        self.assertEqual(self.client.get(reverse('institution-stats')).json()['active_admins'], 0)
+
+
+class TradePerformanceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            phone_number='+919876543210', email='staff@example.com', password='pass', is_staff=True
+        )
+        self.company = Company.objects.create(
+            token_id=1, exchange='NSE', trading_symbol='SBIN', script_name='SBIN', display_name='SBI'
+        )
+        self.index = IndexAndCommodity.objects.create(tradingSymbol='NIFTY', exchange='NSE')
+
+    def completed_trade(self, days, buy, target, sl, exit_price, target_hit, **fields):
+        trade = Trade.objects.create(
+            company=self.company, user=self.user, status='ACTIVE', **dict({'trade_type': 'INTRADAY'}, **fields)
+        )
+        TradeHistory.objects.create(trade=trade, buy=buy + 1, target=target + 1, sl=sl + 1)
+        TradeHistory.objects.create(trade=trade, buy=buy, target=target, sl=sl)
+        trade.status = 'COMPLETED'
+        trade.completed_at = trade.created_at + timedelta(days=days)
+        trade.save()
+        Accuracy.objects.create(trade=trade, exit_price=exit_price, target_hit=target_hit)
+        return trade
+
+    def test_report_matches_per_trade_properties(self):
+        self.completed_trade(0, 100, 120, 90, 120, True)
+        self.completed_trade(3, 200, 260, 180, 190, False, trade_type='POSITIONAL', plan_type='PREMIUM')
+        index_trade = IndexTrade.objects.create(
+            index_and_commodity=self.index, user=self.user, trade_type='INTRADAY', status='ACTIVE'
+        )
+        IndexTradeHistory.objects.create(trade=index_trade, buy=50, target=60, sl=45)
+        index_trade.status = 'COMPLETED'
+        index_trade.save()
+        AccuracyOfIndexAndCommodity.objects.create(trade=index_trade, exit_price=Decimal('61'))
+
+        report = TradePerformance.from_database().report()
+        overall = report['overall']
+        self.assertEqual(overall['trades'], 3)
+        self.assertEqual(overall['hit_rate'], 66.67)
+        # Returns of +20%, -5% and +22%
+        self.assertEqual(overall['average_return'], 12.33)
+        self.assertEqual(overall['planned_risk_reward'], 2.33)
+        self.assertEqual(overall['holding_period']['distribution'], {'0': 2, '1': 0, '2-5': 1, '6-20': 0, '21+': 0})
+        self.assertEqual(overall['holding_period']['p50'], 0.0)
+        self.assertEqual(report['by_plan_type']['PREMIUM']['realized_risk_reward'], -0.5)
+        self.assertEqual(report['by_instrument_type']['INDEX']['hit_rate'], 100.0)
+        self.assertEqual(list(report['by_month']), [timezone.localdate().strftime('%Y-%m')])
+
+        history = TradeHistory.objects.filter(trade__trade_type='POSITIONAL').earliest()
+        ratios = plan_ratios(*(float(getattr(history, field)) for field in ('buy', 'target', 'sl')))
+        self.assertEqual(
+            [round(float(value), 4) for value in ratios],
+            [round(float(value), 4) for value in (
+                history.risk_reward_ratio, history.potential_profit_percentage, history.stop_loss_percentage
+            )]
+        )
+
+    def test_view_is_cached_until_accuracy_changes(self):
+        trade = self.completed_trade(1, 100, 120, 90, 95, False)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        url = reverse('trade-performance')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.get(url).json()['overall']['hit_rate'], 0.0)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertFalse(any('"trades_trade"' in query['sql'] for query in queries.captured_queries))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Accuracy.objects.filter(trade=trade).get().delete()
+            Accuracy.objects.create(trade=trade, exit_price=125, target_hit=True)
+        self.assertEqual(self.client.get(url).json()['overall']['hit_rate'], 100.0)
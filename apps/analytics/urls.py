@@ -1,7 +1,7 @@
 from django.urls import path
 from .views import (
     DashboardAnalyticsView, TradeAnalyticsView,
-    TimeSeriesAnalyticsView, RecentTradesView, UserMetricsView
+    TimeSeriesAnalyticsView, RecentTradesView, UserMetricsView, TradePerformanceView
 )
 
 urlpatterns = [
@@ -10,4 +10,5 @@ urlpatterns = [
     # path('time-series/', TimeSeriesAnalyticsView.as_view(), name='time-series-analytics'),
     # path('recent-trades/', RecentTradesView.as_view(), name='recent-trades'),
     # path('user-metrics/', UserMetricsView.as_view(), name='user-metrics'),
+    path('performance/', TradePerformanceView.as_view(), name='trade-performance'),
 ]
\ No newline at end of file
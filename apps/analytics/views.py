@@ -2,8 +2,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAdminUser
 from django.utils import timezone
-from django.db.models import Count, Avg, Q
-from django.core.cache import cache
+from django.db.models import Avg
 from datetime import timedelta
 from .serializers import (
     TradeAnalyticsSerializer, TimeSeriesDataSerializer,
@@ -11,6 +10,13 @@ from .serializers import (
 )
 from ..trades.models import Trade, TradeHistory, Analysis, Insight
 from ..users.models import User
+from .rollups import trade_counts_by_status, trade_counts_by_day, user_counts_by_type
+from .performance import trade_performance_report
+from core.conditional import TRADES_GENERATION, INDEX_TRADES_GENERATION
+from core.response_cache import cache_response
+from core.cache_layer import get_or_compute, plan_tag
+
+ALL_PLAN_TAGS = [plan_tag(plan) for plan in Trade.PlanType.values]
 
 class DashboardAnalyticsView(APIView):
     # permission_classes = [IsAdminUser]
@@ -27,51 +33,36 @@ class DashboardAnalyticsView(APIView):
         })
 
     def get_trade_analytics(self):
-        cache_key = 'trade_analytics'
-        cached_data = cache.get(cache_key)
-
-        if cached_data:
-            return cached_data
+        return get_or_compute('trade_analytics', self.compute_trade_analytics, soft_ttl=60 * 60, tags=ALL_PLAN_TAGS)
 
+    def compute_trade_analytics(self):
+        # Read from the daily rollup instead of counting the trades table per status
+        by_status = trade_counts_by_status()
         analytics = {
-            'total_trades': Trade.objects.count(),
-            'active_trades': Trade.objects.filter(status='ACTIVE').count(),
-            'completed_trades': Trade.objects.filter(status='COMPLETED').count(),
-            'cancelled_trades': Trade.objects.filter(status='CANCELLED').count(),
+            'total_trades': sum(by_status.values()),
+            'active_trades': by_status.get('ACTIVE', 0),
+            'completed_trades': by_status.get('COMPLETED', 0),
+            'cancelled_trades': by_status.get('CANCELLED', 0),
             'average_accuracy': Insight.objects.filter(
                 accuracy_score__isnull=False
             ).aggregate(Avg('accuracy_score'))['accuracy_score__avg'] or 0
         }
-
-        cache.set(cache_key, analytics, 300)  # Cache for 5 minutes
         return analytics
 
     def get_time_series_data(self):
-        cache_key = 'trade_time_series'
-        cached_data = cache.get(cache_key)
-
-        if cached_data:
-            return cached_data
+        return get_or_compute('trade_time_series', self.compute_time_series_data, tags=ALL_PLAN_TAGS)
 
-        end_date = timezone.now()
+    def compute_time_series_data(self):
+        end_date = timezone.localdate()
         start_date = end_date - timedelta(days=30)
-        
-        trades = Trade.objects.filter(
-            created_at__date__gte=start_date,
-            created_at__date__lte=end_date
-        ).values('created_at__date').annotate(
-            trade_count=Count('id')
-        ).order_by('created_at__date')
 
         data = [
             {
-                'date': item['created_at__date'],
+                'date': item['day'],
                 'trade_count': item['trade_count']
             }
-            for item in trades
+            for item in trade_counts_by_day(start_date, end_date)
         ]
-
-        cache.set(cache_key, data, 300)  # Cache for 5 minutes
         return data
 
     def get_recent_trades(self):
@@ -81,20 +72,14 @@ class DashboardAnalyticsView(APIView):
         return trades
 
     def get_user_metrics(self):
-        cache_key = 'user_metrics'
-        cached_data = cache.get(cache_key)
-
-        if cached_data:
-            return cached_data
-
+        # Read from the daily rollup instead of counting the users table per type
+        by_type = user_counts_by_type()
         metrics = {
-            'b2b_users': User.objects.filter(user_type=User.UserType.B2B_USER).count(),
-            'b2b_admins': User.objects.filter(user_type=User.UserType.B2B_ADMIN).count(),
-            'b2c_users': User.objects.filter(user_type=User.UserType.B2C).count(),
-            'total_users': User.objects.count()
+            'b2b_users': by_type.get(User.UserType.B2B_USER, 0),
+            'b2b_admins': by_type.get(User.UserType.B2B_ADMIN, 0),
+            'b2c_users': by_type.get(User.UserType.B2C, 0),
+            'total_users': sum(by_type.values())
         }
-
-        cache.set(cache_key, metrics, 300)  # Cache for 5 minutes
         return metrics
 
 class TradeAnalyticsView(APIView):
@@ -139,4 +124,18 @@ class UserMetricsView(APIView):
         """
         metrics = DashboardAnalyticsView().get_user_metrics()
         serializer = UserTypeMetricsSerializer(metrics)
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
+
+class TradePerformanceView(APIView):
+    permission_classes = [IsAdminUser]
+
+    @cache_response(
+        'analytics.trade_performance', generations=(TRADES_GENERATION, INDEX_TRADES_GENERATION), vary_on_plan=False
+    )
+    def get(self, request):
+        """
+        Hit rate, average return, planned vs realized risk/reward and holding
+        periods of completed trades, overall and per plan, trade type,
+        instrument type and month
+        """
+        return Response(trade_performance_report())
@@ -5,6 +5,7 @@ from django.utils import timezone
 from django.core.cache import cache
 from .models import Trade, Analysis, TradeHistory, Insight
 from apps.subscriptions.models import Subscription
+from core.cache_layer import aget_or_compute, get_value, set_value
 import json
 import logging
 import asyncio
@@ -32,10 +33,13 @@ class IndexAndCommodityUpdateManager:
     CACHE_TIMEOUT = 300  # Cache duration in seconds (5 minutes)
 
     @staticmethod
-    async def get_cached_trades(cache_key: str) -> Optional[Dict]:
-        """Retrieve cached trade data asynchronously."""
+    async def get_cached_trades(cache_key: str, fetch=None) -> Optional[Dict]:
+        """Retrieve cached trade data asynchronously, refreshing it through `fetch` if given."""
         try:
-            return await database_sync_to_async(cache.get)(cache_key)
+            if fetch is not None:
+                return await aget_or_compute(cache_key, fetch, soft_ttl=IndexAndCommodityUpdateManager.CACHE_TIMEOUT)
+            entry = await database_sync_to_async(get_value)(cache_key)
+            return entry.value if entry else None
         except Exception as e:
             logger.error(f"Failed to get cached trades: {str(e)}")
             return None
@@ -43,10 +47,7 @@ class IndexAndCommodityUpdateManager:
     @staticmethod
     async def set_cached_trades(cache_key: str, data: Dict):
         """Store trade data in the cache asynchronously."""
-        try:
-            await database_sync_to_async(cache.set)(cache_key, data, IndexAndCommodityUpdateManager.CACHE_TIMEOUT)
-        except Exception as e:
-            logger.error(f"Failed to set cached trades: {str(e)}")
+        await database_sync_to_async(set_value)(cache_key, data, IndexAndCommodityUpdateManager.CACHE_TIMEOUT)
 
     @staticmethod
     def get_plan_levels(plan_type: str) -> List[str]:
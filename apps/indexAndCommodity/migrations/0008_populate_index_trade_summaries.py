@@ -0,0 +1,42 @@
+from django.db import migrations
+
+# Frozen copies of trade_summaries.PLAN_RANKS / VISIBLE_STATUSES
+PLAN_RANKS = {'BASIC': 1, 'PREMIUM': 2, 'SUPER_PREMIUM': 3, 'FREE_TRIAL': 3}
+VISIBLE_STATUSES = ('ACTIVE', 'COMPLETED')
+
+
+def populate_index_trade_summaries(apps, schema_editor):
+    """Seed the list flags of existing index/commodity trades, as trades.0022 does for companies."""
+    Trade = apps.get_model('indexAndCommodity', 'Trade')
+    IndexAndCommodityTradeSummary = apps.get_model('indexAndCommodity', 'IndexAndCommodityTradeSummary')
+
+    rows = {}
+    for index_id, status, trade_type, plan_type, created_at in Trade.objects.order_by().values_list(
+        'index_and_commodity_id', 'status', 'trade_type', 'plan_type', 'created_at'
+    ).iterator(chunk_size=2000):
+        row = rows.setdefault(index_id, IndexAndCommodityTradeSummary(index_and_commodity_id=index_id))
+        if status not in VISIBLE_STATUSES:
+            continue
+        rank = PLAN_RANKS.get(plan_type, 3)
+        row.min_plan_rank = rank if row.min_plan_rank is None else min(row.min_plan_rank, rank)
+        if status == 'COMPLETED':
+            row.has_completed_trade = True
+            continue
+        row.has_active_trade = True
+        if trade_type in ('INTRADAY', 'POSITIONAL') and (
+            row.latest_active_trade_at is None or created_at > row.latest_active_trade_at
+        ):
+            row.latest_active_trade_at = created_at
+
+    IndexAndCommodityTradeSummary.objects.bulk_create(rows.values(), batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('indexAndCommodity', '0007_indexandcommoditytradesummary'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_index_trade_summaries, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
 from django.utils import timezone
@@ -528,4 +529,42 @@ class Insight(models.Model):
             }
         }
         
-        return report
\ No newline at end of file
+        return report
+
+
+class IndexAndCommodityTradeSummary(models.Model):
+    """
+    Read model with one row per index/commodity that has trades, kept up to
+    date by the trade signals (see trade_summaries.py).
+    """
+    index_and_commodity = models.OneToOneField(
+        IndexAndCommodity,
+        on_delete=models.CASCADE,
+        related_name='trade_summary'
+    )
+    summary = models.JSONField(
+        default=dict,
+        encoder=DjangoJSONEncoder,
+        help_text="Pre-serialized trades shown by the grouped trades endpoint"
+    )
+    latest_active_trade_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="created_at of the newest active intraday/positional trade"
+    )
+    has_active_trade = models.BooleanField(default=False)
+    has_completed_trade = models.BooleanField(default=False)
+    min_plan_rank = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        help_text="Lowest plan level (1=BASIC, 2=PREMIUM, 3=SUPER_PREMIUM) among active/completed trades"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['has_active_trade', '-latest_active_trade_at']),
+        ]
+
+    def __str__(self):
+        return f"Trade summary for {self.index_and_commodity}"
@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from ..models import IndexAndCommodity, Trade, Analysis, TradeHistory, Insight
+from apps.trades.serializers.GroupedTradeSerializer import absolute_media_urls
+from ..models import IndexAndCommodity, Trade, Analysis, TradeHistory, Insight, IndexAndCommodityTradeSummary
 
 
 class TradeHistoryDetailSerializer(serializers.ModelSerializer):
@@ -55,21 +56,39 @@ class IndexAndCommodityTradesSerializer(serializers.ModelSerializer):
             'intraday_trade', 'positional_trade', 'created_at', 
         ]
     
+    def _summary(self, obj):
+        # Pre-shaped by trade_summaries.rebuild_index_summary; rows seeded by
+        # the indexAndCommodity.0008 migration only carry the flags until rebuilt
+        try:
+            summary = obj.trade_summary
+        except IndexAndCommodityTradeSummary.DoesNotExist:
+            return None
+        return summary if summary.summary else None
+
     def get_intraday_trade(self, obj):
+        summary = self._summary(obj)
+        if summary:
+            return absolute_media_urls(summary.summary.get('intraday_trade'), self.context.get('request'))
         trade = obj.trades.filter(
             trade_type=Trade.TradeType.INTRADAY,
             status__in=['ACTIVE']
         ).first()
-        return TradeDetailSerializer(trade).data if trade else None
+        return TradeDetailSerializer(trade, context=self.context).data if trade else None
     
     def get_positional_trade(self, obj):
+        summary = self._summary(obj)
+        if summary:
+            return absolute_media_urls(summary.summary.get('positional_trade'), self.context.get('request'))
         trade = obj.trades.filter(
             trade_type=Trade.TradeType.POSITIONAL,
             status__in=['ACTIVE']
         ).first()
-        return TradeDetailSerializer(trade).data if trade else None
+        return TradeDetailSerializer(trade, context=self.context).data if trade else None
     
     def get_created_at(self, obj):
+        summary = self._summary(obj)
+        if summary:
+            return summary.latest_active_trade_at
         # Fetch all active intraday and positional trades
         active_trades = obj.trades.filter(
             status__in=['ACTIVE'],
@@ -1,4 +1,4 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
 from django.utils import timezone
 from django.db import transaction
@@ -6,7 +6,10 @@ from django.contrib.contenttypes.models import ContentType
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 from decimal import Decimal
-from .models import Trade, TradeHistory,Analysis,Insight
+from .models import Trade, TradeHistory,Analysis,Insight, IndexAndCommodity
+from apps.trades.trade_updates.redis_client import publish_trade_event_on_commit
+from .trade_summaries import schedule_index_summary_refresh
+from core.conditional import bump_generation, INDEX_TRADES_GENERATION
 from apps.notifications.models import Notification
 from django.db import DatabaseError
 import logging
@@ -172,6 +175,9 @@ class TradeUpdateBroadcaster:
                     }
                 )
             logger.info("Successfully completed broadcasting trade update")
+
+            # Let SSE streams know something changed
+            publish_trade_event_on_commit('index', trade, "updated")
         except Exception as e:
             logger.error(f"Error broadcasting trade update: {str(e)}")
             logger.error(traceback.format_exc())
@@ -470,4 +476,35 @@ def create_trade_analysis(sender, instance, created, **kwargs):
             logger.info(f"Created analysis and initialized warzone history for trade ID: {instance.id}")
         except Exception as e:
             logger.error(f"Error creating analysis for trade ID: {instance.id}: {str(e)}")
-            logger.error(traceback.format_exc())
\ No newline at end of file
+            logger.error(traceback.format_exc())
+
+
+@receiver(post_save, sender=Trade)
+@receiver(post_delete, sender=Trade)
+def refresh_index_trade_summary(sender, instance, **kwargs):
+    """Keep the IndexAndCommodityTradeSummary row in step with its trades."""
+    schedule_index_summary_refresh(instance.index_and_commodity_id)
+
+
+@receiver(post_save, sender=TradeHistory)
+@receiver(post_delete, sender=TradeHistory)
+@receiver(post_save, sender=Analysis)
+@receiver(post_save, sender=Insight)
+def refresh_index_trade_summary_for_trade(sender, instance, **kwargs):
+    """History, analysis and insight are part of the pre-shaped summary too."""
+    try:
+        schedule_index_summary_refresh(instance.trade.index_and_commodity_id)
+    except Trade.DoesNotExist:
+        pass
+
+
+@receiver(post_save, sender=Trade)
+@receiver(post_delete, sender=Trade)
+@receiver(post_save, sender=TradeHistory)
+@receiver(post_delete, sender=TradeHistory)
+@receiver(post_save, sender=Analysis)
+@receiver(post_save, sender=Insight)
+@receiver(post_save, sender=IndexAndCommodity)
+def bump_index_trades_generation(sender, **kwargs):
+    """Invalidate cached index/commodity trade responses once the write is committed."""
+    transaction.on_commit(lambda: bump_generation(INDEX_TRADES_GENERATION))
@@ -0,0 +1,38 @@
+import logging
+from django.db import transaction
+from apps.trades.trade_summaries import summarize_trades
+from .models import Trade, IndexAndCommodityTradeSummary
+from .serializers.grouped_trades_serializers import TradeDetailSerializer
+
+logger = logging.getLogger(__name__)
+
+
+def rebuild_index_summary(index_and_commodity_id):
+    """Recompute the IndexAndCommodityTradeSummary row of one index/commodity."""
+    trades = list(
+        Trade.objects.filter(index_and_commodity_id=index_and_commodity_id)
+        .select_related('index_and_commodity_analysis', 'index_and_commodity_insight')
+        .prefetch_related('index_and_commodity_history')
+    )
+    if not trades:
+        IndexAndCommodityTradeSummary.objects.filter(index_and_commodity_id=index_and_commodity_id).delete()
+        return None
+
+    summary, _, fields = summarize_trades(trades, TradeDetailSerializer)
+
+    row, _ = IndexAndCommodityTradeSummary.objects.update_or_create(
+        index_and_commodity_id=index_and_commodity_id,
+        defaults={'summary': summary, **fields}
+    )
+    return row
+
+
+def schedule_index_summary_refresh(index_and_commodity_id):
+    """Rebuild the index/commodity's summary once the current transaction commits."""
+    def refresh():
+        try:
+            rebuild_index_summary(index_and_commodity_id)
+        except Exception as e:
+            logger.error(f"Error rebuilding trade summary for index {index_and_commodity_id}: {str(e)}")
+
+    transaction.on_commit(refresh)
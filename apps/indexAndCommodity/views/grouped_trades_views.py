@@ -3,7 +3,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied
 from django_filters import rest_framework as filters
-from django.db.models import Q
+from django.db.models import Q, F
 from collections import defaultdict
 
 from ..models import Trade, IndexAndCommodity
@@ -14,6 +14,8 @@ from ..models import Trade, IndexAndCommodity
 from ..serializers.grouped_trades_serializers import IndexAndCommodityTradesSerializer
 
 from django.utils import timezone
+from core.conditional import INDEX_TRADES_GENERATION
+from core.response_cache import ResponseCacheMixin
 
 
 class GroupedTradeFilter(filters.FilterSet):
@@ -32,18 +34,19 @@ class GroupedTradeFilter(filters.FilterSet):
     
     def filter_status(self, queryset, name, value):
         if value:
-            return queryset.filter(
-                trades__status=value
-            ).distinct()
+            # Only ACTIVE is offered, which the trade summary already flags
+            return queryset.filter(trade_summary__has_active_trade=True)
         return queryset
 
 
 
-class GroupedTradeViewSet(viewsets.ReadOnlyModelViewSet):
+class GroupedTradeViewSet(ResponseCacheMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = IndexAndCommodityTradesSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = (filters.DjangoFilterBackend,)
     filterset_class = GroupedTradeFilter
+    response_cache_endpoint = 'index_and_commodity.grouped_trades'
+    response_cache_generations = (INDEX_TRADES_GENERATION,)
     
 #     def get_queryset(self):
 #         user = self.request.user
@@ -92,10 +95,12 @@ class GroupedTradeViewSet(viewsets.ReadOnlyModelViewSet):
         user = self.request.user
         current_date = timezone.now()
         
-        # Initial base queryset: All active trades
+        # Initial base queryset: All active trades, read from the trade summary
         base_queryset = IndexAndCommodity.objects.filter(
-            trades__status='ACTIVE'
-        ).distinct()
+            trade_summary__has_active_trade=True
+        ).select_related('trade_summary').order_by(
+            F('trade_summary__latest_active_trade_at').desc(nulls_last=True), 'id'
+        )
 
         if user.is_staff:
             return base_queryset
@@ -0,0 +1,219 @@
+import uuid
+import logging
+from datetime import timedelta
+from django.utils import timezone
+from .models import InstitutionUser
+
+logger = logging.getLogger(__name__)
+
+# Daily bitmaps are kept long enough for year-over-year windows
+ENGAGEMENT_RETENTION_DAYS = 400
+MAX_WINDOW_DAYS = 366
+BACKFILL_BATCH_SIZE = 5000
+
+
+def _day_key(institution_id, day):
+    """Bitmap of the members (bit = member offset) who logged in to `institution_id` on `day`."""
+    return f"engagement:{institution_id}:{day.isoformat()}"
+
+
+def _offsets_key(institution_id):
+    return f"engagement:{institution_id}:offsets"
+
+
+def _next_offset_key(institution_id):
+    return f"engagement:{institution_id}:next_offset"
+
+
+def _redis_connection():
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection('default')
+    except Exception:
+        # Bitmaps need Redis itself, not just any cache backend
+        return None
+
+
+def member_offset(connection, institution_id, user_id):
+    """
+    The member's bit in the institution's bitmaps. User ids are UUIDs, so
+    members are numbered 0, 1, 2... per institution on first login, which
+    also keeps each bitmap as small as the institution.
+    """
+    offsets_key = _offsets_key(institution_id)
+    offset = connection.hget(offsets_key, str(user_id))
+    if offset is None:
+        candidate = connection.incr(_next_offset_key(institution_id)) - 1
+        # A concurrent first login may have numbered the member already; its number wins
+        if not connection.hsetnx(offsets_key, str(user_id), candidate):
+            return int(connection.hget(offsets_key, str(user_id)))
+        offset = candidate
+    return int(offset)
+
+
+def _mark(pipe, institution_id, offset, day):
+    key = _day_key(institution_id, day)
+    pipe.setbit(key, offset, 1)
+    pipe.expire(key, ENGAGEMENT_RETENTION_DAYS * 24 * 60 * 60)
+
+
+def member_institutions(user_id):
+    return list(InstitutionUser.objects.filter(user_id=user_id).values_list('institution_id', flat=True))
+
+
+def record_login(user_id, institution_ids, when=None):
+    """Mark `user_id` active today in each of `institution_ids`. Setting a bit twice is harmless."""
+    connection = _redis_connection()
+    if connection is None or not institution_ids:
+        return
+    day = timezone.localdate(when)
+    try:
+        pipe = connection.pipeline()
+        for institution_id in institution_ids:
+            _mark(pipe, institution_id, member_offset(connection, institution_id, user_id), day)
+        pipe.execute()
+    except Exception as e:
+        logger.error(f"Failed to record login of user {user_id} for engagement: {str(e)}")
+
+
+def rebuild_engagement(since=None):
+    """Replay successful LoginAttempts (from `since` onwards) into the daily bitmaps."""
+    from ..users.models import LoginAttempt
+
+    connection = _redis_connection()
+    if connection is None:
+        raise RuntimeError("Engagement metrics need a django_redis cache backend")
+
+    # Older bitmaps would expire straight away
+    attempts = LoginAttempt.objects.filter(
+        success=True, user__institution_memberships__isnull=False,
+        timestamp__gte=timezone.now() - timedelta(days=ENGAGEMENT_RETENTION_DAYS)
+    ).order_by()
+    if since:
+        attempts = attempts.filter(timestamp__date__gte=since)
+
+    marked = 0
+    offsets = {}
+    pipe = connection.pipeline()
+    for user_id, timestamp, institution_id in attempts.values_list(
+        'user_id', 'timestamp', 'user__institution_memberships__institution_id'
+    ).iterator(chunk_size=BACKFILL_BATCH_SIZE):
+        if (institution_id, user_id) not in offsets:
+            offsets[institution_id, user_id] = member_offset(connection, institution_id, user_id)
+        _mark(pipe, institution_id, offsets[institution_id, user_id], timezone.localdate(timestamp))
+        marked += 1
+        if marked % BACKFILL_BATCH_SIZE == 0:
+            pipe.execute()
+    pipe.execute()
+    return marked
+
+
+class EngagementQuery:
+    """
+    Batches bitmap counts for one institution into a single Redis round trip.
+    Each `active`/`retained` call returns the index of its result in run().
+    """
+
+    def __init__(self, connection, institution_id):
+        self.institution_id = institution_id
+        self.pipe = connection.pipeline()
+        self.positions = []
+        self.scratch_keys = []
+        self._commands = 0
+
+    def _count(self, operation, keys):
+        if len(keys) == 1:
+            self.pipe.bitcount(keys[0])
+            self.positions.append(self._commands)
+            self._commands += 1
+        else:
+            scratch = f"engagement:scratch:{uuid.uuid4().hex}"
+            self.scratch_keys.append(scratch)
+            self.pipe.bitop(operation, scratch, *keys)
+            self.pipe.bitcount(scratch)
+            self.positions.append(self._commands + 1)
+            self._commands += 2
+        return len(self.positions) - 1
+
+    def active(self, end, days):
+        """Distinct members active in the `days` days ending on `end`."""
+        return self._count('OR', [_day_key(self.institution_id, end - timedelta(days=offset)) for offset in range(days)])
+
+    def retained(self, cohort_day, day):
+        """Members active on both `cohort_day` and `day`."""
+        return self._count('AND', [_day_key(self.institution_id, cohort_day), _day_key(self.institution_id, day)])
+
+    def run(self):
+        if self.scratch_keys:
+            self.pipe.delete(*self.scratch_keys)
+        results = self.pipe.execute()
+        return [int(results[position]) for position in self.positions]
+
+
+def login_frequency(institution_id, end=None):
+    """
+    Daily, weekly and monthly active members, or None without Redis or
+    before any login of the institution was recorded (or backfilled).
+    """
+    connection = _redis_connection()
+    if connection is None:
+        return None
+    end = end or timezone.localdate()
+    query = EngagementQuery(connection, institution_id)
+    for days in (1, 7, 30):
+        query.active(end, days)
+    try:
+        if not connection.exists(_offsets_key(institution_id)):
+            return None
+        daily, weekly, monthly = query.run()
+    except Exception as e:
+        logger.error(f"Failed to read engagement of institution {institution_id}: {str(e)}")
+        return None
+    return {'daily_active': daily, 'weekly_active': weekly, 'monthly_active': monthly}
+
+
+def engagement_report(institution_id, days=30, end=None):
+    """
+    DAU/WAU/MAU as of `end`, active members per day of the window and the
+    share of the window's first-day cohort seen again on each later day.
+    Every figure comes from the same pipelined round trip.
+    """
+    connection = _redis_connection()
+    if connection is None:
+        return None
+    end = end or timezone.localdate()
+    start = end - timedelta(days=days - 1)
+    window = [start + timedelta(days=offset) for offset in range(days)]
+
+    query = EngagementQuery(connection, institution_id)
+    for period in (1, 7, 30):
+        query.active(end, period)
+    for day in window:
+        query.active(day, 1)
+    for day in window[1:]:
+        query.retained(start, day)
+    try:
+        results = query.run()
+    except Exception as e:
+        logger.error(f"Failed to read engagement of institution {institution_id}: {str(e)}")
+        return None
+
+    dau, wau, mau = results[:3]
+    daily = results[3:3 + days]
+    retained = results[3 + days:]
+    cohort = daily[0]
+    return {
+        'dau': dau,
+        'wau': wau,
+        'mau': mau,
+        'stickiness': round(dau / mau * 100, 2) if mau else 0,
+        'daily': [{'date': day, 'active_users': count} for day, count in zip(window, daily)],
+        'retention': {
+            'cohort_date': start,
+            'cohort_size': cohort,
+            'days': [
+                {'date': day, 'retained': count, 'rate': round(count / cohort * 100, 2) if cohort else 0}
+                for day, count in zip(window[1:], retained)
+            ],
+        },
+    }
@@ -0,0 +1,24 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from apps.institutions.engagement import rebuild_engagement
+
+
+class Command(BaseCommand):
+    help = 'Replay successful member logins into the per-institution daily engagement bitmaps'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Only replay logins from this date (YYYY-MM-DD) onwards')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError('--since must be a date in YYYY-MM-DD format')
+
+        try:
+            marked = rebuild_engagement(since)
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Recorded {marked} member logins"))
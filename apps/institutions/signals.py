@@ -0,0 +1,46 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from ..users.models import User, LoginAttempt
+from .models import Institution, InstitutionUser
+from .stats import invalidate_institution_stats
+from .engagement import member_institutions, record_login
+
+
+@receiver(post_save, sender=InstitutionUser)
+@receiver(post_delete, sender=InstitutionUser)
+def drop_stats_for_membership(sender, instance, **kwargs):
+    institution_id = instance.institution_id
+    transaction.on_commit(lambda: invalidate_institution_stats(institution_id))
+
+
+@receiver(post_save, sender=Institution)
+def drop_stats_for_institution(sender, instance, created, **kwargs):
+    """Capacity is part of the snapshot."""
+    if not created:
+        transaction.on_commit(lambda: invalidate_institution_stats(instance.pk))
+
+
+@receiver(post_save, sender=User)
+def drop_stats_for_member(sender, instance, created, **kwargs):
+    """
+    Activation, verification and logins of a member change their institutions'
+    counters, and so does a user becoming or ceasing to be a member type.
+    """
+    member = User.UserType.B2B_USER
+    if created or member not in (instance.user_type, instance.tracker.previous('user_type')):
+        return
+    institution_ids = list(instance.institution_memberships.values_list('institution_id', flat=True))
+    if institution_ids:
+        transaction.on_commit(lambda: invalidate_institution_stats(*institution_ids))
+
+
+@receiver(post_save, sender=LoginAttempt)
+def record_member_login(sender, instance, created, **kwargs):
+    """Roll successful member logins into their institutions' daily engagement bitmaps."""
+    if not created or not instance.success or not instance.user_id:
+        return
+    institution_ids = member_institutions(instance.user_id)
+    if institution_ids:
+        user_id, when = instance.user_id, instance.timestamp
+        transaction.on_commit(lambda: record_login(user_id, institution_ids, when))
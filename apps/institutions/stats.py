@@ -0,0 +1,115 @@
+from collections import OrderedDict
+from datetime import timedelta
+from django.db.models import Count, Q
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from core.cache_layer import get_or_compute, invalidate
+from ..users.models import User
+from .models import InstitutionUser
+from .engagement import login_frequency
+
+
+def institution_stats_key(institution_id):
+    return f"institution_stats:{institution_id}"
+
+
+def invalidate_institution_stats(*institution_ids):
+    invalidate(*(institution_stats_key(institution_id) for institution_id in institution_ids))
+
+
+def get_institution_stats(institution):
+    """The B2B admin stats snapshot, rebuilt after membership or member changes (see signals)."""
+    return get_or_compute(institution_stats_key(institution.id), lambda: institution_stats(institution))
+
+
+def _counters(memberships, now):
+    """Every counter of the stats page in one conditional-aggregate query over the memberships."""
+    today = now.date()
+    thirty_days_ago = today - timedelta(days=30)
+    member = Q(user__user_type=User.UserType.B2B_USER)
+    return memberships.aggregate(
+        total_users=Count('id', filter=member),
+        active_users=Count('id', filter=member & Q(user__is_active=True)),
+        inactive_users=Count('id', filter=member & Q(user__is_active=False)),
+        verified_users=Count('id', filter=member & Q(user__is_verified=True)),
+        daily_active=Count('id', filter=member & Q(user__last_login__date=today)),
+        weekly_active=Count('id', filter=member & Q(user__last_login__gte=today - timedelta(days=7))),
+        monthly_active=Count('id', filter=member & Q(user__last_login__gte=thirty_days_ago)),
+        new_users_today=Count('id', filter=Q(created_at__date=today)),
+        new_users_this_month=Count('id', filter=Q(created_at__year=now.year, created_at__month=now.month)),
+        new_users_this_year=Count('id', filter=Q(created_at__year=now.year)),
+    )
+
+
+def _growth(memberships):
+    """Monthly joins (latest 12 months) and yearly joins, both from one month-grouped query."""
+    months = list(memberships.annotate(month=TruncMonth('created_at')).values('month').annotate(
+        new_users=Count('id')
+    ).order_by('-month'))
+    years = OrderedDict()
+    for row in months:
+        year = row['month'].replace(month=1)
+        years[year] = years.get(year, 0) + row['new_users']
+    return {
+        'monthly': months[:12],
+        'yearly': [{'year': year, 'new_users': new_users} for year, new_users in years.items()],
+    }
+
+
+def institution_stats(institution):
+    now = timezone.now()
+    thirty_days_ago = now.date() - timedelta(days=30)
+    memberships = InstitutionUser.objects.filter(institution=institution).order_by()
+    users = User.objects.filter(
+        institution_memberships__institution=institution,
+        user_type=User.UserType.B2B_USER
+    )
+    counters = _counters(memberships, now)
+
+    total_users = counters['total_users']
+    return {
+        'timestamp': now,
+        'overall_stats': {
+            'total_users': total_users,
+            'active_users': counters['active_users'],
+            'inactive_users': counters['inactive_users'],
+            'verified_users': counters['verified_users'],
+            'capacity': {
+                'total': institution.max_users,
+                'used': total_users,
+                'available': institution.max_users - total_users,
+                'utilization_percentage': (total_users / institution.max_users * 100) if institution.max_users > 0 else 0
+            }
+        },
+        'role_distribution': list(memberships.values('role').annotate(
+            total=Count('id'),
+            active=Count('id', filter=Q(is_active=True))
+        ).order_by('role')),
+        'growth': _growth(memberships),
+        'recent_activity': {
+            'new_users_today': counters['new_users_today'],
+            'new_users_this_month': counters['new_users_this_month'],
+            'new_users_this_year': counters['new_users_this_year'],
+            'recent_registrations': list(users.filter(
+                date_joined__gte=thirty_days_ago
+            ).values('id', 'first_name', 'last_name', 'email', 'date_joined').order_by('-date_joined')[:5])
+        },
+        'status_changes': {
+            'recent_deactivations': list(users.filter(
+                is_active=False,
+                institution_memberships__updated_at__gte=thirty_days_ago
+            ).values('id', 'first_name', 'last_name', 'email')[:5]),
+            'recent_activations': list(users.filter(
+                is_active=True,
+                institution_memberships__updated_at__gte=thirty_days_ago
+            ).values('id', 'first_name', 'last_name', 'email')[:5])
+        },
+        'engagement': {
+            # From the login bitmaps when Redis is there, else from members' last_login
+            'login_frequency': login_frequency(institution.id) or {
+                'daily_active': counters['daily_active'],
+                'weekly_active': counters['weekly_active'],
+                'monthly_active': counters['monthly_active'],
+            }
+        },
+    }
@@ -1,3 +1,180 @@
+import uuid
+from datetime import timedelta
+from unittest import mock
 from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from core.cache_layer import local_cache
+from apps.users.models import LoginAttempt
+from .models import Institution, InstitutionUser
+from .engagement import member_offset
 
 # Create your tests here.
+
+User = get_user_model()
+
+
+class BitmapRedis:
+    """The bitmap and hash commands the engagement pipeline uses, over sets of offsets."""
+
+    def __init__(self):
+        self.bitmaps = {}
+        self.hashes = {}
+        self.counters = {}
+
+    def pipeline(self):
+        return BitmapPipeline(self)
+
+    def setbit(self, key, offset, value):
+        # Like Redis, only non-negative integer offsets are accepted
+        if not isinstance(offset, int) or isinstance(offset, bool) or offset < 0:
+            raise TypeError(f"Invalid bit offset {offset!r}")
+        self.bitmaps.setdefault(key, set()).add(offset)
+
+    def hget(self, key, field):
+        value = self.hashes.get(key, {}).get(field)
+        return None if value is None else str(value).encode()
+
+    def hsetnx(self, key, field, value):
+        fields = self.hashes.setdefault(key, {})
+        if field in fields:
+            return False
+        fields[field] = value
+        return True
+
+    def exists(self, key):
+        return int(key in self.hashes)
+
+    def incr(self, key):
+        self.counters[key] = self.counters.get(key, 0) + 1
+        return self.counters[key]
+
+    def expire(self, key, seconds):
+        return True
+
+    def bitcount(self, key):
+        return len(self.bitmaps.get(key, ()))
+
+    def bitop(self, operation, destination, *keys):
+        sets = [self.bitmaps.get(key, set()) for key in keys]
+        self.bitmaps[destination] = set.union(*sets) if operation == 'OR' else set.intersection(*sets)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.bitmaps.pop(key, None)
+
+
+class BitmapPipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.commands.append((name, args))
+
+    def execute(self):
+        commands, self.commands = self.commands, []
+        return [getattr(self.redis, name)(*args) for name, args in commands]
+
+
+class B2BAdminStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        self.admin = User.objects.create_user(
+            phone_number='+919876543210', email='admin@example.com', password='pass',
+            user_type=User.UserType.B2B_ADMIN
+        )
+        self.institution = Institution.objects.create(
+            name='Institute', admin=self.admin, contact_email='institute@example.com',
+            contact_phone='+919876543211', max_users=10
+        )
+        self.members = [
+            User.objects.create_user(
+                phone_number=f'+91987654330{index}', email=f'member{index}@example.com', password='pass',
+                user_type=User.UserType.B2B_USER, is_verified=index == 0, last_login=timezone.now()
+            )
+            for index in range(3)
+        ]
+        for member in self.members:
+            InstitutionUser.objects.create(institution=self.institution, user=member)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def test_stats_come_from_one_snapshot_invalidated_by_member_changes(self):
+        url = reverse('b2b-admin-stats')
+        # Counters, roles, growth, recent registrations and the two status change lists
+        with self.assertNumQueries(6):
+            stats = self.client.get(url).json()
+        self.assertEqual(stats['overall_stats']['total_users'], 3)
+        self.assertEqual(stats['overall_stats']['verified_users'], 1)
+        self.assertEqual(stats['overall_stats']['capacity']['available'], 7)
+        self.assertEqual(stats['engagement']['login_frequency']['daily_active'], 3)
+        self.assertEqual(stats['recent_activity']['new_users_this_year'], 3)
+        self.assertEqual([row['new_users'] for row in stats['growth']['monthly']], [3])
+        self.assertEqual([row['new_users'] for row in stats['growth']['yearly']], [3])
+
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.members[1].is_active = False
+            self.members[1].save()
+        stats = self.client.get(url).json()
+        self.assertEqual(stats['overall_stats']['active_users'], 2)
+        self.assertEqual(stats['overall_stats']['inactive_users'], 1)
+
+        # Leaving the member type drops the user from the counters too
+        with self.captureOnCommitCallbacks(execute=True):
+            self.members[2].user_type = User.UserType.B2C
+            self.members[2].save()
+        self.assertEqual(self.client.get(url).json()['overall_stats']['total_users'], 2)
+
+    def test_members_get_dense_offsets_per_institution(self):
+        redis = BitmapRedis()
+        self.assertIsInstance(self.members[0].pk, uuid.UUID)
+        with mock.patch('apps.institutions.engagement._redis_connection', return_value=redis):
+            with self.captureOnCommitCallbacks(execute=True):
+                for member in (self.members[2], self.members[0], self.members[2]):
+                    LoginAttempt.objects.create(user=member, success=True)
+            self.assertEqual(member_offset(redis, self.institution.id, self.members[2].pk), 0)
+            self.assertEqual(member_offset(redis, self.institution.id, self.members[0].pk), 1)
+            key = f"engagement:{self.institution.id}:{timezone.localdate().isoformat()}"
+            self.assertEqual(redis.bitmaps[key], {0, 1})
+
+    def test_engagement_comes_from_daily_login_bitmaps(self):
+        redis = BitmapRedis()
+        url = reverse('b2b-admin-engagement')
+        with mock.patch('apps.institutions.engagement._redis_connection', return_value=redis):
+            # Nothing recorded yet: the stats page keeps the last_login counters
+            stats = self.client.get(reverse('b2b-admin-stats')).json()
+            self.assertEqual(stats['engagement']['login_frequency']['daily_active'], 3)
+        cache.clear()
+
+        self.assertEqual(self.client.get(url).status_code, 503)
+
+        with mock.patch('apps.institutions.engagement._redis_connection', return_value=redis):
+            for member, days_ago in ((self.members[0], 6), (self.members[1], 3)):
+                attempt = LoginAttempt.objects.create(user=member, success=True)
+                LoginAttempt.objects.filter(pk=attempt.pk).update(timestamp=timezone.now() - timedelta(days=days_ago))
+            LoginAttempt.objects.create(user=self.members[2], success=False)
+            call_command('backfill_engagement', stdout=mock.Mock())
+            with self.captureOnCommitCallbacks(execute=True):
+                LoginAttempt.objects.create(user=self.members[0], success=True)
+
+            report = self.client.get(url, {'days': 7}).json()
+            self.assertEqual((report['dau'], report['wau'], report['mau']), (1, 2, 2))
+            self.assertEqual([day['active_users'] for day in report['daily']], [1, 0, 0, 1, 0, 0, 1])
+            self.assertEqual(report['retention']['cohort_size'], 1)
+            self.assertEqual(report['retention']['days'][-1]['rate'], 100)
+            self.assertEqual(self.client.get(url, {'days': 0}).status_code, 400)
+
+            # Every member has a last_login of today, but only one logged in today
+            stats = self.client.get(reverse('b2b-admin-stats')).json()
+            self.assertEqual(stats['engagement']['login_frequency'], {
+                'daily_active': 1, 'weekly_active': 2, 'monthly_active': 2
+            })
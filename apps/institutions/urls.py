@@ -13,6 +13,7 @@ from .views import (
     B2BUserDetailView,
     B2BUserBulkActionView,
     B2BAdminStatsView,
+    B2BAdminEngagementView,
     B2BAdminDetailedUserStatsView
 )
 
@@ -32,6 +33,7 @@ urlpatterns = [
     path('b2b-admin/users/<int:user_id>/', B2BUserDetailView.as_view(), name='b2b-admin-user-detail'),
     path('b2b-admin/users/bulk-action/', B2BUserBulkActionView.as_view(), name='b2b-admin-user-bulk-action'),
     path('b2b-admin/stats/', B2BAdminStatsView.as_view(), name='b2b-admin-stats'),
+    path('b2b-admin/stats/engagement/', B2BAdminEngagementView.as_view(), name='b2b-admin-engagement'),
     path('b2b-admin/stats/users/<int:user_id>/', B2BAdminDetailedUserStatsView.as_view(), name='b2b-admin-user-stats'),
 
 ]
@@ -3,7 +3,11 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAdminUser
 from django_filters import rest_framework as django_filters
 from rest_framework.pagination import PageNumberPagination
+from core.pagination import KeysetPaginationMixin
 from .models import Institution, InstitutionUser
+from .stats import get_institution_stats
+from .engagement import engagement_report, MAX_WINDOW_DAYS
+from apps.analytics.counters import admin_counters
 from .serializers import (
     InstitutionListSerializer,
     InstitutionDetailSerializer,
@@ -24,12 +28,10 @@ from django.db.models import Q
 
 from core.permissions import IsB2BAdmin
 from .models import InstitutionUser, Institution
-from django.db.models import Count
 
 from django.utils import timezone
-from datetime import datetime, timedelta
-from django.db.models.functions import TruncMonth, TruncYear
-class CustomPagination(PageNumberPagination):
+from datetime import datetime
+class CustomPagination(KeysetPaginationMixin, PageNumberPagination):
     page_size = 5
     page_size_query_param = 'page_size'
     max_page_size = 100
@@ -104,14 +106,12 @@ class InstitutionStatsView(generics.RetrieveAPIView):
     permission_classes = [IsAdminUser]
     
     def retrieve(self, request, *args, **kwargs):
-        total_institutions = Institution.objects.count()
-        total_users = User.objects.filter(user_type=User.UserType.B2B_USER).count()
-        active_admins = User.objects.filter(user_type=User.UserType.B2B_ADMIN, is_active=True).count()
+        counters = admin_counters()
 
         return Response({
-            "total_institutions": total_institutions,
-            "total_users": total_users,
-            "active_admins": active_admins
+            "total_institutions": counters['institutions'],
+            "total_users": counters['users']['by_type'][User.UserType.B2B_USER],
+            "active_admins": counters['users']['active_by_type'][User.UserType.B2B_ADMIN]
         })
 
 
@@ -361,113 +361,37 @@ class B2BAdminStatsView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        # Time periods for filtering
-        now = timezone.now()
-        today = now.date()
-        thirty_days_ago = today - timedelta(days=30)
-        this_year = now.year
+        return Response(get_institution_stats(institution))
 
-        # Get all users from the institution
-        institution_users = InstitutionUser.objects.filter(
-            institution=institution
-        )
-
-        # Base user queryset
-        users = User.objects.filter(
-            institution_memberships__institution=institution,
-            user_type=User.UserType.B2B_USER
-        )
-
-        # Overall Stats
-        overall_stats = {
-            'total_users': users.count(),
-            'active_users': users.filter(is_active=True).count(),
-            'inactive_users': users.filter(is_active=False).count(),
-            'verified_users': users.filter(is_verified=True).count(),
-            'capacity': {
-                'total': institution.max_users,
-                'used': users.count(),
-                'available': institution.max_users - users.count(),
-                'utilization_percentage': (users.count() / institution.max_users * 100) if institution.max_users > 0 else 0
-            }
-        }
-
-        # Role Distribution
-        role_stats = institution_users.values('role').annotate(
-            total=Count('id'),
-            active=Count('id', filter=Q(is_active=True))
-        ).order_by('role')
-
-        # Growth Stats
-        monthly_growth = institution_users.annotate(
-            month=TruncMonth('created_at')
-        ).values('month').annotate(
-            new_users=Count('id')
-        ).order_by('-month')[:12]
-
-        yearly_growth = institution_users.annotate(
-            year=TruncYear('created_at')
-        ).values('year').annotate(
-            new_users=Count('id')
-        ).order_by('-year')
-
-        # Recent Activity
-        recent_stats = {
-            'new_users_today': institution_users.filter(
-                created_at__date=today
-            ).count(),
-            'new_users_this_month': institution_users.filter(
-                created_at__month=now.month,
-                created_at__year=now.year
-            ).count(),
-            'new_users_this_year': institution_users.filter(
-                created_at__year=this_year
-            ).count(),
-            'recent_registrations': list(users.filter(
-                date_joined__gte=thirty_days_ago
-            ).values('id', 'first_name', 'last_name', 'email', 'date_joined')
-            .order_by('-date_joined')[:5])
-        }
+class B2BAdminEngagementView(APIView):
+    permission_classes = [IsAuthenticated, IsB2BAdmin]
 
-        # User Status Changes
-        status_changes = {
-            'recent_deactivations': list(users.filter(
-                is_active=False,
-                institution_memberships__updated_at__gte=thirty_days_ago
-            ).values('id', 'first_name', 'last_name', 'email')[:5]),
-            'recent_activations': list(users.filter(
-                is_active=True,
-                institution_memberships__updated_at__gte=thirty_days_ago
-            ).values('id', 'first_name', 'last_name', 'email')[:5])
-        }
+    def get(self, request):
+        """DAU/WAU/MAU, daily actives and retention of the admin's institution over ?days= (default 30)"""
+        institution = request.user.administered_institution
+        if not institution:
+            return Response(
+                {"error": "No institution found for this admin"}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
 
-        # Engagement Metrics (if applicable to your system)
-        engagement_stats = {
-            'login_frequency': {
-                'daily_active': users.filter(
-                    last_login__date=today
-                ).count(),
-                'weekly_active': users.filter(
-                    last_login__gte=today - timedelta(days=7)
-                ).count(),
-                'monthly_active': users.filter(
-                    last_login__gte=thirty_days_ago
-                ).count()
-            }
-        }
+        try:
+            days = int(request.query_params.get('days', 30))
+        except ValueError:
+            days = 0
+        if not 1 <= days <= MAX_WINDOW_DAYS:
+            return Response(
+                {"error": f"days must be between 1 and {MAX_WINDOW_DAYS}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-        return Response({
-            'timestamp': now,
-            'overall_stats': overall_stats,
-            'role_distribution': list(role_stats),
-            'growth': {
-                'monthly': list(monthly_growth),
-                'yearly': list(yearly_growth)
-            },
-            'recent_activity': recent_stats,
-            'status_changes': status_changes,
-            'engagement': engagement_stats
-        })
+        report = engagement_report(institution.id, days)
+        if report is None:
+            return Response(
+                {"error": "Engagement metrics are unavailable"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        return Response(report)
 
 class B2BAdminDetailedUserStatsView(APIView):
     permission_classes = [IsAuthenticated, IsB2BAdmin]
@@ -46,6 +46,7 @@ class Notification(models.Model):
             models.Index(fields=['recipient', 'is_read']),
             models.Index(fields=['created_at']),
             models.Index(fields=['notification_type']),
+            models.Index(fields=['recipient', 'created_at', 'id']),
         ]
 
 
@@ -1,4 +1,4 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
 from django.utils import timezone
 from django.db import transaction
@@ -9,6 +9,7 @@ from decimal import Decimal
 from apps.trades.models import Trade, TradeHistory, Analysis, Insight
 from apps.subscriptions.models import Subscription
 from .models import Notification
+from core.conditional import bump_generation, notifications_generation
 from django.db import DatabaseError
 import logging
 
@@ -481,4 +482,12 @@ def handle_insight_updates(sender, instance, created, **kwargs):
         if notifications:
             transaction.on_commit(
                 lambda: NotificationManager.send_websocket_notifications(notifications)
-            )
\ No newline at end of file
+            )
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def bump_notifications_generation(sender, instance, **kwargs):
+    """Invalidate the recipient's notification list ETag once the write is committed."""
+    recipient_id = instance.recipient_id
+    transaction.on_commit(lambda: bump_generation(notifications_generation(recipient_id)))
@@ -9,13 +9,20 @@ from django.db.models import Q, OuterRef, Subquery
 from apps.trades.models import Trade, Company
 from apps.subscriptions.models import Subscription
 from apps.indexAndCommodity.models import IndexAndCommodity
+from core.conditional import ConditionalListMixin, TRADES_GENERATION, notifications_generation, bump_generation
+from core.pagination import KeysetPageNumberPagination
 import logging
 
 logger = logging.getLogger(__name__)
 
-class NotificationViewSet(viewsets.ModelViewSet):
+class NotificationViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPageNumberPagination
+
+    def get_etag_generations(self):
+        # Free-call visibility depends on trades as well as the user's notifications
+        return [notifications_generation(self.request.user.id), TRADES_GENERATION]
     
     def get_queryset(self):
         user = self.request.user
@@ -89,6 +96,10 @@ class NotificationViewSet(viewsets.ModelViewSet):
         ).order_by('-created_at')
     
     def list(self, request, *args, **kwargs):
+        not_modified = self.get_not_modified_response(request)
+        if not_modified is not None:
+            return not_modified
+
         # Filter based on read status if specified
         is_read = request.query_params.get('is_read')
         queryset = self.get_queryset()
@@ -101,22 +112,11 @@ class NotificationViewSet(viewsets.ModelViewSet):
         # Add count of unread notifications in response
         unread_count = self.get_queryset().filter(is_read=False).count()
         
-        # Get trade information for enhancing notifications
-        trade_ids = [n.trade_id for n in queryset if n.trade_id]
-        trade_info = {}
-        
-        if trade_ids:
-            trades = Trade.objects.filter(id__in=trade_ids).select_related('company')
-            trade_info = {
-                t.id: {
-                    'tradingSymbol': t.company.trading_symbol,
-                    'instrumentName': t.company.instrument_type
-                } for t in trades
-            }
-        
         # Paginate results
         page = self.paginate_queryset(queryset)
         if page is not None:
+            # Only look up trades for the notifications on this page
+            trade_info = self._get_trade_info(page)
             serializer = self.get_serializer(page, many=True)
             
             # Enhance serialized data with trade information
@@ -128,18 +128,32 @@ class NotificationViewSet(viewsets.ModelViewSet):
             response = self.get_paginated_response(enhanced_data)
             # print(response,'response>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>')
             response.data['unread_count'] = unread_count
-            return response
+            return self.add_validator_headers(response)
         
+        trade_info = self._get_trade_info(queryset)
         serializer = self.get_serializer(queryset, many=True)
         
         # Enhance serialized data with trade information
         enhanced_data = self._enhance_notification_data(serializer.data, trade_info)
         # print(enhanced_data,'enhanced_data>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>')
         
-        return Response({
+        return self.add_validator_headers(Response({
             'results': enhanced_data,
             'unread_count': unread_count
-        })
+        }))
+
+    def _get_trade_info(self, notifications):
+        """Trading symbol and instrument name per trade id referenced by `notifications`"""
+        trade_ids = [n.trade_id for n in notifications if n.trade_id]
+        if not trade_ids:
+            return {}
+        trades = Trade.objects.filter(id__in=trade_ids).select_related('company')
+        return {
+            t.id: {
+                'tradingSymbol': t.company.trading_symbol,
+                'instrumentName': t.company.instrument_type
+            } for t in trades
+        }
     
     # def _enhance_notification_data(self, data, trade_info):
         # """Add trading symbol and instrument name to notification data"""
@@ -257,6 +271,8 @@ class NotificationViewSet(viewsets.ModelViewSet):
             is_read=True,
             updated_at=timezone.now()
         )
+        # update() skips the post_save signal that bumps the generation
+        bump_generation(notifications_generation(request.user.id))
         
         return Response({
             'status': 'success',
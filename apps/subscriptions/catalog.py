@@ -0,0 +1,14 @@
+from core.cache_layer import enable_local, invalidate
+
+PLAN_CATALOG_AUDIENCES = ('staff', 'B2B', 'B2C')
+
+# Read on every plans page and checkout, changed only by admins
+enable_local('plan_catalog', ttl=30)
+
+
+def plan_catalog_key(audience):
+    return f"plan_catalog:{audience}"
+
+
+def invalidate_plan_catalog():
+    invalidate(*(plan_catalog_key(audience) for audience in PLAN_CATALOG_AUDIENCES))
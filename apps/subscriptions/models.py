@@ -239,6 +239,7 @@ class Order(BaseModel):
             models.Index(fields=['user', 'status']),
             models.Index(fields=['razorpay_order_id']),
             models.Index(fields=['razorpay_payment_id']),
+            models.Index(fields=['created_at', 'id']),
         ]
 
 
@@ -0,0 +1,27 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from core.cache_layer import invalidate_tags, user_tag, subscription_tag
+from .models import Plan, Subscription
+from .catalog import invalidate_plan_catalog
+
+
+@receiver(post_save, sender=Plan)
+@receiver(post_delete, sender=Plan)
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def drop_plan_catalog(sender, **kwargs):
+    """
+    Drop the cached plan lists, here and in every other process, once the
+    write commits. Subscriptions count too: the lists carry each plan's
+    active subscription total.
+    """
+    transaction.on_commit(invalidate_plan_catalog)
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def invalidate_subscription_cache_tags(sender, instance, **kwargs):
+    """Plan, window and status decide what the subscriber is served."""
+    tags = (subscription_tag(instance.pk), user_tag(instance.user_id))
+    transaction.on_commit(lambda: invalidate_tags(*tags))
@@ -1,3 +1,58 @@
+from datetime import timedelta
+from unittest import mock
 from django.test import TestCase
+from django.utils import timezone
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework.throttling import UserRateThrottle
+from core.cache_layer import local_cache
+from .models import Order, Plan, Subscription
 
 # Create your tests here.
+
+
+@mock.patch.object(UserRateThrottle, 'THROTTLE_RATES', {'user': '1000/min'})
+class PlanCatalogCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=get_user_model().objects.create_user(
+            phone_number='+919876543210', email='user@example.com', password='pass'
+        ))
+        self.plan = Plan.objects.create(
+            name='BASIC', plan_type='B2C', price=100, intended_users='Retail', stock_coverage=10,
+            client_interaction='Email', webinars='Monthly', code='B2C-BASIC'
+        )
+
+    def test_catalog_is_cached_until_a_plan_changes(self):
+        url = reverse('plan-list-create')
+        self.assertEqual([plan['code'] for plan in self.client.get(url).json()], ['B2C-BASIC'])
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.plan.is_visible = False
+            self.plan.save()
+        self.assertEqual(self.client.get(url).json(), [])
+
+    def test_catalog_is_dropped_when_a_subscription_changes(self):
+        url = reverse('plan-list-create')
+        self.assertEqual(self.client.get(url).json()[0]['total_active_subscriptions'], 0)
+
+        user = get_user_model().objects.create_user(
+            phone_number='+919876543211', email='subscriber@example.com', password='pass'
+        )
+        order = Order.objects.create(user=user, plan=self.plan, amount=100, status='COMPLETED')
+        now = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            subscription = Subscription.objects.create(
+                user=user, plan=self.plan, order=order, start_date=now, end_date=now + timedelta(days=30)
+            )
+        self.assertEqual(self.client.get(url).json()[0]['total_active_subscriptions'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            subscription.delete()
+        self.assertEqual(self.client.get(url).json()[0]['total_active_subscriptions'], 0)
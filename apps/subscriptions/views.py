@@ -37,6 +37,9 @@ from .razorpay_utils import (
 from rest_framework.generics import GenericAPIView
 import logging
 from rest_framework.pagination import PageNumberPagination
+from core.pagination import KeysetPaginationMixin
+from core.cache_layer import get_or_compute
+from .catalog import plan_catalog_key
 from django.db.models import Q
 
 logger = logging.getLogger(__name__)
@@ -65,17 +68,23 @@ class PlanListCreateView(BaseAPIView):
         try:
             user = request.user
             if user.is_staff:
+                audience = 'staff'
                 queryset = Plan.objects.all()
             elif user.user_type in [User.UserType.B2B_ADMIN, User.UserType.B2B_USER]:
+                audience = 'B2B'
                 queryset = Plan.objects.filter(is_visible=True, plan_type='B2B')
             else:  # B2C user
+                audience = 'B2C'
                 queryset = Plan.objects.filter(is_visible=True, plan_type='B2C')
 
-            # Apply the filters and ordering
-            queryset = self.filter_queryset(queryset)
-            
-            serializer = PlanSerializer(queryset, many=True)
-            return Response(serializer.data)
+            def list_plans():
+                # Apply the filters and ordering
+                return PlanSerializer(self.filter_queryset(queryset), many=True).data
+
+            if request.query_params:
+                return Response(list_plans())
+            # The unfiltered catalog is shared by everyone in the audience
+            return Response(get_or_compute(plan_catalog_key(audience), list_plans))
         except Exception as e:
             logger.error(f"Error fetching plans: {str(e)}")
             return Response(
@@ -546,7 +555,7 @@ class CancelSubscriptionView(BaseAPIView):
 
 
 
-class OrderPagination(PageNumberPagination):
+class OrderPagination(KeysetPaginationMixin, PageNumberPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
@@ -634,7 +643,7 @@ class AdminOrderOfflinePaymentView(views.APIView):
                 )
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-class StandardResultsSetPagination(PageNumberPagination):
+class StandardResultsSetPagination(KeysetPaginationMixin, PageNumberPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
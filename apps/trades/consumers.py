@@ -2,7 +2,11 @@ from channels.generic.websocket import AsyncWebsocketConsumer
 from asgiref.sync import sync_to_async
 from django.core.cache import cache
 from typing import Dict, List, Optional, Set
+from collections import OrderedDict
 import json
+import time
+import hashlib
+import traceback
 from decimal import Decimal
 import logging
 import asyncio
@@ -13,6 +17,11 @@ from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from django.db import transaction
 from apps.subscriptions.models import Subscription
 from apps.trades.models import Trade
+from apps.trades.index_ticks import INDEX_UPDATES_GROUP
+from core.cache_layer import (
+    aget_or_compute, get_value, set_value, enable_local, invalidate, tag_versions, user_tag, subscription_tag,
+    plan_tag
+)
 from django.db import models
 
 logger = logging.getLogger(__name__)
@@ -27,16 +36,131 @@ class DecimalEncoder(json.JSONEncoder):
             return str(obj)
         return super().default(obj)
 
+class RecentMessageCache:
+    """
+    Per-connection, in-memory TTL map used to suppress duplicate messages.
+
+    Every entry shares the same TTL, so insertion order is also expiry order and
+    expired entries can be dropped from the front of the map in O(1) each.
+    """
+
+    def __init__(self, ttl: float, max_size: int = 1024):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+
+    @staticmethod
+    def fingerprint(payload) -> str:
+        """Stable content hash for a JSON-serializable payload."""
+        encoded = json.dumps(payload, sort_keys=True, cls=DecimalEncoder).encode('utf-8')
+        return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+    def _expire(self, now: float):
+        while self._entries:
+            key, (_, expires_at) = next(iter(self._entries.items()))
+            if expires_at > now:
+                break
+            self._entries.popitem(last=False)
+
+    def is_duplicate(self, key, value=None) -> bool:
+        """
+        Return True if `key` was recorded with the same `value` within the TTL.
+        Otherwise record (or refresh) the entry and return False.
+        """
+        now = time.monotonic()
+        self._expire(now)
+
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == value:
+            return True
+
+        self._entries[key] = (value, now + self.ttl)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return False
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class TokenBucket:
+    """Simple token bucket used to rate limit client-initiated actions."""
+
+    def __init__(self, capacity: int, refill_rate: float):
+        self.capacity = capacity
+        self.refill_rate = refill_rate  # tokens per second
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_rate)
+        self.updated_at = now
+
+    def consume(self, tokens: int = 1) -> bool:
+        """Take `tokens` from the bucket, returning False if not enough are available."""
+        self._refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    def retry_after(self, tokens: int = 1) -> float:
+        """Seconds until `tokens` will be available."""
+        self._refill()
+        missing = tokens - self.tokens
+        return 0.0 if missing <= 0 else missing / self.refill_rate
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into a single in-flight
+    computation whose result is shared by every caller.
+    """
+
+    def __init__(self):
+        self._inflight: Dict = {}
+
+    async def run(self, key, func):
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(func())
+            self._inflight[key] = future
+
+            def _forget(done, key=key):
+                if self._inflight.get(key) is done:
+                    del self._inflight[key]
+
+            future.add_done_callback(_forget)
+        # Shield so a waiter disconnecting does not cancel the shared work
+        return await asyncio.shield(future)
+
+
+# Refresh requests from every connection in this worker share one computation per user
+refresh_single_flight = SingleFlight()
+
+
 class TradeUpdateManager:
     """Utility class for managing trade caching and plan level access."""
     
     CACHE_TIMEOUT = 300  # Cache duration in seconds (5 minutes instead of 1 hour)
 
     @staticmethod
-    async def get_cached_trades(cache_key: str) -> Optional[Dict]:
-        """Retrieve cached trade data asynchronously."""
+    async def get_cached_trades(cache_key: str, fetch=None) -> Optional[Dict]:
+        """
+        Retrieve cached trade data asynchronously. With a `fetch` coroutine
+        function, a missing or stale entry is refreshed by one caller at a time
+        while the others are served the stale copy.
+        """
         try:
-            return await sync_to_async(cache.get)(cache_key)
+            if fetch is not None:
+                return await aget_or_compute(cache_key, fetch, soft_ttl=TradeUpdateManager.CACHE_TIMEOUT)
+            entry = await sync_to_async(get_value)(cache_key)
+            return entry.value if entry else None
         except Exception as e:
             logger.error(f"Failed to get cached trades: {str(e)}")
             return None
@@ -44,10 +168,7 @@ class TradeUpdateManager:
     @staticmethod
     async def set_cached_trades(cache_key: str, data: Dict):
         """Store trade data in the cache asynchronously."""
-        try:
-            await sync_to_async(cache.set)(cache_key, data, TradeUpdateManager.CACHE_TIMEOUT)
-        except Exception as e:
-            logger.error(f"Failed to set cached trades: {str(e)}")
+        await sync_to_async(set_value)(cache_key, data, TradeUpdateManager.CACHE_TIMEOUT)
 
     @staticmethod
     def get_plan_levels(plan_type: str) -> List[str]:
@@ -65,6 +186,11 @@ class TradeUpdatesConsumer(AsyncWebsocketConsumer):
     RECONNECT_DELAY = 2   # Delay between reconnection attempts in seconds
     MAX_RETRIES = 3       # Maximum number of reconnection attempts
     MESSAGE_DEDUPLICATION_TIMEOUT = 5  # Time window in seconds to deduplicate messages
+    COMPANY_UPDATE_DEDUPLICATION_TIMEOUT = 60  # Time window in seconds to suppress identical company payloads
+    REFRESH_BURST = 3           # Refresh requests allowed back to back
+    REFRESH_RATE = 1 / 10       # Refresh tokens regained per second (one every 10 seconds)
+    TRADE_COUNTS_MEMO_TTL = 30  # Seconds to reuse trade counts for subscription_info requests
+    USER_CACHE_TIMEOUT = 60 * 60  # Per-user entries are invalidated by tag, the TTL is only a backstop
 
     ERROR_MESSAGES = {
         4001: "No authentication token provided. Please log in and try again.",
@@ -73,7 +199,8 @@ class TradeUpdatesConsumer(AsyncWebsocketConsumer):
         4004: "An unexpected error occurred during authentication.",
         4005: "No active subscription found. Please subscribe to continue.",
         4006: "Failed to set up trade updates. Please try again later.",
-        4007: "Maximum connection retries exceeded. Please check your network and try again."
+        4007: "Maximum connection retries exceeded. Please check your network and try again.",
+        4008: "Too many refresh requests. Please wait before refreshing again."
     }
 
     SUCCESS_MESSAGES = {
@@ -93,8 +220,14 @@ class TradeUpdatesConsumer(AsyncWebsocketConsumer):
         self.connection_retries = 0
         self.user_group = None
         self._initial_data_task = None
-        # Store processed messages to avoid duplicates
-        self.processed_messages = set()
+        # In-memory dedupe of incoming events (by content hash) and of
+        # outgoing company payloads (by company id), no Redis round trips
+        self.processed_messages = RecentMessageCache(self.MESSAGE_DEDUPLICATION_TIMEOUT)
+        self.recent_company_updates = RecentMessageCache(self.COMPANY_UPDATE_DEDUPLICATION_TIMEOUT)
+        self.refresh_bucket = TokenBucket(self.REFRESH_BURST, self.REFRESH_RATE)
+        # Last computed trade counts and when they stop being reusable
+        self._trade_counts_memo = None
+        self._trade_counts_memo_expires_at = 0.0
         # Trade limits based on plan type
         self.company_limits = {
             'BASIC': {
@@ -136,8 +269,8 @@ class TradeUpdatesConsumer(AsyncWebsocketConsumer):
                 await self.close(code=4003)
                 return
 
-            # Clear any cached data from previous connections for this user
-            await self._clear_user_cache()
+            # Start this connection's update tracking afresh
+            await self._reset_update_state()
             
             self.is_connected = True
             await self.send_success("connected")
@@ -259,6 +392,7 @@ class TradeUpdatesConsumer(AsyncWebsocketConsumer):
             
             # Get trade counts and limits
             trade_counts = await self._get_trade_counts()
+            self._remember_trade_counts(trade_counts)
             plan_name = self.subscription.plan.name
             limits = self.company_limits.get(plan_name, {'new': None, 'previous': None, 'total': None})
             
@@ -293,11 +427,12 @@ class TradeUpdatesConsumer(AsyncWebsocketConsumer):
     def _get_trade_counts(self, bypass_cache=True):
         """Get current trade counts for the user."""
         cache_key = f"trade_counts_{self.user.id}_{self.subscription.id}"
-        cached_counts = None if bypass_cache else cache.get(cache_key)
-        if cached_counts and not bypass_cache:
-            return cached_counts
+        cached_counts = None if bypass_cache else get_value(cache_key)
+        if cached_counts and cached_counts.fresh:
+            return cached_counts.value
 
         try:
+            versions = tag_versions(self._user_cache_tags())
             from .models import Trade
             from django.db.models import Count, Q
             
@@ -342,8 +477,7 @@ class TradeUpdatesConsumer(AsyncWebsocketConsumer):
                 'total': new_companies + previous_companies
             }
 
-            # Cache for 5 minutes
-            cache.set(cache_key, result, 300)
+            set_value(cache_key, result, self.USER_CACHE_TIMEOUT, tags=versions)
             return result
 
         except Exception as e:
@@ -430,12 +564,13 @@ class TradeUpdatesConsumer(AsyncWebsocketConsumer):
         from django.db.models import Prefetch, Q, Max, Min, OuterRef, Subquery
         
         cache_key = f"company_data_{self.user.id}_{self.subscription.id}"
-        cached_data = None if bypass_cache else cache.get(cache_key)
-        if cached_data and not bypass_cache:
+        cached_data = None if bypass_cache else get_value(cache_key)
+        if cached_data and cached_data.fresh:
             logger.info(f"Using cached company data for user {self.user.id}")
-            return cached_data
+            return cached_data.value
         
         try:
+            versions = tag_versions(self._user_cache_tags())
             with transaction.atomic():
                 subscription_start = self.subscription.start_date
                 plan_name = self.subscription.plan.name
@@ -554,8 +689,7 @@ class TradeUpdatesConsumer(AsyncWebsocketConsumer):
                     }
                 }
 
-                # Cache the result for 5 minutes
-                cache.set(cache_key, result, 300)
+                set_value(cache_key, result, self.USER_CACHE_TIMEOUT, tags=versions)
                 return result
 
         except Exception as e:
@@ -645,8 +779,7 @@ class TradeUpdatesConsumer(AsyncWebsocketConsumer):
     async def send_initial_data(self):
         """Send initial trade data to the client."""
         try:
-            # Clear cache first to ensure fresh data
-            await self._clear_user_cache()
+            await self._reset_update_state()
             
             # Always get fresh data for initial load
             data = await self._get_filtered_company_data(bypass_cache=True) 
@@ -676,24 +809,18 @@ class TradeUpdatesConsumer(AsyncWebsocketConsumer):
             trade_id = data["trade_id"]
             trade_status = data.get("trade_status", "")
             action = data.get("action", "updated")
-            timestamp = data.get("timestamp", timezone.now().isoformat())
-            
-            # Create a unique message identifier
-            message_id = f"{trade_id}:{trade_status}:{action}:{timestamp[:19]}"  # Truncate timestamp to seconds
             
-            # Check if we've already processed this message recently
-            if message_id in self.processed_messages:
-                return
-                
             # Skip PENDING trades
             if trade_status == 'PENDING':
                 return
-                
-            # Add to processed messages
-            self.processed_messages.add(message_id)
-            
-            # Schedule cleanup of old message IDs
-            asyncio.create_task(self._cleanup_message_id(message_id))
+
+            # Identify the message by its content; the timestamp differs between
+            # otherwise identical signals so it is left out of the hash
+            message_id = RecentMessageCache.fingerprint(
+                {key: value for key, value in data.items() if key != 'timestamp'}
+            )
+            if self.processed_messages.is_duplicate(message_id):
+                return
             
             # Check eligibility for this trade update
             is_eligible = False
@@ -714,7 +841,7 @@ class TradeUpdatesConsumer(AsyncWebsocketConsumer):
                 # Always get fresh data for trade updates, bypassing cache
                 company_data = await self._get_company_with_trade(trade_id)
 
-                if company_data:
+                if company_data and not self._is_duplicate_message(company_data):
                     # Get fresh subscription info with accurate counts
                     subscription_info = await self._get_subscription_info()
                     
@@ -730,30 +857,13 @@ class TradeUpdatesConsumer(AsyncWebsocketConsumer):
             logger.error(f"Error processing trade update: {str(e)}")
             logger.error(traceback.format_exc())
 
-    async def _cleanup_message_id(self, message_id):
-        """Remove message ID from processed set after timeout."""
-        await asyncio.sleep(self.MESSAGE_DEDUPLICATION_TIMEOUT)
-        if message_id in self.processed_messages:
-            self.processed_messages.remove(message_id)
-            
-    # Add a helper method to check for exact duplicate messages
     def _is_duplicate_message(self, company_data):
-        """Check if this is a duplicate company update."""
-        cache_key = f"last_company_update_{self.user.id}_{company_data['id']}"
-        last_update = self.cache.get(cache_key)
-        
-        if last_update:
-            # Compare essential fields to determine if it's actually different
-            is_different = (
-                last_update.get('intraday_trade') != company_data.get('intraday_trade') or
-                last_update.get('positional_trade') != company_data.get('positional_trade')
-            )
-            if not is_different:
-                return True
-                
-        # Store the current update
-        self.cache.set(cache_key, company_data, 60)  # Cache for 1 minute
-        return False
+        """Check if this company payload was already sent to this client recently."""
+        payload_hash = RecentMessageCache.fingerprint({
+            'intraday_trade': company_data.get('intraday_trade'),
+            'positional_trade': company_data.get('positional_trade')
+        })
+        return self.recent_company_updates.is_duplicate(company_data['id'], payload_hash)
 
     @db_sync_to_async
     def _get_trade_info(self, trade_id):
@@ -1015,9 +1125,23 @@ class TradeUpdatesConsumer(AsyncWebsocketConsumer):
             # If cache fails, try to fetch directly
             return await fetch_func()
 
-    async def _get_subscription_info(self):
-        """Get subscription information."""
-        trade_counts = await self._get_trade_counts()
+    def _remember_trade_counts(self, trade_counts):
+        """Memoize trade counts for this connection."""
+        self._trade_counts_memo = trade_counts
+        self._trade_counts_memo_expires_at = time.monotonic() + self.TRADE_COUNTS_MEMO_TTL
+
+    def _get_memoized_trade_counts(self):
+        """Return memoized trade counts if they are still fresh."""
+        if self._trade_counts_memo is not None and time.monotonic() < self._trade_counts_memo_expires_at:
+            return self._trade_counts_memo
+        return None
+
+    async def _get_subscription_info(self, memoized=False):
+        """Get subscription information, optionally reusing recently computed counts."""
+        trade_counts = self._get_memoized_trade_counts() if memoized else None
+        if trade_counts is None:
+            trade_counts = await self._get_trade_counts()
+            self._remember_trade_counts(trade_counts)
         plan_name = self.subscription.plan.name
         limits = self.company_limits.get(plan_name, {'new': None, 'previous': None, 'total': None})
         
@@ -1037,23 +1161,31 @@ class TradeUpdatesConsumer(AsyncWebsocketConsumer):
             'remaining': remaining
         }
 
+    def _user_cache_tags(self):
+        """
+        Tags of this user's cached trade counts and company data. Signals
+        invalidate them when the user's subscription or a trade of a plan
+        tier they can see changes; only an explicit refresh clears them here.
+        """
+        plan_levels = self.trade_manager.get_plan_levels(self.subscription.plan.name)
+        return [user_tag(self.user.id), subscription_tag(self.subscription.id)] + [
+            plan_tag(plan) for plan in plan_levels
+        ]
+
+    async def _reset_update_state(self):
+        """The client is about to receive a full payload again."""
+        self.recent_company_updates.clear()
+
     async def _clear_user_cache(self):
-        """Clear cached data for this user to ensure fresh data on reconnect."""
+        """Drop this user's cached trade counts and company data before an explicit refresh."""
         try:
-            user_id = getattr(self.user, 'id', 'unknown')
-            subscription_id = getattr(self.subscription, 'id', 'unknown')
-            
-            # Keys that need to be cleared
-            keys_to_clear = [
-                f"trade_counts_{user_id}_{subscription_id}",
-                f"company_data_{user_id}_{subscription_id}",
-                f"last_company_update_{user_id}_*"
-            ]
-            
-            for key in keys_to_clear:
-                await sync_to_async(cache.delete)(key)
-                
-            logger.info(f"Cleared cache for user {user_id} with subscription {subscription_id}")
+            self._trade_counts_memo = None
+            await sync_to_async(invalidate)(
+                f"trade_counts_{self.user.id}_{self.subscription.id}",
+                f"company_data_{self.user.id}_{self.subscription.id}",
+            )
+            await self._reset_update_state()
+            logger.info(f"Cleared cache for user {self.user.id} with subscription {self.subscription.id}")
         except Exception as e:
             logger.error(f"Error clearing user cache: {str(e)}")
             logger.error(traceback.format_exc())
@@ -1117,12 +1249,21 @@ class TradeUpdatesConsumer(AsyncWebsocketConsumer):
                     'timestamp': timezone.now().isoformat()
                 }))
             elif action == 'refresh':
-                # Client requested data refresh - clear cache and resend data
+                if not self.refresh_bucket.consume():
+                    retry_after = int(self.refresh_bucket.retry_after()) + 1
+                    await self.send_error(4008, f"Retry in {retry_after} seconds.")
+                    return
+
+                # Concurrent refreshes for this user share one computation
                 logger.info(f"User {self.user.id} requested data refresh")
                 await self._clear_user_cache()
                 try:
-                    # Get fresh data and bypass cache
-                    data = await self._get_filtered_company_data(bypass_cache=True)
+                    data = await refresh_single_flight.run(
+                        (self.user.id, self.subscription.id),
+                        lambda: self._get_filtered_company_data(bypass_cache=True)
+                    )
+                    self.recent_company_updates.clear()
+                    self._remember_trade_counts(data['subscription']['counts'])
                     
                     await self.send(text_data=json.dumps({
                         'type': 'initial_data',
@@ -1135,28 +1276,11 @@ class TradeUpdatesConsumer(AsyncWebsocketConsumer):
                     logger.error(f"Error processing refresh: {str(e)}")
                     await self.send_error(4006, "Failed to refresh data")
             elif action == 'subscription_info':
-                # Send subscription info
-                trade_counts = await self._get_trade_counts()
-                plan_name = self.subscription.plan.name
-                limits = self.company_limits.get(plan_name, {'new': None, 'previous': None, 'total': None})
-                
-                # Calculate remaining trades
-                remaining = {
-                    'new': None if limits['new'] is None else max(0, limits['new'] - trade_counts['new']),
-                    'previous': None if limits['previous'] is None else max(0, limits['previous'] - trade_counts['previous']),
-                    'total': None if limits['total'] is None else max(0, limits['total'] - trade_counts['total'])
-                }
-                
+                # Answer from memoized counts when they are recent enough
+                subscription_info = await self._get_subscription_info(memoized=True)
                 await self.send(text_data=json.dumps({
                     'type': 'subscription_info',
-                    'data': {
-                        'plan': plan_name,
-                        'start_date': self.subscription.start_date.isoformat(),
-                        'end_date': self.subscription.end_date.isoformat(),
-                        'limits': limits,
-                        'current': trade_counts,
-                        'remaining': remaining
-                    }
+                    'data': subscription_info
                 }))
             else:
                 logger.warning(f"Unknown action received: {action}")
@@ -1195,58 +1319,57 @@ class TradeUpdatesConsumer(AsyncWebsocketConsumer):
             logger.error(f"Error sending system notification: {str(e)}")
 
 
+# Every index connect reads the snapshot; a second-old local copy is fine for it
+enable_local('cached_indices', ttl=1)
+
+
 class IndexUpdateManager:
     """Utility class for managing index data updates."""
     
     @staticmethod
     async def get_cached_indices():
         """Get cached index data."""
-        try:
-            return await sync_to_async(cache.get)('cached_indices')
-        except Exception as e:
-            logger.error(f"Failed to get cached indices: {str(e)}")
-            return None
+        entry = await sync_to_async(get_value)('cached_indices')
+        return entry.value if entry else None
 
     @staticmethod
-    async def set_cached_indices(data):
+    async def set_cached_indices(data, timeout=3600):
         """Store index data in cache."""
-        try:
-            await sync_to_async(cache.set)('cached_indices', data, 3600)  # 1 hour
-        except Exception as e:
-            logger.error(f"Failed to set cached indices: {str(e)}")
+        await sync_to_async(set_value)('cached_indices', data, soft_ttl=timeout, stale_ttl=0, jitter=0)
 
 
 class IndexUpdatesConsumer(AsyncWebsocketConsumer):
-    """WebSocket consumer for delivering real-time index updates."""
+    """
+    WebSocket consumer for delivering real-time index updates.
+
+    Ticks are published to the group by the `ingest_index_ticks` command,
+    already conflated and rate limited; the latest value per index is kept
+    under `cached_indices` for the initial payload.
+    """
     
     async def connect(self):
         """Handle WebSocket connection establishment."""
         await self.accept()
         
         # Add to index updates group
-        await self.channel_layer.group_add('index_updates', self.channel_name)
+        await self.channel_layer.group_add(INDEX_UPDATES_GROUP, self.channel_name)
         
         # Send initial index data
         await self.send_initial_indices()
         
     async def disconnect(self, close_code):
         """Handle WebSocket disconnection."""
-        await self.channel_layer.group_discard('index_updates', self.channel_name)
+        await self.channel_layer.group_discard(INDEX_UPDATES_GROUP, self.channel_name)
     
     async def send_initial_indices(self):
         """Send initial index data to client."""
         try:
-            # Get cached indices or fetch new ones
+            # Latest value per index, written by the tick distributor
             indices = await IndexUpdateManager.get_cached_indices()
-            
-            if not indices:
-                # In a real implementation, you would fetch from database or external service
-                indices = await self._fetch_index_data()
-                await IndexUpdateManager.set_cached_indices(indices)
                 
             await self.send(text_data=json.dumps({
                 'type': 'initial_indices',
-                'data': indices
+                'data': indices or []
             }, cls=DecimalEncoder))
             
         except Exception as e:
@@ -1256,31 +1379,6 @@ class IndexUpdatesConsumer(AsyncWebsocketConsumer):
                 'message': 'Failed to load index data'
             }))
     
-    async def _fetch_index_data(self):
-        """Fetch index data from database or external service."""
-        # This would be implemented based on your specific data sources
-        # Placeholder implementation
-        return [
-            {
-                'id': 'nifty50',
-                'name': 'NIFTY 50',
-                'value': '20123.45',
-                'change': '142.50',
-                'change_percent': '0.71',
-                'trend': 'up',
-                'updated_at': timezone.now().isoformat()
-            },
-            {
-                'id': 'sensex',
-                'name': 'SENSEX',
-                'value': '65789.12',
-                'change': '456.78',
-                'change_percent': '0.69',
-                'trend': 'up',
-                'updated_at': timezone.now().isoformat()
-            }
-        ]
-    
     async def index_update(self, event):
         """Handle index update messages."""
         try:
@@ -3,11 +3,12 @@ from rest_framework.response import Response
 from rest_framework.decorators import action
 from django_filters import rest_framework as filters
 from django.core.files.storage import default_storage
-from ..models import Company
+from ..models import Company, CompanyImport
 from ..serializers.company_serializers import CompanySerializer
 from ..filters.company_filter import CompanyFilter
 from ..pagination import CompanyPagination
 from ..tasks import process_csv_file
+from ..instrument_search import search_instruments, order_by_ids, DEFAULT_LIMIT
 
 class CompanyViewSet(viewsets.ModelViewSet):
     queryset = Company.objects.all()
@@ -57,6 +58,21 @@ class CompanyViewSet(viewsets.ModelViewSet):
         instance.save()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(detail=False, methods=['GET'])
+    def search(self, request):
+        """Ranked autocomplete over the instrument master: ?q=<text>&limit=<n>"""
+        try:
+            limit = min(int(request.query_params.get('limit', DEFAULT_LIMIT)), 100)
+        except ValueError:
+            return Response(
+                {'error': 'limit must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        ids = search_instruments(request.query_params.get('q', ''), limit=max(limit, 1))
+        serializer = self.get_serializer(order_by_ids(Company.objects.all(), ids), many=True)
+        return Response(serializer.data)
+
     @action(detail=False, methods=['POST'])
     def upload_csv(self, request):
         if 'file' not in request.FILES:
@@ -72,11 +88,18 @@ class CompanyViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        mode = request.data.get('mode', CompanyImport.Mode.INSERT)
+        if mode not in CompanyImport.Mode.values:
+            return Response(
+                {'error': f"mode must be one of: {', '.join(CompanyImport.Mode.values)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         # Save file temporarily
         file_path = default_storage.save(f'temp/company_uploads/{csv_file.name}', csv_file)
         
         # Process file asynchronously
-        task = process_csv_file.delay(file_path)
+        task = process_csv_file.delay(file_path, mode=mode)
         
         return Response({
             'message': 'File uploaded successfully. Processing started.',
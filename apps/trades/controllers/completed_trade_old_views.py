@@ -42,6 +42,8 @@ from ..pagination import TradePagination
 
 from ..filters.GroupedTradeFilter import GroupedTradeFilter
 from ..serializers.complete_trade_old_serializer import TradeListItemSerializer
+from core.conditional import ConditionalListMixin, TRADES_GENERATION
+from core.response_cache import ResponseCacheMixin
 
 from django.utils import timezone
 from rest_framework import viewsets
@@ -84,11 +86,19 @@ class TradePaginations(pagination.PageNumberPagination):
             'results': data
         })
 
-class CompletedTradeViewSet(viewsets.ReadOnlyModelViewSet):
+class CompletedTradeViewSet(ConditionalListMixin, ResponseCacheMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Trade.objects.all()
     serializer_class = TradeListItemSerializer
     filter_backends = (filters.DjangoFilterBackend,)
     pagination_class = TradePagination
+    etag_generations = (TRADES_GENERATION,)
+    response_cache_endpoint = 'trades.completed_trades'
+    response_cache_generations = (TRADES_GENERATION,)
+    response_cache_vary_on_plan = False
+
+    def get_etag_scope(self):
+        # Completed trades are the same for every caller
+        return []
 
     def get_queryset(self):
         return Trade.objects.filter(status='COMPLETED').select_related('company', 'analysis', 'insight').prefetch_related('history')
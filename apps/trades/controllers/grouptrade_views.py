@@ -7,6 +7,8 @@ from collections import defaultdict
 
 from ..models import Trade, Company
 from ..pagination import TradePagination
+from ..trade_summaries import PLAN_RANKS
+from core.conditional import ConditionalListMixin, TRADES_GENERATION
 
 from ..filters.GroupedTradeFilter import GroupedTradeFilter
 from ..serializers.GroupedTradeSerializer import GroupedTradeSerializer
@@ -16,15 +18,24 @@ from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import PermissionDenied
 from django_filters import rest_framework as filters
-from django.db.models import Q
+from django.db.models import Q, F
 
-class GroupedTradeViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Company.objects.filter(trades__isnull=False).distinct()
+class GroupedTradeViewSet(ConditionalListMixin, viewsets.ReadOnlyModelViewSet):
+    # Everything shown comes from the CompanyTradeSummary read model, so a
+    # page is one indexed scan with the summary joined in
+    queryset = Company.objects.filter(
+        trade_summary__isnull=False
+    ).select_related('trade_summary').order_by(
+        F('trade_summary__latest_active_trade_at').desc(nulls_last=True), 'id'
+    )
     serializer_class = GroupedTradeSerializer
     permission_classes = [IsAuthenticated]
     filterset_class = GroupedTradeFilter
     filter_backends = (filters.DjangoFilterBackend,)
     pagination_class = TradePagination
+    # Keyset pages walk companies by symbol; page numbers keep the recency order
+    cursor_ordering = ('trading_symbol', 'id')
+    etag_generations = (TRADES_GENERATION,)
     
     def get_queryset(self):
         user = self.request.user
@@ -44,7 +55,7 @@ class GroupedTradeViewSet(viewsets.ReadOnlyModelViewSet):
         
         # Handle users with no subscription
         if not current_subscription:
-            free_trades = base_queryset.filter(trades__is_free_call=True)
+            free_trades = base_queryset.filter(trade_summary__has_free_call=True)
             if not free_trades.exists():
                 raise PermissionDenied(
                     detail="You don't have an active subscription plan. "
@@ -53,21 +64,11 @@ class GroupedTradeViewSet(viewsets.ReadOnlyModelViewSet):
             return free_trades
 
         # Process based on subscription plan
-        plan_type = current_subscription.plan.name
-        plan_filters = {
-            'BASIC': ['BASIC'],
-            'PREMIUM': ['BASIC', 'PREMIUM'],
-            'SUPER_PREMIUM': ['BASIC', 'PREMIUM', 'SUPER_PREMIUM'],
-            'FREE_TRIAL': ['BASIC', 'PREMIUM', 'SUPER_PREMIUM']  # Added FREE_TRIAL type
-        }
-        
-        allowed_plans = plan_filters.get(plan_type, [])
-        
-        filtered_queryset = base_queryset.filter(
-            trades__status__in=['ACTIVE', 'COMPLETED']
-        ).filter(
-            Q(trades__plan_type__in=allowed_plans) |
-            Q(trades__is_free_call=True)
-        ).distinct()
-        
-        return filtered_queryset
\ No newline at end of file
+        plan_rank = PLAN_RANKS.get(current_subscription.plan.name)
+        if plan_rank is None:
+            return base_queryset.filter(trade_summary__has_free_call=True)
+
+        return base_queryset.filter(
+            Q(trade_summary__min_plan_rank__lte=plan_rank) |
+            Q(trade_summary__has_free_call=True)
+        )
@@ -7,6 +7,8 @@ from django.core.exceptions import ObjectDoesNotExist
 from django.db import IntegrityError, DatabaseError
 from ..models import Insight, Trade
 from ..serializers.insight_serializers import InsightSerializer, InsightCreateUpdateSerializer
+from core.conditional import TRADES_GENERATION
+from core.response_cache import cache_response
 
 class InsightViewSet(viewsets.ModelViewSet):
     queryset = Insight.objects.all()
@@ -65,6 +67,7 @@ class InsightViewSet(viewsets.ModelViewSet):
             )
 
     @action(detail=True, methods=['GET'])
+    @cache_response('trades.insight_for_trade', generations=(TRADES_GENERATION,), vary_on_plan=False)
     def for_trade(self, request, pk=None):
         try:
             try:
@@ -18,12 +18,14 @@ from ..serializers.trade_serializers import (
 )
 from ..filters.TradeFilter import TradeFilter
 from ..pagination import TradePagination
+from core.conditional import ConditionalListMixin, TRADES_GENERATION
 import logging
 
 logger = logging.getLogger(__name__)
 
-class TradeViewSet(viewsets.ModelViewSet):
+class TradeViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     queryset = Trade.objects.all()
+    etag_generations = (TRADES_GENERATION,)
     serializer_class = TradeSerializer
     filterset_class = TradeFilter
     filter_backends = (filters.DjangoFilterBackend,)
@@ -1,6 +1,7 @@
 from django.db.models import Q
 from django_filters import rest_framework as filters
 from ..models import Company, InstrumentType
+from ..instrument_search import filter_instruments
 
 class GroupedTradeFilter(filters.FilterSet):
     search = filters.CharFilter(method='search_filter')
@@ -21,14 +22,23 @@ class GroupedTradeFilter(filters.FilterSet):
         #     return queryset.filter(instrument_type=InstrumentType.COMMODITY)
         return queryset
     def search_filter(self, queryset, name, value):
-        return queryset.filter(
-            Q(trading_symbol__icontains=value) |
-            Q(script_name__icontains=value) |
-            Q(display_name__icontains=value)
-        )
+        # Grouped trades keep their recency order; the index only narrows companies
+        ids = filter_instruments(value)
+        if ids is None:
+            return queryset.filter(
+                Q(trading_symbol__icontains=value) |
+                Q(script_name__icontains=value) |
+                Q(display_name__icontains=value)
+            )
+        return queryset.filter(id__in=ids)
     
     def status_filter(self, queryset, name, value):
-        return queryset.filter(trades__status=value)
+        # ACTIVE/COMPLETED are flags on the trade summary; anything else needs the trades join
+        if value == 'ACTIVE':
+            return queryset.filter(trade_summary__has_active_trade=True)
+        if value == 'COMPLETED':
+            return queryset.filter(trade_summary__has_completed_trade=True)
+        return queryset.filter(trades__status=value).distinct()
 
     class Meta:
         model = Company
@@ -1,6 +1,7 @@
-from django_filters import rest_framework as filters
 from django.db.models import Q
+from django_filters import rest_framework as filters
 from ..models import Trade
+from ..instrument_search import filter_instruments
 
 class TradeFilter(filters.FilterSet):
     search = filters.CharFilter(method='search_filter')
@@ -17,8 +18,12 @@ class TradeFilter(filters.FilterSet):
         fields = ['status', 'trade_type', 'plan_type', 'is_free_call']
 
     def search_filter(self, queryset, name, value):
-        return queryset.filter(
-            Q(company__trading_symbol__icontains=value) |
-            Q(company__script_name__icontains=value) |
-            Q(company__display_name__icontains=value)
-        )
\ No newline at end of file
+        ids = filter_instruments(value)
+        if ids is None:
+            # Too broad for an id list; let the database scan
+            return queryset.filter(
+                Q(company__trading_symbol__icontains=value) |
+                Q(company__script_name__icontains=value) |
+                Q(company__display_name__icontains=value)
+            )
+        return queryset.filter(company_id__in=ids)
\ No newline at end of file
@@ -4,6 +4,7 @@ from rest_framework.decorators import action
 from django_filters import rest_framework as filters
 from django.db.models import Q
 from ..models import Company, InstrumentType
+from ..instrument_search import filter_instruments, order_by_ids
 
 class CompanyFilter(filters.FilterSet):
     search = filters.CharFilter(method='search_filter')
@@ -19,9 +20,13 @@ class CompanyFilter(filters.FilterSet):
         fields = ['exchange', 'instrument_type', 'is_active']
 
     def search_filter(self, queryset, name, value):
-        return queryset.filter(
-            Q(trading_symbol__icontains=value) |
-            Q(script_name__icontains=value) |
-            Q(display_name__icontains=value) |
-            Q(exchange__icontains=value)
-        )
\ No newline at end of file
+        # Ranked by the in-memory instrument index instead of OR-ed icontains scans
+        ids = filter_instruments(value)
+        if ids is None:
+            # Too broad to rank by an id list; let the database scan
+            return queryset.filter(
+                Q(trading_symbol__icontains=value) |
+                Q(script_name__icontains=value) |
+                Q(display_name__icontains=value)
+            )
+        return order_by_ids(queryset, ids)
\ No newline at end of file
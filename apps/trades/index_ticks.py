@@ -0,0 +1,197 @@
+import json
+import time
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from decimal import Decimal, InvalidOperation
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+INDEX_UPDATES_GROUP = 'index_updates'
+
+
+def normalize_tick(raw):
+    """Bring a raw tick into the shape IndexUpdatesConsumer sends to clients."""
+    tick = {
+        'id': str(raw['id']),
+        'name': raw.get('name') or str(raw['id']).upper(),
+        'value': str(raw['value']),
+        'change': str(raw.get('change', '0')),
+        'change_percent': str(raw.get('change_percent', '0')),
+        'updated_at': raw.get('updated_at') or timezone.now().isoformat(),
+    }
+    trend = raw.get('trend')
+    if not trend:
+        try:
+            change = Decimal(tick['change'])
+        except InvalidOperation:
+            change = Decimal('0')
+        trend = 'up' if change > 0 else 'down' if change < 0 else 'flat'
+    tick['trend'] = trend
+    return tick
+
+
+class IndexTickBuffer:
+    """
+    Fixed-size ring buffer holding the latest tick per index.
+
+    Each index owns one slot; a newer tick overwrites the slot, so any number
+    of ticks between two publishes conflate into one. When more indices than
+    slots are seen, the slot written longest ago is reused.
+    """
+
+    def __init__(self, capacity=64):
+        self.capacity = capacity
+        self._slots = [None] * capacity
+        # index id -> slot, least recently written first
+        self._positions = OrderedDict()
+        self._dirty = set()
+
+    def update(self, tick):
+        index_id = tick['id']
+        position = self._positions.get(index_id)
+        if position is not None:
+            self._positions.move_to_end(index_id)
+        else:
+            if len(self._positions) < self.capacity:
+                position = len(self._positions)
+            else:
+                _, position = self._positions.popitem(last=False)
+            self._positions[index_id] = position
+        self._slots[position] = tick
+        self._dirty.add(position)
+
+    def drain(self):
+        """Return the ticks updated since the last drain, one per index."""
+        ticks = [self._slots[position] for position in sorted(self._dirty)]
+        self._dirty.clear()
+        return ticks
+
+    def snapshot(self):
+        return [tick for tick in self._slots if tick is not None]
+
+    def __len__(self):
+        return len(self._positions)
+
+
+class TickSource(ABC):
+    """Base class for tick sources; `ticks` yields raw tick dicts."""
+
+    @abstractmethod
+    def ticks(self):
+        """An async iterator of raw tick dicts."""
+
+
+class ReplayFileSource(TickSource):
+    """
+    Replays ticks from a JSON-lines file. An optional `ts` field (seconds)
+    paces the replay, scaled by `speed`; lines without it are sent at once.
+    """
+
+    def __init__(self, path, speed=1.0, loop=False):
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+
+    def _read(self):
+        with open(self.path) as handle:
+            for line_number, line in enumerate(handle, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    logger.warning(f"Skipping invalid tick on line {line_number} of {self.path}")
+
+    async def ticks(self):
+        while True:
+            previous_ts = None
+            for raw in self._read():
+                ts = raw.pop('ts', None)
+                if ts is not None and previous_ts is not None and self.speed > 0:
+                    await asyncio.sleep(max(0, (ts - previous_ts) / self.speed))
+                if ts is not None:
+                    previous_ts = ts
+                yield raw
+            if not self.loop:
+                return
+
+
+TICK_SOURCES = {
+    'replay': ReplayFileSource,
+}
+
+
+def get_tick_source(name, **kwargs):
+    """Build a tick source by registered name or dotted path."""
+    source_class = TICK_SOURCES.get(name) or import_string(name)
+    return source_class(**kwargs)
+
+
+class TickDistributor:
+    """
+    Reads ticks from a source into an IndexTickBuffer and publishes the
+    conflated changes to the index_updates group at most `max_rate` times a
+    second, however bursty the source is.
+    """
+
+    def __init__(self, source, channel_layer, max_rate=2.0, buffer=None, snapshot_timeout=300):
+        self.source = source
+        self.channel_layer = channel_layer
+        self.interval = 1.0 / max_rate
+        self.buffer = buffer or IndexTickBuffer()
+        self.snapshot_timeout = snapshot_timeout
+        self.ticks_received = 0
+        self.batches_published = 0
+        self._snapshot_written_at = None
+
+    async def ingest(self):
+        async for raw in self.source.ticks():
+            try:
+                self.buffer.update(normalize_tick(raw))
+                self.ticks_received += 1
+            except (KeyError, TypeError) as e:
+                logger.warning(f"Dropping malformed tick {raw!r}: {str(e)}")
+
+    async def write_snapshot(self):
+        from .consumers import IndexUpdateManager
+        await IndexUpdateManager.set_cached_indices(self.buffer.snapshot(), self.snapshot_timeout)
+        self._snapshot_written_at = time.monotonic()
+
+    async def publish_pending(self):
+        ticks = self.buffer.drain()
+        if not ticks:
+            # Keep the snapshot for newly connecting clients alive while the
+            # feed is quiet (market closed, stalled source)
+            if self._snapshot_written_at is not None and (
+                time.monotonic() - self._snapshot_written_at >= self.snapshot_timeout / 2
+            ):
+                await self.write_snapshot()
+            return False
+
+        await self.write_snapshot()
+        await self.channel_layer.group_send(INDEX_UPDATES_GROUP, {
+            'type': 'index_update',
+            'data': ticks
+        })
+        self.batches_published += 1
+        return True
+
+    async def run(self):
+        ingest_task = asyncio.ensure_future(self.ingest())
+        try:
+            while True:
+                started = time.monotonic()
+                finished = ingest_task.done()
+                await self.publish_pending()
+                if finished:
+                    # Source exhausted and everything it sent is published
+                    ingest_task.result()
+                    return
+                await asyncio.sleep(max(0, self.interval - (time.monotonic() - started)))
+        finally:
+            ingest_task.cancel()
@@ -0,0 +1,121 @@
+import logging
+from collections import namedtuple
+import numpy as np
+from core.conditional import GenerationSnapshot, INSTRUMENTS_GENERATION
+from .models import Company, InstrumentType
+
+logger = logging.getLogger(__name__)
+
+Instrument = namedtuple(
+    'Instrument', ['id', 'token_id', 'exchange', 'trading_symbol', 'instrument_type', 'expiry_date']
+)
+
+INSTRUMENT_TYPES = tuple(InstrumentType.values)
+
+MASTER_CHECK_INTERVAL = 5
+
+
+class InstrumentMaster:
+    """
+    Read-only table of every Company row, held in one numpy structured array.
+
+    Exchange and instrument type are stored as small codes. The table is
+    sorted by id, and token_id and (trading_symbol, exchange) lookups go
+    through sorted index arrays, so every lookup is a binary search and the
+    table costs a few bytes per row on top of its columns.
+    """
+
+    def __init__(self, rows):
+        columns = list(zip(*rows)) or [()] * 6
+        ids, token_ids, exchanges, symbols, instrument_types, expiry_dates = columns
+
+        exchange_values, exchange_codes = np.unique(np.array(exchanges, dtype=str), return_inverse=True)
+        self.exchanges = tuple(str(exchange) for exchange in exchange_values)
+        type_codes = {value: code for code, value in enumerate(INSTRUMENT_TYPES)}
+        types, type_index = np.unique(np.array(instrument_types, dtype=str), return_inverse=True)
+        symbol_width = max((len(symbol) for symbol in symbols), default=1)
+
+        self.table = np.empty(len(ids), dtype=[
+            ('id', 'i8'),
+            ('token_id', 'u4'),
+            ('exchange', 'u1'),
+            ('trading_symbol', f'U{symbol_width}'),
+            ('instrument_type', 'u1'),
+            ('expiry_date', 'datetime64[D]'),
+        ])
+        self.table['id'] = ids
+        self.table['token_id'] = token_ids
+        self.table['exchange'] = exchange_codes
+        self.table['trading_symbol'] = symbols
+        self.table['instrument_type'] = np.array([type_codes.get(value, 0) for value in types], dtype='u1')[type_index]
+        self.table['expiry_date'] = np.array(expiry_dates, dtype='datetime64[D]')
+        self.table.sort(order='id')
+
+        self.token_order = np.argsort(self.table['token_id'], kind='stable')
+        self.tokens = self.table['token_id'][self.token_order]
+        self.symbol_order = np.lexsort((self.table['exchange'], self.table['trading_symbol']))
+        self.symbols = self.table['trading_symbol'][self.symbol_order]
+
+    @classmethod
+    def from_database(cls):
+        return cls(Company.objects.values_list(
+            'id', 'token_id', 'exchange', 'trading_symbol', 'instrument_type', 'expiry_date'
+        ).iterator(chunk_size=5000))
+
+    def __len__(self):
+        return len(self.table)
+
+    def __contains__(self, token_id):
+        return self._token_index(token_id) is not None
+
+    def _token_index(self, token_id):
+        position = int(np.searchsorted(self.tokens, token_id))
+        if position < len(self.tokens) and self.tokens[position] == token_id:
+            return self.token_order[position]
+        return None
+
+    def _instrument(self, index):
+        row = self.table[index]
+        expiry_date = None if np.isnat(row['expiry_date']) else row['expiry_date'].item()
+        return Instrument(
+            int(row['id']), int(row['token_id']), self.exchanges[row['exchange']],
+            str(row['trading_symbol']), INSTRUMENT_TYPES[row['instrument_type']], expiry_date
+        )
+
+    def get_by_token(self, token_id):
+        index = self._token_index(token_id)
+        return None if index is None else self._instrument(index)
+
+    def get_by_symbol(self, trading_symbol, exchange):
+        if exchange not in self.exchanges:
+            return None
+        code = self.exchanges.index(exchange)
+        # Rows sharing a symbol are adjacent and ordered by exchange code
+        first = int(np.searchsorted(self.symbols, trading_symbol))
+        last = int(np.searchsorted(self.symbols, trading_symbol, side='right'))
+        indexes = self.symbol_order[first:last]
+        position = int(np.searchsorted(self.table['exchange'][indexes], code))
+        if position < len(indexes) and self.table['exchange'][indexes[position]] == code:
+            return self._instrument(indexes[position])
+        return None
+
+    def get_by_id(self, company_id):
+        index = int(np.searchsorted(self.table['id'], company_id))
+        if index < len(self.table) and self.table['id'][index] == company_id:
+            return self._instrument(index)
+        return None
+
+
+def _build_master():
+    master = InstrumentMaster.from_database()
+    logger.info(f"Loaded instrument master with {len(master)} instruments")
+    return master
+
+
+# Loaded once per worker and reloaded after the instruments generation is bumped;
+# lookups read the generation at most every MASTER_CHECK_INTERVAL seconds
+_master = GenerationSnapshot(INSTRUMENTS_GENERATION, _build_master, check_interval=MASTER_CHECK_INTERVAL)
+
+
+def get_instrument_master(check=False):
+    return _master.get(check=check)
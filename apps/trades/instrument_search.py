@@ -0,0 +1,197 @@
+import re
+import logging
+from array import array
+from bisect import bisect_left
+from collections import defaultdict, Counter
+from django.db.models import Case, When, IntegerField
+from core.conditional import GenerationSnapshot, INSTRUMENTS_GENERATION
+from .models import Company
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMIT = 20
+# Filters narrow querysets by an id list only up to this many matches; a
+# broader query is left to the database instead of a huge IN/CASE
+FILTER_MAX_IDS = 1000
+# Trigram postings longer than this are too common to narrow anything down
+MAX_POSTING = 5000
+MIN_SIMILARITY = 0.3
+
+EXACT, SYMBOL_PREFIX, NAME_PREFIX, FUZZY = range(4)
+
+_WORD = re.compile(r'[a-z0-9&]+')
+
+
+def normalize(text):
+    return (text or '').strip().lower()
+
+
+def trigrams(text):
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class InstrumentSearchIndex:
+    """
+    Immutable search structure over Company rows.
+
+    Prefix lookups bisect sorted arrays of symbols and of name words (script
+    and display names); typo tolerance comes from an inverted trigram index
+    over symbols. Results are company ids, best first.
+    """
+
+    def __init__(self, rows):
+        self.ids = array('q')
+        self.symbols = []
+        self.gram_counts = array('H')
+        symbol_terms = []
+        name_terms = []
+        postings = defaultdict(list)
+        for position, (company_id, symbol, *names) in enumerate(rows):
+            symbol = normalize(symbol)
+            self.ids.append(company_id)
+            self.symbols.append(symbol)
+            symbol_terms.append((symbol, position))
+            words = set()
+            for name in names:
+                words.update(_WORD.findall(normalize(name)))
+            words.discard(symbol)
+            name_terms.extend((word, position) for word in words)
+            grams = trigrams(symbol)
+            self.gram_counts.append(len(grams))
+            for gram in grams:
+                postings[gram].append(position)
+
+        symbol_terms.sort()
+        name_terms.sort()
+        self.symbol_terms = [term for term, _ in symbol_terms]
+        self.symbol_positions = array('i', (position for _, position in symbol_terms))
+        self.name_terms = [term for term, _ in name_terms]
+        self.name_positions = array('i', (position for _, position in name_terms))
+        self.postings = {gram: array('i', positions) for gram, positions in postings.items()}
+
+    @classmethod
+    def from_database(cls):
+        rows = Company.objects.order_by('id').values_list(
+            'id', 'trading_symbol', 'script_name', 'display_name'
+        )
+        return cls(rows.iterator(chunk_size=5000))
+
+    def __len__(self):
+        return len(self.ids)
+
+    @staticmethod
+    def _prefix_range(terms, positions, query, wanted):
+        """Positions of up to `wanted` terms starting with `query`, alphabetically."""
+        found = []
+        for index in range(bisect_left(terms, query), len(terms)):
+            if len(found) >= wanted or not terms[index].startswith(query):
+                break
+            found.append(positions[index])
+        return found
+
+    def _prefix_matches(self, query, ranks, wanted):
+        for position in self._prefix_range(self.symbol_terms, self.symbol_positions, query, wanted):
+            ranks[position] = EXACT if self.symbols[position] == query else SYMBOL_PREFIX
+        if len(ranks) < wanted:
+            for position in self._prefix_range(self.name_terms, self.name_positions, query, wanted):
+                ranks.setdefault(position, NAME_PREFIX)
+
+    def _fuzzy_matches(self, query, ranks):
+        query_grams = trigrams(query)
+        lists = sorted(
+            (self.postings[gram] for gram in query_grams if gram in self.postings), key=len
+        )
+        narrow = [positions for positions in lists if len(positions) <= MAX_POSTING] or lists[:1]
+        overlaps = Counter()
+        for positions in narrow:
+            overlaps.update(positions)
+        size = len(query_grams)
+        for position, overlap in overlaps.items():
+            if position in ranks:
+                continue
+            similarity = overlap / (size + self.gram_counts[position] - overlap)
+            if similarity >= MIN_SIMILARITY:
+                # Rank fuzzy hits below prefix hits, closest first
+                ranks[position] = FUZZY + (1 - similarity)
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        query = normalize(query)
+        if not query:
+            return []
+
+        ranks = {}
+        # Over-fetch prefix hits so shorter symbols can outrank longer ones
+        self._prefix_matches(query, ranks, limit * 4)
+        if len(ranks) < limit and len(query) >= 3:
+            self._fuzzy_matches(query, ranks)
+
+        return self._ordered(ranks)[:limit]
+
+    def prefix_search(self, query, cap):
+        """
+        Every company whose symbol or a name word starts with `query`, best
+        first, without fuzzy hits; None once more than `cap` companies match.
+        """
+        query = normalize(query)
+        if not query:
+            return []
+
+        ranks = {}
+        for terms, positions, rank in (
+            (self.symbol_terms, self.symbol_positions, SYMBOL_PREFIX),
+            (self.name_terms, self.name_positions, NAME_PREFIX),
+        ):
+            for index in range(bisect_left(terms, query), len(terms)):
+                if not terms[index].startswith(query):
+                    break
+                position = positions[index]
+                ranks.setdefault(position, EXACT if self.symbols[position] == query else rank)
+                if len(ranks) > cap:
+                    return None
+        return self._ordered(ranks)
+
+    def _ordered(self, ranks):
+        ordered = sorted(
+            ranks, key=lambda position: (ranks[position], len(self.symbols[position]), self.symbols[position])
+        )
+        return [self.ids[position] for position in ordered]
+
+
+def _build_index():
+    index = InstrumentSearchIndex.from_database()
+    logger.info(f"Built instrument search index with {len(index)} instruments")
+    return index
+
+
+# Rebuilt in each process once the instruments generation moves
+_index = GenerationSnapshot(INSTRUMENTS_GENERATION, _build_index)
+
+
+def get_instrument_index():
+    return _index.get()
+
+
+def search_instruments(query, limit=DEFAULT_LIMIT):
+    """
+    Company ids matching `query` by symbol/name prefix or close symbol
+    spelling, best first, for autocomplete.
+    """
+    return get_instrument_index().search(query, limit)
+
+
+def filter_instruments(query):
+    """
+    Company ids for a `search` filter: every symbol/name prefix match, best
+    first, or None when more than FILTER_MAX_IDS match and the caller
+    should filter in the database instead.
+    """
+    return get_instrument_index().prefix_search(query, FILTER_MAX_IDS)
+
+
+def order_by_ids(queryset, ids, field='id'):
+    """Keep only rows whose `field` is in `ids`, ordered as `ids` are."""
+    if not ids:
+        return queryset.none()
+    ranking = Case(*(When(**{field: value}, then=rank) for rank, value in enumerate(ids)), output_field=IntegerField())
+    return queryset.filter(**{f'{field}__in': ids}).order_by(ranking)
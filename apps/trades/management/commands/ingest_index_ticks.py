@@ -0,0 +1,50 @@
+import asyncio
+import logging
+from channels.layers import get_channel_layer
+from django.core.management.base import BaseCommand, CommandError
+from apps.trades.index_ticks import IndexTickBuffer, TickDistributor, get_tick_source
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Ingest index ticks from a source and publish them to IndexUpdatesConsumer at a capped rate'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', default='replay', help='Registered source name or dotted path to a TickSource class')
+        parser.add_argument('--file', help='JSON-lines tick file for the replay source')
+        parser.add_argument('--speed', type=float, default=1.0, help='Replay speed multiplier (0 sends ticks without pacing)')
+        parser.add_argument('--loop', action='store_true', help='Restart the replay file when it ends')
+        parser.add_argument('--max-rate', type=float, default=2.0, help='Maximum publishes per second')
+        parser.add_argument('--capacity', type=int, default=64, help='Number of indices kept in the ring buffer')
+
+    def handle(self, *args, **options):
+        if options['max_rate'] <= 0:
+            raise CommandError('--max-rate must be positive')
+
+        source_options = {}
+        if options['source'] == 'replay':
+            if not options['file']:
+                raise CommandError('--file is required for the replay source')
+            source_options = {'path': options['file'], 'speed': options['speed'], 'loop': options['loop']}
+
+        try:
+            source = get_tick_source(options['source'], **source_options)
+        except ImportError as e:
+            raise CommandError(f"Unknown tick source {options['source']}: {str(e)}")
+
+        distributor = TickDistributor(
+            source,
+            get_channel_layer(),
+            max_rate=options['max_rate'],
+            buffer=IndexTickBuffer(options['capacity'])
+        )
+
+        self.stdout.write(f"Publishing index ticks at up to {options['max_rate']}/s...")
+        try:
+            asyncio.run(distributor.run())
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Received {distributor.ticks_received} ticks, published {distributor.batches_published} batches"
+        ))
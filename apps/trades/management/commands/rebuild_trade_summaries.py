@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from apps.trades.models import Company, CompanyTradeSummary
+from apps.trades.trade_summaries import rebuild_company_summary
+from apps.indexAndCommodity.models import IndexAndCommodity, IndexAndCommodityTradeSummary
+from apps.indexAndCommodity.trade_summaries import rebuild_index_summary
+
+class Command(BaseCommand):
+    help = 'Rebuild the company and index/commodity trade summary read models from Trade rows'
+
+    def handle(self, *args, **options):
+        company_ids = set(Company.objects.filter(trades__isnull=False).values_list('id', flat=True))
+        company_ids |= set(CompanyTradeSummary.objects.values_list('company_id', flat=True))
+        for company_id in company_ids:
+            rebuild_company_summary(company_id)
+        self.stdout.write(f"Rebuilt {len(company_ids)} company summaries")
+
+        index_ids = set(IndexAndCommodity.objects.filter(trades__isnull=False).values_list('id', flat=True))
+        index_ids |= set(IndexAndCommodityTradeSummary.objects.values_list('index_and_commodity_id', flat=True))
+        for index_id in index_ids:
+            rebuild_index_summary(index_id)
+        self.stdout.write(f"Rebuilt {len(index_ids)} index/commodity summaries")
+
+        self.stdout.write(self.style.SUCCESS('Trade summaries are up to date'))
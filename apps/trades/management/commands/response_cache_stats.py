@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from importlib import import_module
+from core.response_cache import get_response_cache_stats, reset_response_cache_stats
+
+class Command(BaseCommand):
+    help = 'Show hit rates of the plan-tier response cache per endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after printing them')
+
+    def handle(self, *args, **options):
+        # Importing the URLconf imports every view, which registers the cached endpoints
+        import_module(settings.ROOT_URLCONF)
+
+        for endpoint, stats in get_response_cache_stats().items():
+            hit_rate = f"{stats['hit_rate']:.1%}" if stats['hit_rate'] is not None else 'n/a'
+            self.stdout.write(f"{endpoint}: {stats['hits']} hits, {stats['misses']} misses, hit rate {hit_rate}")
+
+        if options['reset']:
+            reset_response_cache_stats()
+            self.stdout.write(self.style.SUCCESS('Response cache counters reset'))
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.4 on 2026-10-19 06:09
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trades', '0017_tradenotification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompanyTradeSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('summary', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Pre-serialized trades shown by the grouped trades endpoint')),
+                ('latest_active_trade_at', models.DateTimeField(blank=True, help_text='created_at of the newest active intraday/positional trade', null=True)),
+                ('has_active_trade', models.BooleanField(default=False)),
+                ('has_completed_trade', models.BooleanField(default=False)),
+                ('min_plan_rank', models.PositiveSmallIntegerField(blank=True, help_text='Lowest plan level (1=BASIC, 2=PREMIUM, 3=SUPER_PREMIUM) among active/completed trades', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('has_free_call', models.BooleanField(default=False, help_text='Whether an active/completed trade is a free call')),
+                ('company', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='trade_summary', to='trades.company')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['has_active_trade', '-latest_active_trade_at'], name='trades_comp_has_act_145c91_idx'), models.Index(fields=['min_plan_rank', 'has_free_call'], name='trades_comp_min_pla_b7e7b0_idx')],
+            },
+        ),
+    ]
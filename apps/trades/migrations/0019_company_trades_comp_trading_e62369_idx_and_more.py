@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-19 06:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trades', '0018_companytradesummary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='company',
+            index=models.Index(fields=['trading_symbol', 'id'], name='trades_comp_trading_e62369_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['created_at', 'id'], name='trades_trad_created_0db655_idx'),
+        ),
+    ]
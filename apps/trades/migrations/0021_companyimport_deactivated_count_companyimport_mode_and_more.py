@@ -0,0 +1,33 @@
+# Generated by Django 5.1.4 on 2026-10-19 06:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trades', '0020_companyimport'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='companyimport',
+            name='deactivated_count',
+            field=models.PositiveIntegerField(default=0, help_text='Active instruments switched off because they expired or left the master (sync only)'),
+        ),
+        migrations.AddField(
+            model_name='companyimport',
+            name='mode',
+            field=models.CharField(choices=[('insert', 'Insert new instruments only'), ('sync', 'Upsert by token_id and deactivate expired or missing instruments')], default='insert', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='companyimport',
+            name='updated_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='companyimport',
+            name='processed_count',
+            field=models.PositiveIntegerField(default=0, help_text='Instruments inserted'),
+        ),
+    ]
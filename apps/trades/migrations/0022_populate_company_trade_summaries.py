@@ -0,0 +1,48 @@
+from django.db import migrations
+
+# Frozen copies of trade_summaries.PLAN_RANKS / VISIBLE_STATUSES
+PLAN_RANKS = {'BASIC': 1, 'PREMIUM': 2, 'SUPER_PREMIUM': 3, 'FREE_TRIAL': 3}
+VISIBLE_STATUSES = ('ACTIVE', 'COMPLETED')
+
+
+def populate_company_trade_summaries(apps, schema_editor):
+    """
+    Seed the flags the grouped trades list filters and orders on, so existing
+    trades stay visible after deploy. The pre-serialized `summary` is left
+    empty (the serializer falls back to the trades until it is filled);
+    `manage.py rebuild_trade_summaries` or the next trade write fills it.
+    """
+    Trade = apps.get_model('trades', 'Trade')
+    CompanyTradeSummary = apps.get_model('trades', 'CompanyTradeSummary')
+
+    rows = {}
+    for company_id, status, trade_type, plan_type, is_free_call, created_at in Trade.objects.order_by().values_list(
+        'company_id', 'status', 'trade_type', 'plan_type', 'is_free_call', 'created_at'
+    ).iterator(chunk_size=2000):
+        row = rows.setdefault(company_id, CompanyTradeSummary(company_id=company_id))
+        if status not in VISIBLE_STATUSES:
+            continue
+        rank = PLAN_RANKS.get(plan_type, 3)
+        row.min_plan_rank = rank if row.min_plan_rank is None else min(row.min_plan_rank, rank)
+        row.has_free_call = row.has_free_call or is_free_call
+        if status == 'COMPLETED':
+            row.has_completed_trade = True
+            continue
+        row.has_active_trade = True
+        if trade_type in ('INTRADAY', 'POSITIONAL') and (
+            row.latest_active_trade_at is None or created_at > row.latest_active_trade_at
+        ):
+            row.latest_active_trade_at = created_at
+
+    CompanyTradeSummary.objects.bulk_create(rows.values(), batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trades', '0021_companyimport_deactivated_count_companyimport_mode_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_company_trade_summaries, migrations.RunPython.noop),
+    ]
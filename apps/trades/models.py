@@ -1,4 +1,5 @@
 from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth import get_user_model
 from django.utils import timezone
@@ -94,6 +95,7 @@ class Company(models.Model):
         verbose_name_plural = "Companies"
         indexes = [
             models.Index(fields=['trading_symbol', 'exchange', 'instrument_type']),
+            models.Index(fields=['trading_symbol', 'id']),
         ]
         constraints = [
             models.UniqueConstraint(
@@ -193,7 +195,7 @@ class Trade(models.Model):
         blank=True,
         help_text="Technical analysis chart or related image"
     )
-    tracker = FieldTracker(fields=['status', 'image', 'warzone'])
+    tracker = FieldTracker(fields=['status', 'image', 'warzone', 'trade_type', 'plan_type'])
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     completed_at = models.DateTimeField(
@@ -211,6 +213,7 @@ class Trade(models.Model):
         indexes = [
             models.Index(fields=['status', 'trade_type', 'plan_type']),
             models.Index(fields=['created_at', 'user']),
+            models.Index(fields=['created_at', 'id']),
         ]
         ordering = ['-created_at']
 
@@ -919,3 +922,91 @@ class TradeNotification(models.Model):
             message=message,
             priority=priority
         )
+
+
+class CompanyTradeSummary(models.Model):
+    """
+    Read model with one row per company that has trades, kept up to date by
+    the trade signals (see trade_summaries.py). List endpoints filter and
+    sort on its columns instead of rebuilding the view from Trade rows.
+    """
+    company = models.OneToOneField(
+        Company,
+        on_delete=models.CASCADE,
+        related_name='trade_summary'
+    )
+    summary = models.JSONField(
+        default=dict,
+        encoder=DjangoJSONEncoder,
+        help_text="Pre-serialized trades shown by the grouped trades endpoint"
+    )
+    latest_active_trade_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="created_at of the newest active intraday/positional trade"
+    )
+    has_active_trade = models.BooleanField(default=False)
+    has_completed_trade = models.BooleanField(default=False)
+    min_plan_rank = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        help_text="Lowest plan level (1=BASIC, 2=PREMIUM, 3=SUPER_PREMIUM) among active/completed trades"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+    has_free_call = models.BooleanField(
+        default=False,
+        help_text="Whether an active/completed trade is a free call"
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['has_active_trade', '-latest_active_trade_at']),
+            models.Index(fields=['min_plan_rank', 'has_free_call']),
+        ]
+
+    def __str__(self):
+        return f"Trade summary for {self.company}"
+
+
+class CompanyImport(models.Model):
+    """
+    Progress of one scrip master upload. process_csv_file commits it together
+    with every chunk it writes, so a redelivered task (same task_id) resumes
+    after the last committed chunk instead of starting over.
+    """
+    class Status(models.TextChoices):
+        RUNNING = 'RUNNING', 'Running'
+        COMPLETED = 'COMPLETED', 'Completed'
+        FAILED = 'FAILED', 'Failed'
+
+    class Mode(models.TextChoices):
+        INSERT = 'insert', 'Insert new instruments only'
+        SYNC = 'sync', 'Upsert by token_id and deactivate expired or missing instruments'
+
+    task_id = models.CharField(max_length=255, unique=True, null=True, blank=True)
+    file_path = models.CharField(max_length=255)
+    mode = models.CharField(max_length=10, choices=Mode.choices, default=Mode.INSERT)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.RUNNING)
+    rows_done = models.PositiveIntegerField(
+        default=0,
+        help_text="Data rows of the file already committed"
+    )
+    processed_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Instruments inserted"
+    )
+    updated_count = models.PositiveIntegerField(default=0)
+    deactivated_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Active instruments switched off because they expired or left the master (sync only)"
+    )
+    error_count = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(
+        default=list,
+        help_text="First row errors, as reported by the task result"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Import of {self.file_path} ({self.status})"
@@ -1,15 +1,17 @@
 from rest_framework import pagination
+from core.pagination import KeysetPaginationMixin
 
-class CompanyPagination(pagination.PageNumberPagination):
+class CompanyPagination(KeysetPaginationMixin, pagination.PageNumberPagination):
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
+    cursor_ordering = ('trading_symbol', 'id')
 
-class TradePagination(pagination.PageNumberPagination):
+class TradePagination(KeysetPaginationMixin, pagination.PageNumberPagination):
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
-class StandardResultsSetPagination(pagination.PageNumberPagination):
+class StandardResultsSetPagination(KeysetPaginationMixin, pagination.PageNumberPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
\ No newline at end of file
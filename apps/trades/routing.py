@@ -6,5 +6,7 @@ websocket_urlpatterns = [
     re_path(r'ws/trade-updates/(?P<token>[^/]+)/$', consumers.TradeUpdatesConsumer.as_asgi()),
     # Handle token in query parameters
     re_path(r'ws/trade-updates/$', consumers.TradeUpdatesConsumer.as_asgi()),
+    # Live index ticks
+    re_path(r'ws/index-updates/$', consumers.IndexUpdatesConsumer.as_asgi()),
 ]
 
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from ..models import Trade, Analysis, TradeHistory, Company, Insight
+from ..models import Trade, Analysis, TradeHistory, Company, Insight, CompanyTradeSummary
 from asgiref.sync import sync_to_async
 
 class TradeHistorySerializer(serializers.ModelSerializer):
@@ -36,6 +36,25 @@ class InsightSerializer(serializers.ModelSerializer):
             'accuracy_score', 'analysis_result'
         ]
 
+def absolute_media_urls(trade, request):
+    """
+    Summaries are serialized without a request, so their image URLs are
+    stored as the storage returns them; resolve them against `request`.
+    """
+    if not trade or request is None:
+        return trade
+    trade = dict(trade)
+    if trade.get('image'):
+        trade['image'] = request.build_absolute_uri(trade['image'])
+    if trade.get('insight'):
+        insight = dict(trade['insight'])
+        for field in ('prediction_image', 'actual_image'):
+            if insight.get(field):
+                insight[field] = request.build_absolute_uri(insight[field])
+        trade['insight'] = insight
+    return trade
+
+
 class TradeDetailSerializer(serializers.ModelSerializer):
     analysis = AnalysisSerializer(read_only=True)
     trade_history = TradeHistorySerializer(source='history', many=True, read_only=True)
@@ -76,35 +95,63 @@ class GroupedTradeSerializer(serializers.ModelSerializer):
         return instrument_mapping.get(obj.instrument_type, obj.instrument_type)
 
 
+    def _summary(self, obj):
+        # Pre-shaped by trade_summaries.rebuild_company_summary; rows seeded by
+        # the trades.0022 migration only carry the flags until rebuilt
+        try:
+            summary = obj.trade_summary
+        except CompanyTradeSummary.DoesNotExist:
+            return None
+        return summary if summary.summary else None
+
+    def _summarized(self, trade):
+        return absolute_media_urls(trade, self.context.get('request'))
+
+    def _grouped_trades(self, obj):
+        # Fallback for companies without a summary row; newest first like Trade.Meta.ordering
+        if not hasattr(obj, 'grouped_trades'):
+            obj.grouped_trades = list(obj.trades.filter(status__in=['ACTIVE', 'COMPLETED']))
+        return obj.grouped_trades
+
+    def _active_trade(self, obj, trade_type):
+        return next(
+            (trade for trade in self._grouped_trades(obj)
+             if trade.trade_type == trade_type and trade.status == 'ACTIVE'),
+            None
+        )
+
     def get_intraday_trade(self, obj):
-        trade = obj.trades.filter(
-            trade_type=Trade.TradeType.INTRADAY,
-            status__in=['ACTIVE']
-        ).first()
-        return TradeDetailSerializer(trade).data if trade else None
+        summary = self._summary(obj)
+        if summary:
+            return self._summarized(summary.summary.get('intraday_trade'))
+        trade = self._active_trade(obj, Trade.TradeType.INTRADAY)
+        return TradeDetailSerializer(trade, context=self.context).data if trade else None
 
   
     def get_positional_trade(self, obj):
-        trade = obj.trades.filter(
-            trade_type=Trade.TradeType.POSITIONAL,
-            status__in=['ACTIVE']
-        ).first()
-        return TradeDetailSerializer(trade).data if trade else None
+        summary = self._summary(obj)
+        if summary:
+            return self._summarized(summary.summary.get('positional_trade'))
+        trade = self._active_trade(obj, Trade.TradeType.POSITIONAL)
+        return TradeDetailSerializer(trade, context=self.context).data if trade else None
 
 
     def get_completed_trade(self, obj):
-        trades = obj.trades.filter(status__in=['COMPLETED'])
-        return TradeDetailSerializer(trades, many=True).data if trades.exists() else None
+        summary = self._summary(obj)
+        if summary:
+            completed = summary.summary.get('completed_trade')
+            return [self._summarized(trade) for trade in completed] if completed else completed
+        trades = [trade for trade in self._grouped_trades(obj) if trade.status == 'COMPLETED']
+        return TradeDetailSerializer(trades, many=True, context=self.context).data if trades else None
     
     def get_created_at(self, obj):
-        # Fetch all active intraday and positional trades
-        active_trades = obj.trades.filter(
-            status__in=['ACTIVE'],
-            trade_type__in=[Trade.TradeType.INTRADAY, Trade.TradeType.POSITIONAL]
-        )
-        print(active_trades,'active_trades')
-        if active_trades.exists():
-            # Get the trade with the latest created_at
-            latest_trade = active_trades.latest('created_at')
-            return latest_trade.created_at
-        return None
\ No newline at end of file
+        # Latest created_at among active intraday and positional trades
+        summary = self._summary(obj)
+        if summary:
+            return summary.latest_active_trade_at
+        active_trades = [
+            trade for trade in self._grouped_trades(obj)
+            if trade.status == 'ACTIVE'
+            and trade.trade_type in [Trade.TradeType.INTRADAY, Trade.TradeType.POSITIONAL]
+        ]
+        return max((trade.created_at for trade in active_trades), default=None)
@@ -1,4 +1,4 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.utils import timezone
 from channels.layers import get_channel_layer
@@ -9,7 +9,11 @@ from django.db import transaction
 from datetime import timedelta
 import traceback
 
-from .models import Trade, TradeNotification, Company
+from .models import Trade, TradeHistory, TradeNotification, Company, Analysis, Insight
+from .trade_summaries import schedule_company_summary_refresh
+from core.conditional import bump_generation, TRADES_GENERATION, INSTRUMENTS_GENERATION
+from core.cache_layer import invalidate_tags, trade_tag, plan_tag
+from .trade_updates.redis_client import publish_trade_event_on_commit
 from apps.subscriptions.models import Subscription, Plan
 
 logger = logging.getLogger(__name__)
@@ -240,6 +244,91 @@ def handle_trade_update(sender, instance, created, **kwargs):
         if instance.status in ['ACTIVE', 'COMPLETED']:
             # Use the unified method instead of calling broadcast and notification separately
             TradeSignalHandler.process_trade_update(instance, action)
+
+            # Let SSE streams know something changed once the write is committed
+            publish_trade_event_on_commit('stock', instance, action)
             
     except Exception:
         pass
+
+
+@receiver(post_save, sender=TradeHistory)
+def handle_trade_history_update(sender, instance, created, **kwargs):
+    """Publish price target changes of visible trades to the trade update feed."""
+    try:
+        trade = instance.trade
+        if trade.status in ['ACTIVE', 'COMPLETED']:
+            publish_trade_event_on_commit('stock', trade, "history_updated")
+    except Exception as e:
+        logger.error(f"Error publishing trade history update: {str(e)}")
+
+
+@receiver(post_save, sender=Trade)
+@receiver(post_delete, sender=Trade)
+def refresh_company_trade_summary(sender, instance, **kwargs):
+    """Keep the company's CompanyTradeSummary row in step with its trades."""
+    schedule_company_summary_refresh(instance.company_id)
+
+
+@receiver(post_save, sender=TradeHistory)
+@receiver(post_delete, sender=TradeHistory)
+@receiver(post_save, sender=Analysis)
+@receiver(post_save, sender=Insight)
+def refresh_company_trade_summary_for_trade(sender, instance, **kwargs):
+    """History, analysis and insight are part of the pre-shaped summary too."""
+    try:
+        schedule_company_summary_refresh(instance.trade.company_id)
+    except Trade.DoesNotExist:
+        pass
+
+
+@receiver(post_save, sender=Trade)
+@receiver(post_delete, sender=Trade)
+@receiver(post_save, sender=TradeHistory)
+@receiver(post_delete, sender=TradeHistory)
+@receiver(post_save, sender=Analysis)
+@receiver(post_save, sender=Insight)
+@receiver(post_save, sender=Company)
+def bump_trades_generation(sender, **kwargs):
+    """Invalidate ETags of the trade list endpoints once the write is committed."""
+    transaction.on_commit(lambda: bump_generation(TRADES_GENERATION))
+
+
+@receiver(post_save, sender=Trade)
+@receiver(post_delete, sender=Trade)
+def invalidate_trade_cache_tags(sender, instance, **kwargs):
+    """Drop cached entries tagged with the trade or its plan tier (both tiers if it moved)."""
+    tags = {trade_tag(instance.pk), plan_tag(instance.plan_type)}
+    if instance.tracker.has_changed('plan_type') and instance.tracker.previous('plan_type'):
+        tags.add(plan_tag(instance.tracker.previous('plan_type')))
+    transaction.on_commit(lambda: invalidate_tags(*tags))
+
+
+@receiver(post_save, sender=TradeHistory)
+@receiver(post_delete, sender=TradeHistory)
+@receiver(post_save, sender=Analysis)
+@receiver(post_save, sender=Insight)
+def invalidate_trade_cache_tags_for_detail(sender, instance, **kwargs):
+    try:
+        tags = (trade_tag(instance.trade_id), plan_tag(instance.trade.plan_type))
+    except Trade.DoesNotExist:
+        return
+    transaction.on_commit(lambda: invalidate_tags(*tags))
+
+
+@receiver(post_save, sender=Company)
+def invalidate_company_cache_tags(sender, instance, created, **kwargs):
+    """Company fields are served with every trade on it."""
+    if created:
+        return
+    trades = list(instance.trades.values_list('id', 'plan_type'))
+    tags = {trade_tag(trade_id) for trade_id, _ in trades} | {plan_tag(plan) for _, plan in trades}
+    if tags:
+        transaction.on_commit(lambda: invalidate_tags(*tags))
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_delete, sender=Company)
+def bump_instruments_generation(sender, **kwargs):
+    """Make every process rebuild its instrument search index after the write commits."""
+    transaction.on_commit(lambda: bump_generation(INSTRUMENTS_GENERATION))
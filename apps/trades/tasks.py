@@ -1,122 +1,337 @@
 from celery import shared_task
+import logging
+import numpy as np
 import pandas as pd
-from datetime import datetime
 from django.core.files.storage import default_storage
-from .models import Company, InstrumentType
+from django.db import transaction, IntegrityError
+from django.utils import timezone
+from core.conditional import bump_generation, INSTRUMENTS_GENERATION, TRADES_GENERATION
+from core.cache_layer import invalidate, invalidate_tags, trade_tag, plan_tag
+from apps.accuracy.fragments import completed_trade_fragment_key
+from .models import Company, CompanyImport, InstrumentType, Trade
+from .instrument_master import get_instrument_master
 
-@shared_task
-def process_csv_file(file_path):
+logger = logging.getLogger(__name__)
+
+# Expected columns in the CSV
+REQUIRED_COLUMNS = [
+    'tokenId', 'exchange', 'tradingSymbol', 'scriptName',
+    'expiryDate', 'optionType', 'segment', 'displayName'
+]
+NON_EMPTY_COLUMNS = ['tokenId', 'exchange', 'tradingSymbol', 'scriptName', 'displayName']
+FNO_TYPES = [InstrumentType.FUTURE.value, InstrumentType.CALL_OPTION.value, InstrumentType.PUT_OPTION.value]
+# Compact dtypes for the columns read; token ids stay text so they can be validated
+IMPORT_DTYPES = {
+    'tokenId': str,
+    'exchange': 'category',
+    'tradingSymbol': str,
+    'scriptName': str,
+    'expiryDate': str,
+    'optionType': 'category',
+    'segment': 'category',
+    'displayName': str,
+}
+IMPORT_CHUNK_SIZE = 20000
+BULK_CREATE_BATCH_SIZE = 1000
+BULK_UPDATE_BATCH_SIZE = 500
+# Fields a sync compares and overwrites on instruments already in the master
+SYNC_FIELDS = ['exchange', 'trading_symbol', 'script_name', 'expiry_date', 'display_name', 'instrument_type', 'is_active']
+MAX_REPORTED_ERRORS = 100
+
+
+def determine_instrument_types(df):
+    segment = df['segment'].astype(object).fillna('').astype(str).str.upper()
+    option_type = df['optionType'].astype(object).fillna('').astype(str).str.upper()
+    return pd.Series(np.select(
+        [segment.eq('FUT'), segment.eq('OPT') & option_type.eq('CE'), segment.eq('OPT') & option_type.eq('PE')],
+        [InstrumentType.FUTURE.value, InstrumentType.CALL_OPTION.value, InstrumentType.PUT_OPTION.value],
+        default=InstrumentType.EQUITY.value
+    ), index=df.index)
+
+
+def validate_company_rows(df, existing_tokens):
+    """
+    Column-wise validation of a scrip master frame.
+
+    Returns the frame with parsed `token_id`, `instrument_type` and
+    `expiry_date` columns plus an `error` column that is None for rows to
+    insert. Checks apply in the importer's historical order; a token
+    repeated within the file is accepted on its first valid row only.
+    """
+    df = df.copy()
+    token_text = df['tokenId'].astype(str)
+    valid_format = token_text.str.isdigit()
+    df['token_id'] = pd.to_numeric(token_text.where(valid_format), errors='coerce')
+    df['instrument_type'] = determine_instrument_types(df)
+    # Dates come as DD-MMM-YYYY; anything else counts as missing
+    df['expiry_date'] = pd.to_datetime(df['expiryDate'], format='%d-%b-%Y', errors='coerce')
+
+    missing = pd.Series(False, index=df.index)
+    for column in NON_EMPTY_COLUMNS:
+        missing |= df[column].isna() | df[column].astype(str).str.strip().eq('')
+
+    duplicate_message = 'Duplicate token_id ' + df['token_id'].astype('Int64').astype(str)
+    checks = [
+        (~valid_format, 'Invalid token_id format'),
+        (df['token_id'].isin(existing_tokens), duplicate_message),
+        (missing, 'Missing required fields'),
+        (df['instrument_type'].isin(FNO_TYPES) & df['expiry_date'].isna(),
+         'Invalid or missing expiry date for F&O instrument'),
+    ]
+    df['error'] = None
+    for failed, message in checks:
+        df['error'] = df['error'].mask(df['error'].isna() & failed, message)
+
+    accepted = df['error'].isna()
+    repeated = accepted & df['token_id'].where(accepted).duplicated(keep='first')
+    df['error'] = df['error'].mask(repeated, duplicate_message)
+    return df
+
+
+def build_companies(rows):
+    return [
+        Company(
+            token_id=int(row.token_id),
+            exchange=row.exchange,
+            trading_symbol=row.tradingSymbol,
+            script_name=row.scriptName,
+            expiry_date=None if pd.isna(row.expiry_date) else row.expiry_date.date(),
+            display_name=row.displayName,
+            instrument_type=row.instrument_type,
+            is_active=getattr(row, 'is_active', True)
+        )
+        for row in rows.itertuples()
+    ]
+
+
+def insert_companies(rows, errors):
+    """bulk_create one chunk; if it conflicts, insert row by row to pin down the culprits."""
+    companies = build_companies(rows)
     try:
-        # Read the file from storage
-        with default_storage.open(file_path) as file:
-            df = pd.read_csv(file, low_memory=False)
-
-        # Expected columns in the CSV
-        required_columns = [
-            'tokenId', 'exchange', 'tradingSymbol', 'scriptName',
-            'expiryDate', 'optionType', 'segment', 'displayName'
-        ]
-        
-        # Validate required columns
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            raise ValueError(f"Missing required columns: {', '.join(missing_columns)}")
-
-        def convert_date(date_str):
-            if pd.isna(date_str) or date_str == '':
-                return None
-            try:
-                # Parse the date from DD-MMM-YYYY format
-                return datetime.strptime(str(date_str), '%d-%b-%Y').date()
-            except Exception:
-                return None
-
-        def determine_instrument_type(segment, option_type):
-            if pd.isna(segment) or segment == '':
-                return InstrumentType.EQUITY
-            
-            segment = str(segment).upper()
-            option_type = str(option_type).upper() if not pd.isna(option_type) else ''
-            
-            if segment == 'FUT':
-                return InstrumentType.FUTURE
-            elif segment == 'OPT':
-                if option_type == 'CE':
-                    return InstrumentType.CALL_OPTION
-                elif option_type == 'PE':
-                    return InstrumentType.PUT_OPTION
-            return InstrumentType.EQUITY
-
-        processed_count = 0
-        errors = []
-        
-        # Process each row
-        for idx, row in df.iterrows():
-            try:
-                # Skip if token_id is not numeric
-                if not str(row['tokenId']).isdigit():
-                    errors.append(f"Row {idx + 1}: Invalid token_id format")
-                    continue
-
-                token_id = int(row['tokenId'])
-
-                # Skip if token_id already exists
-                if Company.objects.filter(token_id=token_id).exists():
-                    errors.append(f"Row {idx + 1}: Duplicate token_id {token_id}")
-                    continue
-
-                # Skip if any required field is empty
-                if any(pd.isna(row[col]) or str(row[col]).strip() == '' 
-                      for col in ['tokenId', 'exchange', 'tradingSymbol', 'scriptName', 'displayName']):
-                    errors.append(f"Row {idx + 1}: Missing required fields")
-                    continue
-
-                # Determine instrument type
-                instrument_type = determine_instrument_type(row['segment'], row['optionType'])
-                
-                # Convert expiry date
-                expiry_date = convert_date(row['expiryDate'])
-                
-                # Validate expiry date for futures and options
-                if instrument_type in [InstrumentType.FUTURE, InstrumentType.CALL_OPTION, InstrumentType.PUT_OPTION]:
-                    if not expiry_date:
-                        errors.append(f"Row {idx + 1}: Invalid or missing expiry date for F&O instrument")
-                        continue
-
-                # Create company
-                Company.objects.create(
-                    token_id=token_id,
-                    exchange=row['exchange'],
-                    trading_symbol=row['tradingSymbol'],
-                    script_name=row['scriptName'],
-                    expiry_date=expiry_date,
-                    display_name=row['displayName'],
-                    instrument_type=instrument_type
-                )
-                processed_count += 1
-                
-            except Exception as e:
-                errors.append(f"Row {idx + 1}: {str(e)}")
-        
+        with transaction.atomic():
+            Company.objects.bulk_create(companies)
+        return len(companies)
+    except IntegrityError:
+        pass
+
+    created = 0
+    for row_number, company in zip(rows.index + 1, companies):
+        try:
+            with transaction.atomic():
+                company.save()
+            created += 1
+        except Exception as e:
+            errors.append((row_number, str(e)))
+    return created
+
+
+def sync_companies(rows, errors):
+    """
+    Upsert one chunk by token_id: insert unknown tokens and bulk_update
+    known ones whose fields differ. Returns (inserted, updated company ids,
+    deactivated).
+    """
+    incoming = build_companies(rows)
+    current = Company.objects.in_bulk([company.token_id for company in incoming], field_name='token_id')
+
+    changed = []
+    deactivated = 0
+    now = timezone.now()
+    for company in incoming:
+        stored = current.get(company.token_id)
+        if stored is None or all(getattr(stored, field) == getattr(company, field) for field in SYNC_FIELDS):
+            continue
+        if stored.is_active and not company.is_active:
+            deactivated += 1
+        for field in SYNC_FIELDS:
+            setattr(stored, field, getattr(company, field))
+        stored.updated_at = now
+        changed.append(stored)
+
+    Company.objects.bulk_update(changed, SYNC_FIELDS + ['updated_at'], batch_size=BULK_UPDATE_BATCH_SIZE)
+    inserted = insert_companies(rows[~rows['token_id'].isin(list(current))], errors)
+    return inserted, [company.pk for company in changed], deactivated
+
+
+def deactivate_missing_companies(present_tokens, active_tokens):
+    """Switch off active instruments the synced file no longer lists; returns their ids."""
+    missing = np.setdiff1d(active_tokens, present_tokens).astype('int64')
+    deactivated = []
+    for start in range(0, len(missing), BULK_UPDATE_BATCH_SIZE):
+        ids = list(Company.objects.filter(
+            token_id__in=missing[start:start + BULK_UPDATE_BATCH_SIZE].tolist(), is_active=True
+        ).values_list('id', flat=True))
+        Company.objects.filter(id__in=ids).update(is_active=False, updated_at=timezone.now())
+        deactivated += ids
+    return deactivated
+
+
+def refresh_after_bulk_write(company_ids=()):
+    """
+    Bulk writes skip signals: once committed, reload instrument lookups and
+    trade lists, and drop the cached data of trades on the changed companies
+    (their tags and completed trade fragments), as the Company signals would.
+    """
+    trades = list(Trade.objects.filter(company_id__in=company_ids).values_list('id', 'plan_type'))
+    tags = {trade_tag(trade_id) for trade_id, _ in trades} | {plan_tag(plan) for _, plan in trades}
+    fragment_keys = [completed_trade_fragment_key(trade_id) for trade_id, _ in trades]
+
+    def refresh():
+        bump_generation(INSTRUMENTS_GENERATION, TRADES_GENERATION)
+        if tags:
+            invalidate_tags(*tags)
+        if fragment_keys:
+            invalidate(*fragment_keys)
+
+    transaction.on_commit(refresh)
+
+
+def report_progress(task, **meta):
+    if task.request.called_directly:
+        return
+    try:
+        task.update_state(state='PROGRESS', meta=meta)
+    except Exception as e:
+        logger.error(f"Failed to publish import progress: {str(e)}")
+
+
+def read_company_chunks(file_path, skip_rows=0, chunk_size=None):
+    """
+    Stream the upload from storage in fixed-size frames, reading only the
+    importer's columns. Frame indexes count data rows from the top of the
+    file, also when `skip_rows` already committed rows are skipped.
+    """
+    with default_storage.open(file_path) as file:
+        chunks = pd.read_csv(
+            file,
+            usecols=lambda column: column in REQUIRED_COLUMNS,
+            dtype=IMPORT_DTYPES,
+            skiprows=range(1, skip_rows + 1),
+            chunksize=chunk_size or IMPORT_CHUNK_SIZE
+        )
+        for chunk in chunks:
+            missing_columns = [col for col in REQUIRED_COLUMNS if col not in chunk.columns]
+            if missing_columns:
+                raise ValueError(f"Missing required columns: {', '.join(missing_columns)}")
+            chunk.index += skip_rows
+            yield chunk
+
+
+def read_committed_tokens(file_path, rows):
+    """Token ids of the first `rows` data rows, for a sync resuming mid-file."""
+    if not rows:
+        return np.array([])
+    with default_storage.open(file_path) as file:
+        tokens = pd.read_csv(file, usecols=['tokenId'], dtype=str, nrows=rows)['tokenId']
+    return pd.to_numeric(tokens.where(tokens.str.isdigit()), errors='coerce').dropna().to_numpy()
+
+
+def import_result(job):
+    result = {
+        "success": True,
+        "processed_count": job.processed_count,
+        "error_count": job.error_count,
+        "errors": job.errors
+    }
+    if job.mode == CompanyImport.Mode.SYNC:
+        result.update({
+            "inserted_count": job.processed_count,
+            "updated_count": job.updated_count,
+            "deactivated_count": job.deactivated_count,
+        })
+    return result
+
+
+@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def process_csv_file(self, file_path, chunk_size=None, mode=CompanyImport.Mode.INSERT):
+    """
+    Import a scrip master CSV. `insert` mode adds unknown token_ids and
+    rejects known ones as duplicates; `sync` mode upserts every row by
+    token_id, marks expired contracts inactive and, at the end, deactivates
+    active instruments missing from the file.
+    """
+    if self.request.called_directly:
+        job = CompanyImport.objects.create(file_path=file_path, mode=mode)
+    else:
+        job, _ = CompanyImport.objects.get_or_create(
+            task_id=self.request.id, defaults={'file_path': file_path, 'mode': mode}
+        )
+    if job.status == CompanyImport.Status.COMPLETED:
+        # A redelivered task whose work is already committed
+        return import_result(job)
+
+    sync = job.mode == CompanyImport.Mode.SYNC
+    try:
+        if sync:
+            # Read straight from the table: a stale master must not hide rows from the sweep
+            active_tokens = np.fromiter(
+                Company.objects.filter(is_active=True).values_list('token_id', flat=True).iterator(), dtype='int64'
+            )
+            # Known tokens are upserted, so only repeats within the file are duplicates
+            present_tokens = [read_committed_tokens(file_path, job.rows_done)]
+            seen_tokens = list(present_tokens)
+        else:
+            seen_tokens = [get_instrument_master(check=True).table['token_id']]
+        today = pd.Timestamp(timezone.localdate())
+
+        for chunk in read_company_chunks(file_path, skip_rows=job.rows_done, chunk_size=chunk_size):
+            chunk = validate_company_rows(chunk, np.concatenate(seen_tokens))
+            failed = chunk['error'].notna()
+            errors = list(zip(chunk.index[failed] + 1, chunk.loc[failed, 'error']))
+            accepted = chunk[~failed]
+
+            # The chunk's rows and the checkpoint commit together
+            with transaction.atomic():
+                if sync:
+                    accepted = accepted.assign(
+                        is_active=accepted['expiry_date'].isna() | (accepted['expiry_date'] >= today)
+                    )
+                    created, updated_ids, deactivated = sync_companies(accepted, errors)
+                else:
+                    created, updated_ids, deactivated = 0, [], 0
+                    for start in range(0, len(accepted), BULK_CREATE_BATCH_SIZE):
+                        created += insert_companies(accepted.iloc[start:start + BULK_CREATE_BATCH_SIZE], errors)
+                errors.sort()
+                job.rows_done += len(chunk)
+                job.processed_count += created
+                job.updated_count += len(updated_ids)
+                job.deactivated_count += deactivated
+                job.error_count += len(errors)
+                room = MAX_REPORTED_ERRORS - len(job.errors)
+                job.errors += [f"Row {row_number}: {message}" for row_number, message in errors[:max(room, 0)]]
+                job.save()
+                if created or updated_ids:
+                    refresh_after_bulk_write(updated_ids)
+
+            seen_tokens.append(accepted['token_id'].to_numpy())
+            if sync:
+                present_tokens.append(chunk['token_id'].dropna().to_numpy())
+            report_progress(
+                self, rows_done=job.rows_done, processed_count=job.processed_count,
+                updated_count=job.updated_count, error_count=job.error_count
+            )
+
+        with transaction.atomic():
+            if sync:
+                missing = deactivate_missing_companies(np.concatenate(present_tokens), active_tokens)
+                job.deactivated_count += len(missing)
+                if missing:
+                    refresh_after_bulk_write(missing)
+            job.status = CompanyImport.Status.COMPLETED
+            job.save()
         # Clean up the temporary file
         default_storage.delete(file_path)
-        
-        result = {
-            "success": True,
-            "processed_count": processed_count,
-            "error_count": len(errors),
-            "errors": errors[:100]  # Limit error messages to first 100
-        }
-        
-        return result
-        
+        return import_result(job)
+
     except Exception as e:
         # Clean up the file in case of error
+        job.status = CompanyImport.Status.FAILED
+        job.save(update_fields=['status', 'updated_at'])
         default_storage.delete(file_path)
         return {
             "success": False,
             "error": str(e),
-            "processed_count": 0,
-            "error_count": 0,
-            "errors": []
-        }
\ No newline at end of file
+            "processed_count": job.processed_count,
+            "error_count": job.error_count,
+            "errors": job.errors
+        }
@@ -1,10 +1,36 @@
-from django.test import TestCase
+from django.test import TestCase, SimpleTestCase, override_settings
+from unittest import mock
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 import pandas as pd
 import io
-from .models import Company
+import datetime
+from importlib import import_module
+from django.apps import apps as app_registry
+from .models import Company, Trade, TradeHistory, CompanyTradeSummary, CompanyImport
+from django.core.files.base import ContentFile
+from django.core.files.storage import InMemoryStorage
+import asyncio
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils.dateparse import parse_datetime
+from .consumers import RecentMessageCache, TokenBucket, SingleFlight
+from .trade_updates.diff import SnapshotDiffer
+from .trade_updates.redis_client import RedisClient
+from core.response_cache import get_response_cache_stats, reset_response_cache_stats
+from core.pagination import KeysetPageNumberPagination
+from core.conditional import get_generations
+from rest_framework.request import Request
+from rest_framework.exceptions import NotFound
+from rest_framework.test import APIRequestFactory
+from .instrument_search import InstrumentSearchIndex
+from .trade_summaries import rebuild_company_summary
+from . import instrument_master
+from .instrument_master import get_instrument_master
+from .tasks import validate_company_rows, insert_companies, process_csv_file
+from .index_ticks import IndexTickBuffer, TickDistributor, TickSource, normalize_tick
 
 class CompanyCSVUploadTests(TestCase):
     def setUp(self):
@@ -53,3 +79,627 @@ class CompanyCSVUploadTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 1)
 
+
+class RecentMessageCacheTests(SimpleTestCase):
+    def test_repeated_key_is_duplicate_within_ttl(self):
+        recent = RecentMessageCache(ttl=5)
+        key = RecentMessageCache.fingerprint({'trade_id': 1, 'trade_status': 'ACTIVE'})
+
+        self.assertFalse(recent.is_duplicate(key))
+        self.assertTrue(recent.is_duplicate(key))
+
+    def test_changed_value_is_not_duplicate(self):
+        recent = RecentMessageCache(ttl=60)
+
+        self.assertFalse(recent.is_duplicate(10, 'hash-a'))
+        self.assertTrue(recent.is_duplicate(10, 'hash-a'))
+        self.assertFalse(recent.is_duplicate(10, 'hash-b'))
+
+    def test_entries_expire_after_ttl(self):
+        recent = RecentMessageCache(ttl=5)
+        with mock.patch('apps.trades.consumers.time.monotonic', return_value=100.0):
+            recent.is_duplicate('a')
+        with mock.patch('apps.trades.consumers.time.monotonic', return_value=106.0):
+            self.assertFalse(recent.is_duplicate('a'))
+            self.assertEqual(len(recent), 1)
+
+    def test_fingerprint_ignores_key_order(self):
+        self.assertEqual(
+            RecentMessageCache.fingerprint({'a': 1, 'b': 2}),
+            RecentMessageCache.fingerprint({'b': 2, 'a': 1})
+        )
+
+
+class TokenBucketTests(SimpleTestCase):
+    def test_bucket_allows_burst_then_limits(self):
+        with mock.patch('apps.trades.consumers.time.monotonic', return_value=0.0):
+            bucket = TokenBucket(capacity=2, refill_rate=0.5)
+            self.assertTrue(bucket.consume())
+            self.assertTrue(bucket.consume())
+            self.assertFalse(bucket.consume())
+            self.assertEqual(bucket.retry_after(), 2.0)
+
+        with mock.patch('apps.trades.consumers.time.monotonic', return_value=2.0):
+            self.assertTrue(bucket.consume())
+
+
+class SingleFlightTests(SimpleTestCase):
+    def test_concurrent_calls_share_one_computation(self):
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {'stock_data': []}
+
+        async def run():
+            flight = SingleFlight()
+            results = await asyncio.gather(*[flight.run('user-1', compute) for _ in range(5)])
+            again = await flight.run('user-1', compute)
+            return results, again
+
+        results, again = asyncio.run(run())
+        self.assertEqual(len(calls), 2)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(again, {'stock_data': []})
+
+
+class SnapshotDifferTests(SimpleTestCase):
+    def setUp(self):
+        self.differ = SnapshotDiffer(('stock_data', 'index_data'))
+        self.differ.load({
+            'stock_data': [{'id': 1, 'price': 100}, {'id': 2, 'price': 200}],
+            'index_data': [{'id': 7, 'price': 50}],
+        })
+
+    def test_unchanged_snapshot_produces_no_diff(self):
+        changes = self.differ.diff({
+            'stock_data': [{'id': 2, 'price': 200}, {'id': 1, 'price': 100}],
+            'index_data': [{'id': 7, 'price': 50}],
+        })
+        self.assertEqual(changes, {})
+
+    def test_changed_added_and_removed_entries(self):
+        changes = self.differ.diff({
+            'stock_data': [{'id': 1, 'price': 101}, {'id': 3, 'price': 300}],
+            'index_data': [{'id': 7, 'price': 50}],
+        })
+        self.assertEqual(changes, {
+            'stock_data': {
+                'upsert': [{'id': 1, 'price': 101}, {'id': 3, 'price': 300}],
+                'remove': [2],
+            }
+        })
+        # The new snapshot becomes the baseline
+        self.assertEqual(self.differ.diff({
+            'stock_data': [{'id': 1, 'price': 101}, {'id': 3, 'price': 300}],
+            'index_data': [{'id': 7, 'price': 50}],
+        }), {})
+
+    def test_state_round_trip(self):
+        restored = SnapshotDiffer(('stock_data', 'index_data'), self.differ.state)
+        changes = restored.diff({'stock_data': [{'id': 1, 'price': 100}, {'id': 2, 'price': 200}]})
+        self.assertEqual(changes, {'index_data': {'upsert': [], 'remove': [7]}})
+
+
+class RedisClientTests(SimpleTestCase):
+    @override_settings(REDIS_URL='redis://cache.internal:6380/2')
+    def test_client_connects_to_redis_url(self):
+        kwargs = RedisClient().redis_client.connection_pool.connection_kwargs
+        self.assertEqual((kwargs['host'], kwargs['port'], kwargs['db']), ('cache.internal', 6380, 2))
+
+
+class InstrumentSearchIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = InstrumentSearchIndex([
+            (1, 'SBIN', 'STATE BANK OF INDIA', 'State Bank of India'),
+            (2, 'SBICARD', 'SBI CARDS', 'SBI Cards and Payment'),
+            (3, 'HDFCBANK', 'HDFC BANK LTD', 'HDFC Bank'),
+            (4, 'BANKNIFTY', 'NIFTY BANK', 'Bank Nifty'),
+            (5, 'RELIANCE', 'RELIANCE INDUSTRIES', 'Reliance Industries'),
+        ])
+
+    def test_exact_symbol_then_symbol_prefix_then_name_prefix(self):
+        self.assertEqual(self.index.search('sbin'), [1, 2])
+        self.assertEqual(self.index.search('SBI'), [1, 2])
+        self.assertEqual(self.index.search('bank'), [4, 1, 3])
+
+    def test_misspelt_symbol_matches_by_trigrams(self):
+        self.assertEqual(self.index.search('RELIANSE')[:1], [5])
+        self.assertEqual(self.index.search('hdfcbnk')[:1], [3])
+        self.assertEqual(self.index.search('zzzz'), [])
+
+    def test_limit_and_blank_query(self):
+        self.assertEqual(len(self.index.search('bank', limit=2)), 2)
+        self.assertEqual(self.index.search('nse'), [])
+        self.assertEqual(self.index.search('  '), [])
+
+    def test_prefix_search_has_no_fuzzy_hits_and_gives_up_past_the_cap(self):
+        self.assertEqual(self.index.prefix_search('sbin', cap=10), [1])
+        self.assertEqual(self.index.prefix_search('bank', cap=10), [4, 1, 3])
+        self.assertEqual(self.index.prefix_search('reliansee', cap=10), [])
+
+        index = InstrumentSearchIndex([
+            (company_id, f'NIFTY{company_id:04d}', 'NIFTY OPTION', 'Nifty Option')
+            for company_id in range(1, 1001)
+        ])
+        self.assertEqual(sorted(index.prefix_search('nifty', cap=1000)), list(range(1, 1001)))
+        self.assertIsNone(index.prefix_search('nifty', cap=999))
+
+
+class CompanySearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        for token_id, symbol, name in ((1, 'SBIN', 'State Bank of India'), (2, 'TCS', 'Tata Consultancy Services')):
+            with self.captureOnCommitCallbacks(execute=True):
+                Company.objects.create(
+                    token_id=token_id, exchange='NSE', trading_symbol=symbol,
+                    script_name=name.upper(), display_name=name
+                )
+
+    def test_search_action_and_filter_follow_new_companies(self):
+        response = self.client.get(reverse('company-search'), {'q': 'tata'})
+        self.assertEqual([company['trading_symbol'] for company in response.json()], ['TCS'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Company.objects.create(
+                token_id=3, exchange='NSE', trading_symbol='TATAMOTORS',
+                script_name='TATA MOTORS', display_name='Tata Motors'
+            )
+        response = self.client.get(reverse('company-list'), {'search': 'tata'})
+        self.assertEqual([company['trading_symbol'] for company in response.json()['results']], ['TATAMOTORS', 'TCS'])
+
+        # Broader than the id list allows: the database filters instead
+        with mock.patch('apps.trades.instrument_search.FILTER_MAX_IDS', 1):
+            response = self.client.get(reverse('company-list'), {'search': 'tata'})
+        self.assertEqual(
+            sorted(company['trading_symbol'] for company in response.json()['results']), ['TATAMOTORS', 'TCS']
+        )
+
+
+# Lookups re-read the generation each time, so every test sees its own rows
+@mock.patch.object(instrument_master._master, 'check_interval', 0)
+class InstrumentMasterTests(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Company.objects.create(
+                token_id=2885, exchange='NSE', trading_symbol='RELIANCE',
+                script_name='RELIANCE', display_name='Reliance Industries'
+            )
+            Company.objects.create(
+                token_id=35001, exchange='NFO', trading_symbol='NIFTY24DECFUT', script_name='NIFTY',
+                display_name='Nifty Dec Fut', instrument_type='FNO_FUT', expiry_date=datetime.date(2024, 12, 26)
+            )
+
+    def test_lookups_by_token_symbol_and_id(self):
+        master = get_instrument_master()
+        future = master.get_by_token(35001)
+        self.assertEqual(future.trading_symbol, 'NIFTY24DECFUT')
+        self.assertEqual(future.instrument_type, 'FNO_FUT')
+        self.assertEqual(future.expiry_date, datetime.date(2024, 12, 26))
+        self.assertEqual(master.get_by_symbol('RELIANCE', 'NSE').token_id, 2885)
+        self.assertIsNone(master.get_by_symbol('RELIANCE', 'BSE'))
+        self.assertIsNone(master.get_by_token(2885).expiry_date)
+        self.assertEqual(master.get_by_id(future.id), future)
+        self.assertIsNone(master.get_by_token(1))
+
+    def test_symbol_lookup_picks_the_exchange(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Company.objects.create(
+                token_id=500325, exchange='BSE', trading_symbol='RELIANCE',
+                script_name='RELIANCE', display_name='Reliance Industries'
+            )
+        master = get_instrument_master()
+        self.assertEqual(master.get_by_symbol('RELIANCE', 'BSE').token_id, 500325)
+        self.assertEqual(master.get_by_symbol('RELIANCE', 'NSE').token_id, 2885)
+        self.assertIsNone(master.get_by_symbol('RELIANC', 'NSE'))
+        self.assertIsNone(master.get_by_symbol('RELIANCE', 'MCX'))
+
+    def test_reloads_after_company_changes(self):
+        master = get_instrument_master()
+        self.assertIs(get_instrument_master(), master)
+        with self.captureOnCommitCallbacks(execute=True):
+            Company.objects.create(
+                token_id=11536, exchange='NSE', trading_symbol='TCS', script_name='TCS', display_name='TCS'
+            )
+        self.assertIn(11536, get_instrument_master())
+        self.assertNotIn(11536, master)
+
+    def test_generation_is_read_at_most_once_per_interval(self):
+        master = get_instrument_master()
+        with mock.patch.object(instrument_master._master, 'check_interval', 60), \
+                mock.patch('core.conditional.get_generations', wraps=get_generations) as read:
+            for _ in range(3):
+                self.assertIs(get_instrument_master(), master)
+            read.assert_not_called()
+            self.assertIs(get_instrument_master(check=True), master)
+            read.assert_called_once()
+
+
+class CompanyImportTests(TestCase):
+    def frame(self, csv):
+        header = 'tokenId,exchange,tradingSymbol,scriptName,expiryDate,optionType,segment,displayName\n'
+        return pd.read_csv(io.StringIO(header + csv))
+
+    def test_row_errors_follow_check_order(self):
+        df = validate_company_rows(self.frame(
+            '1,NSE,AAA,AAA,,,,A\n'
+            '9,NSE,OLD,OLD,,,,Old\n'
+            'x,NSE,BAD,BAD,,,,Bad\n'
+            '2,NSE,,EMPTY,,,,Empty\n'
+            '3,NFO,OPT,OPT,soon,CE,OPT,Opt\n'
+            '1,NSE,AAA,AAA,,,,A again\n'
+            '4,NFO,FUT,FUT,26-Dec-2024,,FUT,Fut\n'
+        ), existing_tokens=[9])
+        self.assertEqual(list(df['error']), [
+            None,
+            'Duplicate token_id 9',
+            'Invalid token_id format',
+            'Missing required fields',
+            'Invalid or missing expiry date for F&O instrument',
+            'Duplicate token_id 1',
+            None,
+        ])
+        self.assertEqual(df.loc[6, 'instrument_type'], 'FNO_FUT')
+
+    def test_accepted_rows_are_inserted_in_bulk(self):
+        df = validate_company_rows(self.frame(
+            '1,NSE,AAA,AAA,,,,A\n2,NFO,FUT,FUT,26-Dec-2024,,FUT,Fut\n'
+        ), existing_tokens=[])
+        errors = []
+        with CaptureQueriesContext(connection) as queries:
+            created = insert_companies(df[df['error'].isna()], errors)
+        self.assertEqual((created, errors), (2, []))
+        self.assertEqual(len([query for query in queries.captured_queries if 'INSERT' in query['sql']]), 1)
+        self.assertEqual(Company.objects.get(token_id=2).expiry_date, datetime.date(2024, 12, 26))
+
+        # A conflicting chunk falls back to row inserts and reports the duplicate row
+        created = insert_companies(df, errors)
+        self.assertEqual(created, 0)
+        self.assertEqual([row_number for row_number, _ in errors], [1, 2])
+
+    @mock.patch('apps.trades.tasks.default_storage', new_callable=InMemoryStorage)
+    def test_streamed_import_resumes_after_last_committed_chunk(self, storage):
+        path = storage.save('upload.csv', ContentFile(
+            'tokenId,exchange,tradingSymbol,scriptName,expiryDate,optionType,segment,displayName\n'
+            '1,NSE,AAA,AAA,,,,A\n2,NSE,BBB,BBB,,,,B\n'
+            '3,NSE,CCC,CCC,,,,C\n1,NSE,AAA,AAA,,,,A again\n'
+            '4,NSE,DDD,DDD,,,,D\n'
+        ))
+        # A worker died after committing the first two-row chunk
+        Company.objects.create(token_id=1, exchange='NSE', trading_symbol='AAA', script_name='AAA', display_name='A')
+        Company.objects.create(token_id=2, exchange='NSE', trading_symbol='BBB', script_name='BBB', display_name='B')
+        CompanyImport.objects.create(task_id='import-1', file_path=path, rows_done=2, processed_count=2)
+
+        result = process_csv_file.apply(args=[path], kwargs={'chunk_size': 2}, task_id='import-1').get()
+
+        self.assertEqual(result, {
+            'success': True, 'processed_count': 4, 'error_count': 1, 'errors': ['Row 4: Duplicate token_id 1']
+        })
+        self.assertEqual(sorted(Company.objects.values_list('token_id', flat=True)), [1, 2, 3, 4])
+        job = CompanyImport.objects.get(task_id='import-1')
+        self.assertEqual((job.status, job.rows_done), (CompanyImport.Status.COMPLETED, 5))
+        self.assertFalse(storage.exists(path))
+
+    @mock.patch('apps.trades.tasks.default_storage', new_callable=InMemoryStorage)
+    def test_sync_upserts_and_deactivates_expired_or_missing(self, storage):
+        for token_id, symbol, expiry_date in ((1, 'OLDNAME', None), (2, 'SAME', None), (3, 'GONE', None),
+                                              (4, 'NIFTYFUT', datetime.date(2030, 1, 1))):
+            Company.objects.create(
+                token_id=token_id, exchange='NSE', trading_symbol=symbol, script_name=symbol,
+                display_name=symbol, expiry_date=expiry_date,
+                instrument_type='FNO_FUT' if expiry_date else 'EQUITY'
+            )
+        path = storage.save('master.csv', ContentFile(
+            'tokenId,exchange,tradingSymbol,scriptName,expiryDate,optionType,segment,displayName\n'
+            '1,NSE,NEWNAME,OLDNAME,,,,OLDNAME\n'
+            '2,NSE,SAME,SAME,,,,SAME\n'
+            '4,NSE,NIFTYFUT,NIFTYFUT,26-Dec-2024,,FUT,NIFTYFUT\n'
+            '5,NSE,FRESH,FRESH,,,,FRESH\n'
+            '5,NSE,FRESH,FRESH,,,,FRESH\n'
+        ))
+
+        result = process_csv_file.apply(args=[path], kwargs={'mode': 'sync', 'chunk_size': 2}, task_id='sync-1').get()
+
+        self.assertEqual(
+            {key: result[key] for key in ('inserted_count', 'updated_count', 'deactivated_count', 'errors')},
+            {'inserted_count': 1, 'updated_count': 2, 'deactivated_count': 2, 'errors': ['Row 5: Duplicate token_id 5']}
+        )
+        companies = {company.token_id: company for company in Company.objects.all()}
+        self.assertEqual(companies[1].trading_symbol, 'NEWNAME')
+        self.assertEqual(
+            {token_id: company.is_active for token_id, company in companies.items()},
+            {1: True, 2: True, 3: False, 4: False, 5: True}
+        )
+
+    @mock.patch('apps.trades.tasks.invalidate')
+    @mock.patch('apps.trades.tasks.invalidate_tags')
+    @mock.patch('apps.trades.tasks.default_storage', new_callable=InMemoryStorage)
+    def test_sync_drops_cached_trades_of_changed_companies(self, storage, invalidate_tags, invalidate):
+        user = get_user_model().objects.create_user(
+            phone_number='+919876543211', email='trader@example.com', password='pass'
+        )
+        trades = {}
+        for token_id, symbol in ((1, 'OLDNAME'), (2, 'SAME'), (3, 'GONE')):
+            company = Company.objects.create(
+                token_id=token_id, exchange='NSE', trading_symbol=symbol, script_name=symbol, display_name=symbol
+            )
+            trades[token_id] = Trade.objects.create(
+                company=company, user=user, trade_type='INTRADAY', plan_type='PREMIUM'
+            )
+        path = storage.save('master.csv', ContentFile(
+            'tokenId,exchange,tradingSymbol,scriptName,expiryDate,optionType,segment,displayName\n'
+            '1,NSE,NEWNAME,OLDNAME,,,,OLDNAME\n'
+            '2,NSE,SAME,SAME,,,,SAME\n'
+        ))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            process_csv_file.apply(args=[path], kwargs={'mode': 'sync'}, task_id='sync-2').get()
+
+        # Bulk writes skip the Company signals, so the task drops the renamed
+        # and the deactivated companies' trades itself
+        tags = {tag for call in invalidate_tags.call_args_list for tag in call.args}
+        self.assertEqual(tags, {'trade:%s' % trades[1].id, 'trade:%s' % trades[3].id, 'plan:PREMIUM'})
+        keys = {key for call in invalidate.call_args_list for key in call.args}
+        self.assertEqual(keys, {'completed_trade:%s' % trades[1].id, 'completed_trade:%s' % trades[3].id})
+
+
+class IndexTickBufferTests(SimpleTestCase):
+    def test_updates_conflate_to_latest_value(self):
+        buffer = IndexTickBuffer(capacity=4)
+        for value in ('100', '101', '102'):
+            buffer.update(normalize_tick({'id': 'nifty50', 'value': value, 'change': '1'}))
+        buffer.update(normalize_tick({'id': 'sensex', 'value': '500', 'change': '-2'}))
+
+        ticks = buffer.drain()
+        self.assertEqual([(tick['id'], tick['value'], tick['trend']) for tick in ticks],
+                         [('nifty50', '102', 'up'), ('sensex', '500', 'down')])
+        self.assertEqual(buffer.drain(), [])
+        self.assertEqual(len(buffer.snapshot()), 2)
+
+    def test_oldest_slot_is_reused_when_full(self):
+        buffer = IndexTickBuffer(capacity=2)
+        for index_id in ('a', 'b', 'c'):
+            buffer.update(normalize_tick({'id': index_id, 'value': '1'}))
+        self.assertEqual(sorted(tick['id'] for tick in buffer.snapshot()), ['b', 'c'])
+        self.assertEqual(len(buffer), 2)
+
+    def test_least_recently_written_slot_is_reused(self):
+        buffer = IndexTickBuffer(capacity=2)
+        for index_id in ('a', 'b', 'a', 'c'):
+            buffer.update(normalize_tick({'id': index_id, 'value': '1'}))
+        self.assertEqual(sorted(tick['id'] for tick in buffer.snapshot()), ['a', 'c'])
+
+    def test_tick_source_must_implement_ticks(self):
+        with self.assertRaises(TypeError):
+            TickSource()
+
+
+class TickDistributorTests(SimpleTestCase):
+    class BurstSource(TickSource):
+        async def ticks(self):
+            for value in range(50):
+                yield {'id': 'nifty50', 'value': value}
+                if value % 10 == 9:
+                    await asyncio.sleep(0.03)
+
+    def test_bursts_are_published_at_capped_rate(self):
+        channel_layer = mock.Mock()
+        channel_layer.group_send = mock.AsyncMock()
+        distributor = TickDistributor(self.BurstSource(), channel_layer, max_rate=20)
+
+        with mock.patch('apps.trades.consumers.IndexUpdateManager.set_cached_indices', mock.AsyncMock()):
+            asyncio.run(distributor.run())
+
+        self.assertEqual(distributor.ticks_received, 50)
+        self.assertLess(channel_layer.group_send.await_count, 10)
+        group, message = channel_layer.group_send.await_args.args
+        self.assertEqual(group, 'index_updates')
+        self.assertEqual(message['data'][0]['value'], '49')
+
+    def test_snapshot_is_rewritten_while_the_feed_is_quiet(self):
+        channel_layer = mock.Mock()
+        channel_layer.group_send = mock.AsyncMock()
+        distributor = TickDistributor(self.BurstSource(), channel_layer, snapshot_timeout=300)
+        distributor.buffer.update(normalize_tick({'id': 'nifty50', 'value': '1'}))
+
+        with mock.patch('apps.trades.consumers.IndexUpdateManager.set_cached_indices', mock.AsyncMock()) as store:
+            asyncio.run(distributor.publish_pending())
+            asyncio.run(distributor.publish_pending())
+            self.assertEqual(store.await_count, 1)
+
+            distributor._snapshot_written_at -= 200
+            self.assertFalse(asyncio.run(distributor.publish_pending()))
+        self.assertEqual(store.await_count, 2)
+        self.assertEqual(store.await_args.args, ([distributor.buffer.snapshot()[0]], 300))
+        self.assertEqual(channel_layer.group_send.await_count, 1)
+
+
+class GroupedTradeQueryTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            phone_number='+919876543210', email='staff@example.com', password='pass', is_staff=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('grouped-trade-list')
+
+    def create_companies(self, count, start=0):
+        # Trade summaries are rebuilt on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            self._create_companies(count, start)
+
+    def _create_companies(self, count, start):
+        for number in range(start, start + count):
+            company = Company.objects.create(
+                token_id=1000 + number, exchange='NSE', trading_symbol=f'SYM{number}',
+                script_name=f'SYM{number}', display_name=f'Symbol {number}'
+            )
+            for trade_type, trade_status in (('INTRADAY', 'ACTIVE'), ('POSITIONAL', 'ACTIVE'), ('INTRADAY', 'COMPLETED')):
+                trade = Trade.objects.create(
+                    company=company, user=self.user, trade_type=trade_type, status=trade_status
+                )
+                TradeHistory.objects.create(trade=trade, buy=100, target=110, sl=95)
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries), response
+
+    def test_query_count_does_not_grow_with_companies(self):
+        self.create_companies(2)
+        few, _ = self.count_queries()
+        self.create_companies(6, start=2)
+        many, response = self.count_queries()
+
+        self.assertEqual(few, many)
+        company = response.json()['results'][0]
+        self.assertEqual(company['intraday_trade']['status'], 'ACTIVE')
+        self.assertEqual(len(company['intraday_trade']['trade_history']), 1)
+        self.assertEqual(len(company['completed_trade']), 1)
+        self.assertEqual(parse_datetime(company['created_at']), parse_datetime(company['positional_trade']['created_at']))
+
+    def test_cursor_pages_walk_companies_without_count(self):
+        self.create_companies(7)
+        symbols, url, pages = [], f'{self.url}?cursor=&page_size=3', 0
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+            body = response.json()
+            self.assertNotIn('count', body)
+            symbols += [company['tradingSymbol'] for company in body['results']]
+            url, pages = body['next'], pages + 1
+
+        self.assertEqual(pages, 3)
+        self.assertEqual(symbols, sorted(f'SYM{number}' for number in range(7)))
+        self.assertEqual(self.client.get(f'{self.url}?cursor=&count=true').json()['count'], 7)
+        self.assertEqual(self.client.get(f'{self.url}?cursor=bogus').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_keeps_rows_within_the_same_millisecond(self):
+        company = Company.objects.create(
+            token_id=1, exchange='NSE', trading_symbol='SBIN', script_name='SBIN', display_name='SBI'
+        )
+        moment = parse_datetime('2024-01-02T03:04:05.123456+00:00')
+        later, earlier = (
+            Trade.objects.create(company=company, user=self.user, trade_type='INTRADAY') for _ in range(2)
+        )
+        Trade.objects.filter(pk=later.pk).update(created_at=moment)
+        Trade.objects.filter(pk=earlier.pk).update(created_at=moment.replace(microsecond=123001))
+
+        paginator = KeysetPageNumberPagination()
+        request = Request(APIRequestFactory().get('/', {'cursor': '', 'page_size': 1}))
+        paginator.page_size_query_param = 'page_size'
+        first = paginator.paginate_queryset(Trade.objects.all(), request)
+        cursor = paginator.encode_cursor(paginator.next_position)
+        request = Request(APIRequestFactory().get('/', {'cursor': cursor, 'page_size': 1}))
+        second = paginator.paginate_queryset(Trade.objects.all(), request)
+        self.assertEqual([trade.pk for trade in first + second], [later.pk, earlier.pk])
+
+    def test_cursor_on_a_model_without_the_ordering_fields_is_not_found(self):
+        paginator = KeysetPageNumberPagination()
+        request = Request(APIRequestFactory().get('/', {'cursor': ''}))
+        with self.assertRaises(NotFound):
+            paginator.paginate_queryset(TradeHistory.objects.all(), request)
+
+    def test_migration_populates_summaries_of_existing_trades(self):
+        # Trades from before the read model existed have no summary rows
+        self._create_companies(2, 0)
+        self.assertEqual(self.client.get(self.url).json()['results'], [])
+
+        Trade.objects.update(image='trades/chart.png')
+        migration = import_module('apps.trades.migrations.0022_populate_company_trade_summaries')
+        migration.populate_company_trade_summaries(app_registry, None)
+        # Seeded rows only carry the flags; trades are serialized directly until rebuilt
+        results = self.client.get(self.url).json()['results']
+        self.assertEqual(sorted(company['tradingSymbol'] for company in results), ['SYM0', 'SYM1'])
+        self.assertEqual(results[0]['intraday_trade']['image'], 'http://testserver/media/trades/chart.png')
+        self.assertEqual(len(results[0]['completed_trade']), 1)
+
+        # Rebuilt summaries store relative URLs and are resolved per request
+        rebuild_company_summary(Company.objects.get(trading_symbol='SYM0').id)
+        self.assertEqual(
+            CompanyTradeSummary.objects.get(company__trading_symbol='SYM0').summary['intraday_trade']['image'],
+            '/media/trades/chart.png'
+        )
+        results = self.client.get(self.url).json()['results']
+        self.assertEqual(
+            [company['intraday_trade']['image'] for company in results],
+            ['http://testserver/media/trades/chart.png'] * 2
+        )
+
+    def test_trade_events_are_published_only_after_commit(self):
+        company = Company.objects.create(
+            token_id=1, exchange='NSE', trading_symbol='SBIN', script_name='SBIN', display_name='SBI'
+        )
+        with mock.patch('apps.trades.trade_updates.redis_client.publish_trade_event') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                with self.assertRaises(RuntimeError), transaction.atomic():
+                    Trade.objects.create(company=company, user=self.user, trade_type='INTRADAY', status='ACTIVE')
+                    raise RuntimeError
+            publish.assert_not_called()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                trade = Trade.objects.create(company=company, user=self.user, trade_type='INTRADAY', status='ACTIVE')
+            publish.assert_called_once_with('stock', trade, 'created')
+
+    def test_summary_follows_trade_changes(self):
+        self.create_companies(1)
+        company = Company.objects.get()
+        summary = CompanyTradeSummary.objects.get(company=company)
+        self.assertTrue(summary.has_active_trade)
+        self.assertEqual(summary.min_plan_rank, 1)
+        self.assertEqual(len(summary.summary['completed_trade']), 1)
+
+        intraday = company.trades.get(trade_type='INTRADAY', status='ACTIVE')
+        with self.captureOnCommitCallbacks(execute=True):
+            TradeHistory.objects.create(trade=intraday, buy=101, target=120, sl=96)
+        summary.refresh_from_db()
+        self.assertEqual(len(summary.summary['intraday_trade']['trade_history']), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            company.trades.filter(status='ACTIVE').update(status='COMPLETED')
+            for trade in company.trades.all():
+                trade.save()
+        summary.refresh_from_db()
+        self.assertFalse(summary.has_active_trade)
+        self.assertIsNone(summary.summary['intraday_trade'])
+        self.assertEqual(len(summary.summary['completed_trade']), 3)
+
+    def test_conditional_get_returns_304_until_trades_change(self):
+        self.create_companies(1)
+        _, response = self.count_queries()
+        etag = response['ETag']
+        # Plan-scoped lists are validated by ETag only
+        self.assertNotIn('Last-Modified', response)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(len(queries), 0)
+
+        self.create_companies(1, start=1)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_completed_trades_are_served_from_response_cache(self):
+        self.create_companies(2)
+        # The index/commodity app registers the same route name, so use the path
+        url = '/api/v1/trades/completed-trades-old/'
+        reset_response_cache_stats()
+
+        first = self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(url)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(get_response_cache_stats()['trades.completed_trades']['hit_rate'], 0.5)
+
+        trade = Trade.objects.filter(status='ACTIVE').first()
+        with self.captureOnCommitCallbacks(execute=True):
+            trade.status = 'COMPLETED'
+            trade.save()
+        self.assertEqual(self.client.get(url).json()['count'], first.json()['count'] + 1)
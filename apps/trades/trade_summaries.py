@@ -0,0 +1,84 @@
+import logging
+from django.db import transaction
+from .models import Trade, CompanyTradeSummary
+from .serializers.GroupedTradeSerializer import TradeDetailSerializer
+
+logger = logging.getLogger(__name__)
+
+# Plan access is cumulative, so a company is visible to a plan when its
+# lowest-ranked active/completed trade is within the plan's rank.
+PLAN_RANKS = {
+    'BASIC': 1,
+    'PREMIUM': 2,
+    'SUPER_PREMIUM': 3,
+    'FREE_TRIAL': 3
+}
+
+VISIBLE_STATUSES = ['ACTIVE', 'COMPLETED']
+
+
+def summarize_trades(trades, serializer_class):
+    """
+    Shared shaping for company and index/commodity summaries. `trades` must
+    be ordered newest first (the models' default ordering).
+    """
+    visible = [trade for trade in trades if trade.status in VISIBLE_STATUSES]
+    active = [trade for trade in visible if trade.status == 'ACTIVE']
+    completed = [trade for trade in visible if trade.status == 'COMPLETED']
+
+    def latest_active(trade_type):
+        return next((trade for trade in active if trade.trade_type == trade_type), None)
+
+    intraday = latest_active('INTRADAY')
+    positional = latest_active('POSITIONAL')
+    latest_active_trade_at = max(
+        (trade.created_at for trade in active if trade.trade_type in ['INTRADAY', 'POSITIONAL']),
+        default=None
+    )
+
+    summary = {
+        'intraday_trade': serializer_class(intraday).data if intraday else None,
+        'positional_trade': serializer_class(positional).data if positional else None,
+    }
+    fields = {
+        'latest_active_trade_at': latest_active_trade_at,
+        'has_active_trade': bool(active),
+        'has_completed_trade': bool(completed),
+        'min_plan_rank': min((PLAN_RANKS.get(trade.plan_type, 3) for trade in visible), default=None),
+    }
+    return summary, completed, fields
+
+
+def rebuild_company_summary(company_id):
+    """Recompute the CompanyTradeSummary row of one company."""
+    trades = list(
+        Trade.objects.filter(company_id=company_id)
+        .select_related('analysis', 'insight')
+        .prefetch_related('history')
+    )
+    if not trades:
+        CompanyTradeSummary.objects.filter(company_id=company_id).delete()
+        return None
+
+    summary, completed, fields = summarize_trades(trades, TradeDetailSerializer)
+    summary['completed_trade'] = TradeDetailSerializer(completed, many=True).data if completed else None
+    fields['has_free_call'] = any(
+        trade.is_free_call for trade in trades if trade.status in VISIBLE_STATUSES
+    )
+
+    row, _ = CompanyTradeSummary.objects.update_or_create(
+        company_id=company_id,
+        defaults={'summary': summary, **fields}
+    )
+    return row
+
+
+def schedule_company_summary_refresh(company_id):
+    """Rebuild the company's summary once the current transaction commits."""
+    def refresh():
+        try:
+            rebuild_company_summary(company_id)
+        except Exception as e:
+            logger.error(f"Error rebuilding trade summary for company {company_id}: {str(e)}")
+
+    transaction.on_commit(refresh)
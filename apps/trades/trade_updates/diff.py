@@ -0,0 +1,51 @@
+import json
+import hashlib
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+def content_hash(payload):
+    """Stable content hash for a JSON-serializable payload."""
+    encoded = json.dumps(payload, sort_keys=True, cls=DjangoJSONEncoder).encode('utf-8')
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+class SnapshotDiffer:
+    """
+    Remembers the content hash of every entry a client last received, per
+    section (e.g. stock_data / index_data), and turns a new snapshot into
+    upsert/remove diffs.
+    """
+
+    def __init__(self, sections, state=None):
+        self.sections = sections
+        self.state = state or {section: {} for section in sections}
+
+    def load(self, snapshot):
+        """Record a snapshot that was sent in full."""
+        self.state = {
+            section: {entry['id']: content_hash(entry) for entry in snapshot.get(section, [])}
+            for section in self.sections
+        }
+
+    def diff(self, snapshot):
+        """
+        Return {section: {'upsert': [...], 'remove': [...]}} for the sections
+        that changed since the last snapshot, and remember the new one.
+        An empty dict means nothing changed.
+        """
+        changes = {}
+        for section in self.sections:
+            previous = self.state.get(section, {})
+            current = {}
+            upsert = []
+            for entry in snapshot.get(section, []):
+                key = entry['id']
+                current[key] = content_hash(entry)
+                if previous.get(key) != current[key]:
+                    upsert.append(entry)
+            remove = [key for key in previous if key not in current]
+
+            if upsert or remove:
+                changes[section] = {'upsert': upsert, 'remove': remove}
+            self.state[section] = current
+        return changes
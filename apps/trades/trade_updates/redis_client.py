@@ -1,22 +1,177 @@
 import json
+import asyncio
+import logging
 import redis
+import redis.asyncio as aioredis
 from django.conf import settings
+from django.db import transaction
+from django.core.serializers.json import DjangoJSONEncoder
+
+logger = logging.getLogger(__name__)
+
+# Channel every trade/index change is published on
+TRADE_UPDATES_CHANNEL = 'trade_updates'
+# Number of recent events kept for Last-Event-ID replay
+EVENT_LOG_SIZE = 500
+
 
 class RedisClient:
     def __init__(self):
-        self.redis_client = redis.Redis(
-            host=settings.REDIS_HOST,
-            port=settings.REDIS_PORT,
-            db=settings.REDIS_DB
-        )
+        self.redis_client = redis.Redis.from_url(settings.REDIS_URL)
         self.pubsub = self.redis_client.pubsub()
 
+    @staticmethod
+    def _sequence_key(channel):
+        return f"{channel}:seq"
+
+    @staticmethod
+    def _log_key(channel):
+        return f"{channel}:log"
+
     def publish_trade_update(self, channel, data):
-        """Publish trade updates to Redis channel"""
+        """
+        Publish trade updates to Redis channel.
+
+        Each message gets a monotonically increasing event id and is kept in a
+        capped log so SSE clients can resume with Last-Event-ID.
+        Returns the event id, or False if publishing failed.
+        """
+        try:
+            event_id = self.redis_client.incr(self._sequence_key(channel))
+            message = json.dumps({'id': event_id, 'data': data}, cls=DjangoJSONEncoder)
+
+            pipe = self.redis_client.pipeline()
+            pipe.lpush(self._log_key(channel), message)
+            pipe.ltrim(self._log_key(channel), 0, EVENT_LOG_SIZE - 1)
+            pipe.publish(channel, message)
+            pipe.execute()
+            return event_id
+        except Exception as e:
+            logger.error(f"Error publishing to Redis: {str(e)}")
+            return False
+
+    def get_last_event_id(self, channel):
+        """Return the id of the most recently published event (0 if none)."""
         try:
-            message = json.dumps(data)
-            self.redis_client.publish(channel, message)
-            return True
+            return int(self.redis_client.get(self._sequence_key(channel)) or 0)
         except Exception as e:
-            print(f"Error publishing to Redis: {str(e)}")
-            return False
\ No newline at end of file
+            logger.error(f"Error reading event sequence from Redis: {str(e)}")
+            return 0
+
+    def get_events_since(self, channel, last_event_id):
+        """
+        Return (events, complete) for events published after `last_event_id`,
+        oldest first. `complete` is False when the log no longer reaches back
+        far enough and the caller has to resync from a full snapshot.
+        """
+        try:
+            raw_events = self.redis_client.lrange(self._log_key(channel), 0, -1)
+        except Exception as e:
+            logger.error(f"Error reading event log from Redis: {str(e)}")
+            return [], False
+
+        events = [json.loads(raw) for raw in reversed(raw_events)]
+        missed = [event for event in events if event['id'] > last_event_id]
+        if not missed:
+            return [], True
+        return missed, missed[0]['id'] == last_event_id + 1
+
+
+_redis_client = None
+
+
+def get_redis_client():
+    """Shared RedisClient for the current process."""
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = RedisClient()
+    return _redis_client
+
+
+def publish_trade_event(category, trade, action):
+    """Publish a compact change event for a stock or index/commodity trade."""
+    return get_redis_client().publish_trade_update(TRADE_UPDATES_CHANNEL, {
+        'category': category,
+        'trade_id': trade.id,
+        'trade_status': trade.status,
+        'plan_type': trade.plan_type,
+        'is_free_call': getattr(trade, 'is_free_call', False),
+        'action': action
+    })
+
+
+def publish_trade_event_on_commit(category, trade, action):
+    """
+    Publish once the current transaction commits, so a rolled back save emits
+    nothing. robust: the write is committed already, so a feed outage must
+    not turn it into an error.
+    """
+    transaction.on_commit(lambda: publish_trade_event(category, trade, action), robust=True)
+
+
+class TradeUpdateFeed:
+    """
+    Fans a Redis pub/sub channel out to in-process subscribers.
+
+    One Redis subscription is shared by every open stream in the worker; each
+    stream gets its own bounded asyncio.Queue. When a queue is full the oldest
+    event is dropped, which is safe because consumers resync from a snapshot.
+    """
+
+    def __init__(self, channel, queue_size=100):
+        self.channel = channel
+        self.queue_size = queue_size
+        self._queues = set()
+        self._listener = None
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._queues.add(queue)
+        self.ensure_listening()
+        return queue
+
+    def unsubscribe(self, queue):
+        self._queues.discard(queue)
+        if not self._queues and self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+
+    def ensure_listening(self):
+        """(Re)start the Redis listener if it is not running."""
+        if self._queues and (self._listener is None or self._listener.done()):
+            self._listener = asyncio.ensure_future(self._listen())
+
+    def _dispatch(self, event):
+        for queue in list(self._queues):
+            if queue.full():
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            queue.put_nowait(event)
+
+    async def _listen(self):
+        client = aioredis.Redis.from_url(settings.REDIS_URL)
+        pubsub = client.pubsub()
+        try:
+            await pubsub.subscribe(self.channel)
+            async for message in pubsub.listen():
+                if message.get('type') != 'message':
+                    continue
+                try:
+                    self._dispatch(json.loads(message['data']))
+                except (TypeError, ValueError) as e:
+                    logger.error(f"Invalid message on {self.channel}: {str(e)}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Trade update feed for {self.channel} stopped: {str(e)}")
+        finally:
+            try:
+                await pubsub.aclose()
+                await client.aclose()
+            except Exception:
+                pass
+
+
+trade_update_feed = TradeUpdateFeed(TRADE_UPDATES_CHANNEL)
@@ -1,88 +1,189 @@
 from django.http import StreamingHttpResponse
 from django.utils.decorators import method_decorator
+from django.views import View
 from django.views.decorators.csrf import csrf_exempt
-from rest_framework.views import APIView
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from asgiref.sync import sync_to_async
 import json
 import asyncio
-from datetime import datetime
+import logging
+from django.core.cache import cache
 from django.utils import timezone
 from apps.subscriptions.models import Subscription
 from apps.indexAndCommodity.models import IndexAndCommodity
 from ..serializers.tradeconsumer_serializers import IndexAndCommoditySeraializer, CompanySerializer
 from ..models import Company
+from .redis_client import TRADE_UPDATES_CHANNEL, get_redis_client, trade_update_feed
+from .diff import SnapshotDiffer
 from decimal import Decimal
 
+logger = logging.getLogger(__name__)
+
 class DecimalEncoder(json.JSONEncoder):
     def default(self, obj):
         if isinstance(obj, Decimal):
             return str(obj)
         return super().default(obj)
 
-class TradeUpdatesSSE(APIView):
-    authentication_classes = [JWTAuthentication]
-
-    async def get_active_subscription(self, user):
-        return await sync_to_async(Subscription.objects.filter)(
+@method_decorator(csrf_exempt, name='dispatch')
+class TradeUpdatesSSE(View):
+    """
+    Server-sent events stream of the user's trade data.
+
+    Data is pushed only when a trade event arrives on the Redis trade update
+    feed (no database polling). After the initial snapshot only upsert/remove
+    diffs of entries whose content hash changed are sent. Clients can resume
+    with Last-Event-ID and receive comment keepalives while nothing changes.
+    """
+
+    KEEPALIVE_INTERVAL = 15  # Seconds of silence before a keepalive comment
+    RETRY_INTERVAL = 3000    # Milliseconds the browser waits before reconnecting
+    SECTIONS = ('stock_data', 'index_data')
+    DIFF_STATE_TIMEOUT = 600  # Seconds a client's last-received hashes are kept for resume
+
+    PLAN_FILTERS = {
+        'BASIC': ['BASIC'],
+        'PREMIUM': ['BASIC', 'PREMIUM'],
+        'SUPER_PREMIUM': ['BASIC', 'PREMIUM', 'SUPER_PREMIUM']
+    }
+
+    def get_active_subscription(self, user):
+        now = timezone.now()
+        return Subscription.objects.filter(
             user=user,
             is_active=True,
-            start_date__lte=timezone.now().date(),
-            end_date__gte=timezone.now().date()
-        ).select_related('plan').get()
-
-    async def get_all_data(self, user, subscription):
-        plan_type = subscription.plan.name
-        plan_filters = {
-            'BASIC': ['BASIC'],
-            'PREMIUM': ['BASIC', 'PREMIUM'],
-            'SUPER_PREMIUM': ['BASIC', 'PREMIUM', 'SUPER_PREMIUM']
+            start_date__lte=now,
+            end_date__gte=now
+        ).select_related('plan').first()
+
+    def get_all_data(self, subscription):
+        allowed_plans = self.PLAN_FILTERS.get(subscription.plan.name, [])
+        trade_filters = {
+            'trades__status': "ACTIVE",
+            'trades__created_at__date__gte': subscription.start_date,
+            'trades__created_at__date__lte': subscription.end_date,
+            'trades__plan_type__in': allowed_plans
         }
-        allowed_plans = plan_filters.get(plan_type, [])
 
         # Apply filters to Trades App Data
-        companies = await sync_to_async(list)(Company.objects.filter(
-            trades__status="ACTIVE",
-            trades__created_at__date__gte=subscription.start_date,
-            trades__created_at__date__lte=subscription.end_date,
-            trades__plan_type__in=allowed_plans
-        ).prefetch_related('trades'))
-
-        index_companies = await sync_to_async(list)(IndexAndCommodity.objects.filter(
-            trades__status="ACTIVE",
-            trades__created_at__date__gte=subscription.start_date,
-            trades__created_at__date__lte=subscription.end_date,
-            trades__plan_type__in=allowed_plans
-        ).prefetch_related('trades'))
+        companies = Company.objects.filter(**trade_filters).distinct().prefetch_related('trades')
+        index_companies = IndexAndCommodity.objects.filter(**trade_filters).distinct().prefetch_related('trades')
 
         return {
-            'stock_data': await sync_to_async(CompanySerializer)(companies, many=True).data,
-            'index_data': await sync_to_async(IndexAndCommoditySeraializer)(index_companies, many=True).data
+            'stock_data': CompanySerializer(companies, many=True).data,
+            'index_data': IndexAndCommoditySeraializer(index_companies, many=True).data
         }
 
-    async def generate_events(self, request):
+    def is_relevant(self, event_data, subscription):
+        """Whether a feed event can change what this subscriber sees."""
+        plan_type = event_data.get('plan_type')
+        if plan_type is None or event_data.get('is_free_call'):
+            return True
+        return plan_type in self.PLAN_FILTERS.get(subscription.plan.name, [])
+
+    @staticmethod
+    def diff_state_key(user, event_id):
+        return f"sse_snapshot_{user.id}_{event_id}"
+
+    def save_diff_state(self, user, event_id, differ):
+        """Remember what the client holds as of `event_id` so a resume can diff."""
+        cache.set(self.diff_state_key(user, event_id), differ.state, self.DIFF_STATE_TIMEOUT)
+
+    def load_diff_state(self, user, event_id):
+        return cache.get(self.diff_state_key(user, event_id))
+
+    @staticmethod
+    def format_event(payload, event_id=None):
+        message = f"id: {event_id}\n" if event_id is not None else ""
+        return message + f"data: {json.dumps(payload, cls=DecimalEncoder)}\n\n"
+
+    @staticmethod
+    def drain(queue):
+        """Collect everything already queued so bursts produce a single update."""
+        events = []
+        while True:
+            try:
+                events.append(queue.get_nowait())
+            except asyncio.QueueEmpty:
+                return events
+
+    async def generate_events(self, user, last_event_id=None):
+        # Subscribe before reading the event log so nothing falls in between
+        queue = trade_update_feed.subscribe()
+        redis_client = get_redis_client()
         try:
-            # Initial data
-            subscription = await self.get_active_subscription(request.user)
-            data = await self.get_all_data(request.user, subscription)
-
-            # Send initial data
-            yield f"data: {json.dumps({'type': 'initial_data', **data}, cls=DecimalEncoder)}\n\n"
+            subscription = await sync_to_async(self.get_active_subscription)(user)
+            if not subscription:
+                yield "event: error\ndata: No active subscription\n\n"
+                return
+
+            yield f"retry: {self.RETRY_INTERVAL}\n\n"
+
+            current_id = await sync_to_async(redis_client.get_last_event_id)(TRADE_UPDATES_CHANNEL)
+            state = None
+            if last_event_id is not None:
+                state = await sync_to_async(self.load_diff_state)(user, last_event_id)
+
+            if state is None:
+                # New client, or we no longer know what it holds: send everything
+                data = await sync_to_async(self.get_all_data)(subscription)
+                differ = SnapshotDiffer(self.SECTIONS)
+                differ.load(data)
+                await sync_to_async(self.save_diff_state)(user, current_id, differ)
+                yield self.format_event({'type': 'initial_data', **data}, current_id)
+            else:
+                # Resume: only diff if something relevant was missed
+                differ = SnapshotDiffer(self.SECTIONS, state)
+                missed, complete = await sync_to_async(redis_client.get_events_since)(
+                    TRADE_UPDATES_CHANNEL, last_event_id
+                )
+                if not complete or any(self.is_relevant(event['data'], subscription) for event in missed):
+                    data = await sync_to_async(self.get_all_data)(subscription)
+                    changes = differ.diff(data)
+                    await sync_to_async(self.save_diff_state)(user, current_id, differ)
+                    if changes:
+                        yield self.format_event({'type': 'diff', **changes}, current_id)
 
             while True:
-                await asyncio.sleep(5)
                 try:
-                    # Get updated data
-                    new_data = await self.get_all_data(request.user, subscription)
-                    yield f"data: {json.dumps({'type': 'update', **new_data}, cls=DecimalEncoder)}\n\n"
-                except Exception as e:
-                    print(f"Error generating event: {e}")
-                    yield f"event: error\ndata: {str(e)}\n\n"
-                    break
+                    event = await asyncio.wait_for(queue.get(), timeout=self.KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    trade_update_feed.ensure_listening()
+                    yield ": keepalive\n\n"
+                    continue
+
+                events = [event] + self.drain(queue)
+                if not any(self.is_relevant(item['data'], subscription) for item in events):
+                    continue
+
+                data = await sync_to_async(self.get_all_data)(subscription)
+                changes = differ.diff(data)
+                if not changes:
+                    # Nothing the client can see changed
+                    yield ": keepalive\n\n"
+                    continue
+
+                event_id = max(item['id'] for item in events)
+                await sync_to_async(self.save_diff_state)(user, event_id, differ)
+                yield self.format_event({'type': 'diff', **changes}, event_id)
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
+            logger.error(f"Error generating event: {e}")
             yield f"event: error\ndata: {str(e)}\n\n"
+        finally:
+            trade_update_feed.unsubscribe(queue)
+
+    @staticmethod
+    def get_last_event_id(request):
+        value = request.headers.get('Last-Event-ID') or request.GET.get('lastEventId')
+        try:
+            return int(value) if value else None
+        except ValueError:
+            return None
 
-    @method_decorator(csrf_exempt)
     async def get(self, request):
         # Extract token from query params
         token = request.GET.get('token')
@@ -97,27 +198,26 @@ class TradeUpdatesSSE(APIView):
 
         try:
             # Authenticate the user
-            user = JWTAuthentication().authenticate(request)
-            if not user:
-                return StreamingHttpResponse(
-                    "event: error\ndata: Unauthorized\n\n",
-                    content_type='text/event-stream'
-                )
+            auth_result = await sync_to_async(JWTAuthentication().authenticate)(request)
+        except (InvalidToken, TokenError, AuthenticationFailed):
+            auth_result = None
 
-            response = StreamingHttpResponse(
-                self.generate_events(request),
+        if not auth_result:
+            return StreamingHttpResponse(
+                "event: error\ndata: Unauthorized\n\n",
                 content_type='text/event-stream'
             )
 
-            # Add CORS headers
-            response["Access-Control-Allow-Origin"] = "*"
-            response["Access-Control-Allow-Credentials"] = "true"
-            response['Cache-Control'] = 'no-cache'
-            response['X-Accel-Buffering'] = 'no'
+        user = auth_result[0]
+        response = StreamingHttpResponse(
+            self.generate_events(user, self.get_last_event_id(request)),
+            content_type='text/event-stream'
+        )
 
-            return response
-        except Exception as e:
-            return StreamingHttpResponse(
-                f"event: error\ndata: {str(e)}\n\n",
-                content_type='text/event-stream'
-            )
\ No newline at end of file
+        # Add CORS headers
+        response["Access-Control-Allow-Origin"] = "*"
+        response["Access-Control-Allow-Credentials"] = "true"
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+
+        return response
@@ -2,6 +2,7 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.utils.translation import gettext_lazy as _
 from phonenumber_field.modelfields import PhoneNumberField
+from model_utils import FieldTracker
 from django.utils import timezone
 import uuid
 # from ..notifications.models import Notification
@@ -94,6 +95,7 @@ class User(AbstractUser):
     deleted_at = models.DateTimeField(null=True, blank=True)
 
     objects = CustomUserManager()
+    tracker = FieldTracker(fields=['user_type'])
 
     USERNAME_FIELD = 'phone_number'
     REQUIRED_FIELDS = ['email']
@@ -7,7 +7,7 @@ from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
 from django.contrib.auth import authenticate
 from django.contrib.auth import get_user_model
 from ..users.models import LoginAttempt
-from ..institutions.models import Institution, InstitutionUser
+from ..institutions.models import InstitutionUser
 from ..subscriptions.models import Subscription
 from .serializers import (
     UserSerializer, LoginSerializer, B2CRegistrationSerializer,
@@ -16,6 +16,7 @@ from .serializers import (
     UserActionSerializer, LoginAttemptSerializer, UserProfileEditSerializer
 )
 from core.permissions import IsB2BAdmin, IsB2BUser, IsB2CUser
+from apps.analytics.counters import admin_counters
 from rest_framework_simplejwt.views import TokenRefreshView
 from rest_framework_simplejwt.exceptions import TokenError, InvalidToken
 from django.db.models import Q
@@ -487,14 +488,12 @@ class AdminDashboardView(APIView):
     permission_classes = [permissions.IsAdminUser]
 
     def get(self, request):
-        total_users = User.objects.count()
-        total_institutions = Institution.objects.count()
-        total_subscriptions = Subscription.objects.filter(is_active=True).count()
-        
+        counters = admin_counters()
+
         return Response({
-            "total_users": total_users,
-            "total_institutions": total_institutions,
-            "active_subscriptions": total_subscriptions,
+            "total_users": counters['users']['total'],
+            "total_institutions": counters['institutions'],
+            "active_subscriptions": counters['active_subscriptions'],
         })
 
 class SubscriptionView(APIView):
@@ -586,16 +585,13 @@ class UserStatsView(APIView):
     permission_classes = [permissions.IsAdminUser]
 
     def get(self, request):
-        total_users = User.objects.exclude(user_type=User.UserType.ADMIN).count()
-        b2b_admins = User.objects.filter(user_type=User.UserType.B2B_ADMIN).count()
-        b2b_users = User.objects.filter(user_type=User.UserType.B2B_USER).count()
-        b2c_users = User.objects.filter(user_type=User.UserType.B2C).count()
+        users = admin_counters()['users']
 
         return Response({
-            'totalUsers': total_users,
-            'b2bAdmins': b2b_admins,
-            'b2bUsers': b2b_users,
-            'b2cUsers': b2c_users
+            'totalUsers': users['total'] - users['by_type'][User.UserType.ADMIN],
+            'b2bAdmins': users['by_type'][User.UserType.B2B_ADMIN],
+            'b2bUsers': users['by_type'][User.UserType.B2B_USER],
+            'b2cUsers': users['by_type'][User.UserType.B2C]
         })
 
 class LoginAttemptView(APIView):
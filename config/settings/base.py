@@ -220,6 +220,9 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Redis the trade update feed talks to directly
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+
 CACHES = {
     "default": {
         "BACKEND": "django_redis.cache.RedisCache",
@@ -158,4 +158,5 @@ EMAIL_HOST_PASSWORD = 'msiynwbwpynqlvpy'
 
 REDIS_HOST = 'localhost'
 REDIS_PORT = 6379
-REDIS_DB = 0
\ No newline at end of file
+REDIS_DB = 0
+REDIS_URL = f'redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}'
\ No newline at end of file
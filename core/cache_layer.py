@@ -0,0 +1,361 @@
+import time
+import uuid
+import random
+import asyncio
+import logging
+import threading
+from collections import namedtuple, OrderedDict
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+SOFT_TTL = 300
+# How long past its soft TTL an entry may still be served while one caller refreshes it
+STALE_TTL = 600
+# Fraction of the soft TTL shaved off at random so keys written together do not expire together
+JITTER = 0.1
+LOCK_TIMEOUT = 30
+POLL_INTERVAL = 0.05
+
+LOCAL_CACHE_SIZE = 512
+LOCAL_TTL = 5
+INVALIDATION_CHANNEL = 'cache_layer:invalidate'
+# Lets a process skip its own invalidation messages
+PROCESS_ID = uuid.uuid4().hex
+
+TAG_TIMEOUT = 60 * 60 * 24 * 7
+
+Entry = namedtuple('Entry', ['value', 'fresh'])
+
+
+class LocalCache:
+    """Thread-safe in-process LRU whose entries also expire after their own TTL."""
+
+    def __init__(self, max_size=LOCAL_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+local_cache = LocalCache()
+# Key families (the part of a key before the first ':') kept in the local tier, with their TTLs
+_local_ttls = {}
+
+
+def enable_local(family, ttl=LOCAL_TTL):
+    """Serve keys of `family` from the in-process tier for up to `ttl` seconds."""
+    _local_ttls[family] = ttl
+
+
+def _local_ttl(key):
+    return _local_ttls.get(key.split(':', 1)[0])
+
+
+def trade_tag(trade_id):
+    return f"trade:{trade_id}"
+
+
+def plan_tag(tier):
+    return f"plan:{tier}"
+
+
+def user_tag(user_id):
+    return f"user:{user_id}"
+
+
+def subscription_tag(subscription_id):
+    return f"subscription:{subscription_id}"
+
+
+def _tag_key(tag):
+    return f"cache_tag:{tag}"
+
+
+# Tag versions are read on every hit of a tagged entry
+enable_local('cache_tag')
+
+
+def _redis_connection():
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection('default')
+    except Exception:
+        # Not a django_redis cache: there is no shared tier to invalidate through
+        return None
+
+
+def _publish_invalidation(keys):
+    keys = [key for key in keys if _local_ttl(key)]
+    connection = _redis_connection() if keys else None
+    if connection is None:
+        return
+    try:
+        connection.publish(INVALIDATION_CHANNEL, '\n'.join([PROCESS_ID] + keys))
+    except Exception as e:
+        logger.error(f"Failed to publish cache invalidation for {keys}: {str(e)}")
+
+
+class InvalidationListener:
+    """
+    Daemon thread dropping local entries that other processes rewrote or
+    invalidated. Started on first use of the local tier; after a reconnect
+    the whole local tier is dropped, since messages may have been missed.
+    """
+
+    def __init__(self, channel):
+        self.channel = channel
+        self._started = False
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        if self._started:
+            return
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            if _redis_connection() is not None:
+                threading.Thread(target=self._run, name='cache-invalidation', daemon=True).start()
+
+    def handle(self, data):
+        process_id, *keys = data.decode('utf-8').split('\n')
+        if process_id != PROCESS_ID:
+            local_cache.delete(*keys)
+
+    def _run(self):
+        backoff = 1
+        while True:
+            try:
+                pubsub = _redis_connection().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                local_cache.clear()
+                backoff = 1
+                for message in pubsub.listen():
+                    if message.get('type') == 'message':
+                        self.handle(message['data'])
+            except Exception as e:
+                logger.error(f"Cache invalidation listener disconnected: {str(e)}")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+
+
+invalidation_listener = InvalidationListener(INVALIDATION_CHANNEL)
+
+
+def _lock_key(key):
+    return f"{key}:refresh_lock"
+
+
+def _read(key):
+    local_ttl = _local_ttl(key)
+    if local_ttl:
+        invalidation_listener.ensure_started()
+        stored = local_cache.get(key)
+        if stored is not None:
+            return stored
+    try:
+        stored = cache.get(key)
+    except Exception as e:
+        logger.error(f"Failed to read cache key {key}: {str(e)}")
+        return None
+    if local_ttl and stored is not None:
+        local_cache.set(key, stored, local_ttl)
+    return stored
+
+
+def tag_versions(tags):
+    """Current version per tag, starting a version for tags never seen or evicted."""
+    versions = {}
+    for tag in tags:
+        version = _read(_tag_key(tag))
+        if version is None:
+            version = uuid.uuid4().hex
+            try:
+                cache.add(_tag_key(tag), version, TAG_TIMEOUT)
+                version = cache.get(_tag_key(tag), version)
+            except Exception as e:
+                logger.error(f"Failed to start cache tag {tag}: {str(e)}")
+        versions[tag] = version
+    return versions
+
+
+def invalidate_tags(*tags):
+    """
+    Invalidate every entry stored with any of `tags` by moving the tags to
+    new versions, in one write and without knowing the entries' keys.
+    """
+    keys = [_tag_key(tag) for tag in tags]
+    try:
+        cache.set_many({key: uuid.uuid4().hex for key in keys}, TAG_TIMEOUT)
+    except Exception as e:
+        logger.error(f"Failed to invalidate cache tags {tags}: {str(e)}")
+    local_cache.delete(*keys)
+    _publish_invalidation(keys)
+
+
+def tags_current(versions):
+    """Whether no tag in a tag_versions() snapshot has been invalidated since."""
+    return all(_read(_tag_key(tag)) == version for tag, version in versions.items())
+
+
+def get_value(key):
+    """The cached Entry for `key`, fresh or stale, or None (also once one of its tags is invalidated)."""
+    stored = _read(key)
+    if not isinstance(stored, dict) or 'fresh_until' not in stored:
+        return None
+    if stored.get('tags') and not tags_current(stored['tags']):
+        return None
+    return Entry(stored['value'], time.time() < stored['fresh_until'])
+
+
+def set_value(key, value, soft_ttl=SOFT_TTL, stale_ttl=STALE_TTL, jitter=JITTER, tags=()):
+    """
+    Store `value` under `key`. `tags` may be tag names, or the tag_versions()
+    read before `value` was computed, so an invalidation that lands while
+    computing is not lost.
+    """
+    fresh_for = soft_ttl * (1 - random.uniform(0, jitter))
+    stored = {'value': value, 'fresh_until': time.time() + fresh_for}
+    if tags:
+        stored['tags'] = tags if isinstance(tags, dict) else tag_versions(tags)
+    try:
+        cache.set(key, stored, fresh_for + stale_ttl)
+    except Exception as e:
+        logger.error(f"Failed to write cache key {key}: {str(e)}")
+    local_ttl = _local_ttl(key)
+    if local_ttl:
+        local_cache.set(key, stored, min(local_ttl, fresh_for + stale_ttl))
+        _publish_invalidation([key])
+
+
+def invalidate(*keys):
+    try:
+        cache.delete_many(list(keys))
+    except Exception as e:
+        logger.error(f"Failed to invalidate cache keys {keys}: {str(e)}")
+    local_cache.delete(*keys)
+    _publish_invalidation(keys)
+
+
+def _acquire(key, lock_timeout):
+    token = uuid.uuid4().hex
+    try:
+        return token if cache.add(_lock_key(key), token, lock_timeout) else None
+    except Exception as e:
+        logger.error(f"Failed to take refresh lock for {key}: {str(e)}")
+        # Without a lock every caller computes, as if there were no cache layer
+        return token
+
+
+def _release(key, token):
+    try:
+        if cache.get(_lock_key(key)) == token:
+            cache.delete(_lock_key(key))
+    except Exception as e:
+        logger.error(f"Failed to release refresh lock for {key}: {str(e)}")
+
+
+def get_or_compute(key, compute, soft_ttl=SOFT_TTL, stale_ttl=STALE_TTL, jitter=JITTER, lock_timeout=LOCK_TIMEOUT,
+                   tags=()):
+    """
+    Return the cached value of `key`, calling `compute()` to fill it.
+
+    Only the caller holding the refresh lock computes. While it does, other
+    callers get the stale value if there is one, or wait for the new value
+    on a cold key. If a refresh fails, the stale value is served. An entry
+    whose `tags` were invalidated is gone, never served stale.
+    """
+    entry = get_value(key)
+    if entry and entry.fresh:
+        return entry.value
+
+    token = _acquire(key, lock_timeout)
+    if token:
+        try:
+            versions = tag_versions(tags)
+            value = compute()
+            set_value(key, value, soft_ttl, stale_ttl, jitter, tags=versions)
+            return value
+        except Exception:
+            if entry is None:
+                raise
+            logger.exception(f"Refreshing {key} failed, serving the stale value")
+            return entry.value
+        finally:
+            _release(key, token)
+
+    if entry:
+        return entry.value
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = get_value(key)
+        if entry:
+            return entry.value
+    logger.warning(f"Gave up waiting for {key} to be computed")
+    return compute()
+
+
+async def aget_or_compute(key, compute, soft_ttl=SOFT_TTL, stale_ttl=STALE_TTL, jitter=JITTER,
+                          lock_timeout=LOCK_TIMEOUT, tags=()):
+    """get_or_compute for async callers; `compute` is a coroutine function."""
+    entry = await sync_to_async(get_value)(key)
+    if entry and entry.fresh:
+        return entry.value
+
+    token = await sync_to_async(_acquire)(key, lock_timeout)
+    if token:
+        try:
+            versions = await sync_to_async(tag_versions)(tags)
+            value = await compute()
+            await sync_to_async(set_value)(key, value, soft_ttl, stale_ttl, jitter, tags=versions)
+            return value
+        except Exception:
+            if entry is None:
+                raise
+            logger.exception(f"Refreshing {key} failed, serving the stale value")
+            return entry.value
+        finally:
+            await sync_to_async(_release)(key, token)
+
+    if entry:
+        return entry.value
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        await asyncio.sleep(POLL_INTERVAL)
+        entry = await sync_to_async(get_value)(key)
+        if entry:
+            return entry.value
+    logger.warning(f"Gave up waiting for {key} to be computed")
+    return await compute()
@@ -0,0 +1,154 @@
+import time
+import hashlib
+import threading
+import logging
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils import timezone
+from apps.subscriptions.models import Subscription
+
+logger = logging.getLogger(__name__)
+
+GENERATION_TIMEOUT = 60 * 60 * 24 * 7
+
+# Bumped whenever a trade, its company, history, analysis or insight changes
+TRADES_GENERATION = 'trades'
+# Same for index/commodity trades
+INDEX_TRADES_GENERATION = 'index_trades'
+# Bumped whenever a Company row (the instrument master) changes
+INSTRUMENTS_GENERATION = 'instruments'
+
+
+def notifications_generation(user_id):
+    return f"notifications:{user_id}"
+
+
+def _generation_key(name):
+    return f"generation:{name}"
+
+
+def bump_generation(*names):
+    """
+    Mark data behind `names` as changed. Generations are microsecond
+    timestamps, so a bump always yields a new value.
+    """
+    now = time.time_ns() // 1000
+    for name in names:
+        try:
+            cache.set(_generation_key(name), now, GENERATION_TIMEOUT)
+        except Exception as e:
+            logger.error(f"Failed to bump generation {name}: {str(e)}")
+
+
+def get_generations(*names):
+    """Current generation per name; a missing one starts now (forcing a refetch)."""
+    keys = {_generation_key(name): name for name in names}
+    try:
+        found = cache.get_many(list(keys))
+    except Exception as e:
+        logger.error(f"Failed to read generations: {str(e)}")
+        found = {}
+
+    generations = {}
+    now = time.time_ns() // 1000
+    for key, name in keys.items():
+        if key not in found:
+            cache.add(key, now, GENERATION_TIMEOUT)
+            found[key] = cache.get(key, now)
+        generations[name] = found[key]
+    return generations
+
+
+class ConditionalListMixin:
+    """
+    ETag support for list endpoints.
+
+    The validator is built from generation counters (bumped by signals when
+    the underlying models change), the caller's plan scope and the full
+    request path, so a matching If-None-Match gets a 304 before get_queryset
+    runs. No Last-Modified is sent: a plan change or an expiring
+    subscription changes what the caller sees without moving any
+    generation, and a second-resolution date cannot tell two writes in the
+    same second apart, so If-Modified-Since could confirm a stale list.
+    """
+    etag_generations = ()
+
+    def get_etag_generations(self):
+        return list(self.etag_generations)
+
+    def get_etag_scope(self):
+        """Per-caller part of the validator: who is asking and on which plan."""
+        user = self.request.user
+        if not user.is_authenticated:
+            return ['anonymous']
+        if user.is_staff:
+            return ['staff', user.id]
+        subscription = Subscription.objects.filter(
+            user=user, is_active=True
+        ).order_by('-end_date').values_list('id', 'plan__name', 'start_date', 'end_date').first()
+        # Whether the window is current changes over time without any write
+        in_window = bool(subscription) and subscription[2] <= timezone.now() <= subscription[3]
+        return [user.id, subscription, in_window]
+
+    def get_list_etag(self):
+        generations = get_generations(*self.get_etag_generations())
+        parts = [self.__class__.__name__, self.request.get_full_path(), self.get_etag_scope(),
+                 sorted(generations.items())]
+        return 'W/"%s"' % hashlib.blake2b(repr(parts).encode('utf-8'), digest_size=16).hexdigest()
+
+    def get_not_modified_response(self, request):
+        """Return a 304 if the client's copy is current, else None."""
+        self._list_etag = self.get_list_etag()
+        not_modified = get_conditional_response(request, etag=self._list_etag)
+        if not_modified is not None:
+            not_modified['ETag'] = self._list_etag
+        return not_modified
+
+    def add_validator_headers(self, response):
+        if response.status_code == 200:
+            response['ETag'] = self._list_etag
+            response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        not_modified = self.get_not_modified_response(request)
+        if not_modified is not None:
+            return not_modified
+        return self.add_validator_headers(super().list(request, *args, **kwargs))
+
+
+class GenerationSnapshot:
+    """
+    A per-process value built by `builder` and rebuilt on first use after the
+    `generation` it depends on is bumped, e.g. read-only lookup tables.
+
+    With a `check_interval` (seconds) the generation is read at most that
+    often, so hot lookups don't pay a cache round trip each; a bump is then
+    picked up within the interval; pass `check=True` where that staleness
+    matters.
+    """
+
+    def __init__(self, generation, builder, check_interval=0):
+        self.generation = generation
+        self.builder = builder
+        self.check_interval = check_interval
+        self._value = None
+        self._built_for = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def get(self, check=False):
+        now = time.monotonic()
+        if (not check and self._value is not None and self._checked_at is not None
+                and now - self._checked_at < self.check_interval):
+            return self._value
+        current = get_generations(self.generation)[self.generation]
+        if self._value is not None and self._built_for == current:
+            self._checked_at = now
+            return self._value
+        with self._lock:
+            if self._value is None or self._built_for != current:
+                self._value = self.builder()
+                self._built_for = current
+            self._checked_at = now
+        return self._value
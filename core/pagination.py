@@ -0,0 +1,141 @@
+import json
+import base64
+import datetime
+from collections import OrderedDict
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class CursorJSONEncoder(DjangoJSONEncoder):
+    """
+    DjangoJSONEncoder cuts datetimes and times to milliseconds, which would
+    make a keyset bound skip rows within the same millisecond as the last
+    row of a page. Cursors keep the full microseconds.
+    """
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPaginationMixin:
+    """
+    Opt-in keyset pagination for PageNumberPagination subclasses.
+
+    Requests without `?cursor` keep page numbers. `?cursor=` (empty for the
+    first page) walks `cursor_ordering` with a WHERE on the last row's values
+    instead of OFFSET, and skips COUNT(*) unless `?count=true` is passed.
+    Views can override the ordering with a `cursor_ordering` attribute; the
+    fields must be non-null columns of the model, ending in a unique one.
+    Set `cursor_by_default` to use keyset pages even without `?cursor`.
+    """
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    cursor_by_default = False
+    cursor_ordering = ('-created_at', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_cursor_ordering(self, view):
+        return getattr(view, 'cursor_ordering', None) or self.cursor_ordering
+
+    def check_cursor_ordering(self, model, fields):
+        """A cursor on a list whose model lacks the ordering fields is a 404, not a 500."""
+        try:
+            for field in fields:
+                model._meta.get_field(field.lstrip('-'))
+        except FieldDoesNotExist:
+            raise NotFound('Cursor pagination is not available for this list')
+
+    def encode_cursor(self, values):
+        payload = json.dumps(values, cls=CursorJSONEncoder).encode('utf-8')
+        return base64.urlsafe_b64encode(payload).decode('ascii')
+
+    def decode_cursor(self, encoded, model, fields):
+        if not encoded:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            if len(values) != len(fields):
+                raise ValueError
+            return [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(fields, values)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def keyset_filter(fields, position):
+        """(a, b) after (x, y) as `a > x OR (a = x AND b > y)`, honouring '-' per field."""
+        condition = Q()
+        for index, field in enumerate(fields):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            step = Q(**{f'{name}__{lookup}': position[index]})
+            for previous, value in zip(fields[:index], position[:index]):
+                step &= Q(**{previous.lstrip('-'): value})
+            condition |= step
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.cursor_by_default or self.cursor_query_param in request.query_params
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        self.request = request
+        fields = self.get_cursor_ordering(view)
+        self.check_cursor_ordering(queryset.model, fields)
+        position = self.decode_cursor(request.query_params.get(self.cursor_query_param), queryset.model, fields)
+
+        wants_count = request.query_params.get(self.count_query_param, '').lower() == 'true'
+        self.count = queryset.count() if wants_count else None
+
+        queryset = queryset.order_by(*fields)
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(fields, position))
+
+        rows = list(queryset[:page_size + 1])
+        page = rows[:page_size]
+        self.next_position = None
+        if len(rows) > page_size:
+            self.next_position = [getattr(page[-1], field.lstrip('-')) for field in fields]
+        return page
+
+    def get_next_link(self):
+        if not getattr(self, 'cursor_mode', False):
+            return super().get_next_link()
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_previous_link(self):
+        if not getattr(self, 'cursor_mode', False):
+            return super().get_previous_link()
+        # Keyset pages only walk forwards
+        return None
+
+    def get_paginated_response(self, data):
+        if not getattr(self, 'cursor_mode', False):
+            return super().get_paginated_response(data)
+        response = OrderedDict()
+        if self.count is not None:
+            response['count'] = self.count
+        response['next'] = self.get_next_link()
+        response['previous'] = None
+        response['results'] = data
+        return Response(response)
+
+
+class KeysetPageNumberPagination(KeysetPaginationMixin, pagination.PageNumberPagination):
+    """Page numbers, or keyset with `?cursor=`, for views that opt in."""
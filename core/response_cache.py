@@ -0,0 +1,138 @@
+import hashlib
+import logging
+from functools import wraps
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.response import Response
+from apps.subscriptions.models import Subscription
+from .conditional import get_generations
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_TIMEOUT = 300
+
+# Endpoint names registered by @cache_response, for stats reporting
+CACHED_ENDPOINTS = set()
+
+
+def _stats_key(endpoint, outcome):
+    return f"response_cache:stats:{endpoint}:{outcome}"
+
+
+def _record(endpoint, outcome):
+    key = _stats_key(endpoint, outcome)
+    try:
+        cache.add(key, 0, None)
+        cache.incr(key)
+    except Exception as e:
+        logger.error(f"Failed to record response cache {outcome} for {endpoint}: {str(e)}")
+
+
+def get_response_cache_stats():
+    """Return {endpoint: {'hits', 'misses', 'hit_rate'}} for every cached endpoint."""
+    stats = {}
+    for endpoint in sorted(CACHED_ENDPOINTS):
+        hits = cache.get(_stats_key(endpoint, 'hits'), 0)
+        misses = cache.get(_stats_key(endpoint, 'misses'), 0)
+        total = hits + misses
+        stats[endpoint] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 4) if total else None
+        }
+    return stats
+
+
+def reset_response_cache_stats():
+    cache.delete_many([
+        _stats_key(endpoint, outcome)
+        for endpoint in CACHED_ENDPOINTS for outcome in ('hits', 'misses')
+    ])
+
+
+def get_plan_tier(user):
+    """The part of a user that decides what trade reads return: their plan."""
+    if not user.is_authenticated:
+        return 'anonymous'
+    if user.is_staff:
+        return 'staff'
+    now = timezone.now()
+    plan_name = Subscription.objects.filter(
+        user=user,
+        is_active=True,
+        start_date__lte=now,
+        end_date__gte=now
+    ).values_list('plan__name', flat=True).first()
+    return plan_name or 'none'
+
+
+def cached_response(endpoint, request, kwargs, generations, compute,
+                    timeout=RESPONSE_CACHE_TIMEOUT, vary_on_plan=True):
+    """
+    Return the cached data for this request or call `compute` and cache its
+    200 response. The key is the endpoint, URL kwargs, query params, the
+    caller's plan tier (unless `vary_on_plan` is False) and the current
+    `generations`, so a signal bumping one of those generations invalidates
+    every entry at once.
+    """
+    parts = [
+        endpoint,
+        sorted(kwargs.items()),
+        sorted(request.query_params.lists()),
+        get_plan_tier(request.user) if vary_on_plan else None,
+        sorted(get_generations(*generations).items()),
+    ]
+    key = 'response_cache:' + hashlib.blake2b(repr(parts).encode('utf-8'), digest_size=16).hexdigest()
+
+    cached = cache.get(key)
+    if cached is not None:
+        _record(endpoint, 'hits')
+        return Response(cached)
+
+    _record(endpoint, 'misses')
+    response = compute()
+    if response.status_code == 200:
+        try:
+            cache.set(key, response.data, timeout)
+        except Exception as e:
+            logger.error(f"Failed to cache response for {endpoint}: {str(e)}")
+    return response
+
+
+def cache_response(endpoint, generations, timeout=RESPONSE_CACHE_TIMEOUT, vary_on_plan=True):
+    """Cache a viewset action's 200 responses across users (see cached_response)."""
+    CACHED_ENDPOINTS.add(endpoint)
+
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            return cached_response(
+                endpoint, request, kwargs, generations,
+                lambda: view_method(self, request, *args, **kwargs),
+                timeout=timeout, vary_on_plan=vary_on_plan
+            )
+        return wrapper
+    return decorator
+
+
+class ResponseCacheMixin:
+    """
+    Cache `list` responses across users. List it after ConditionalListMixin
+    so 304s are still answered before the cache is consulted.
+    """
+    response_cache_endpoint = None
+    response_cache_generations = ()
+    response_cache_timeout = RESPONSE_CACHE_TIMEOUT
+    response_cache_vary_on_plan = True
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.response_cache_endpoint:
+            CACHED_ENDPOINTS.add(cls.response_cache_endpoint)
+
+    def list(self, request, *args, **kwargs):
+        return cached_response(
+            self.response_cache_endpoint, request, kwargs, self.response_cache_generations,
+            lambda: super(ResponseCacheMixin, self).list(request, *args, **kwargs),
+            timeout=self.response_cache_timeout, vary_on_plan=self.response_cache_vary_on_plan
+        )
@@ -0,0 +1,16 @@
+from django.db.models import F
+
+
+def bump_counters(model, deltas, **bucket):
+    """
+    Add `deltas` ({field: amount}) to the counter columns of the `model` row
+    matching `bucket`, creating the row first. The increment is an F()
+    update, so concurrent writers cannot lose each other's changes.
+
+    Meant for post_save/post_delete receivers: they run inside the saving
+    transaction, so the counters commit or roll back together with the write.
+    """
+    if not any(deltas.values()):
+        return
+    row, _ = model.objects.get_or_create(**bucket)
+    model.objects.filter(pk=row.pk).update(**{field: F(field) + amount for field, amount in deltas.items()})